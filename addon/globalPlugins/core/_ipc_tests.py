@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Round-trip tests of the IPC endpoint, through a real local socket. Run from the
+globalPlugins folder with:
+
+	python -m core._ipc_tests
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from multiprocessing.connection import Client
+
+from . import ipc
+
+
+class TestIpc(unittest.TestCase):
+	def setUp(self):
+		self.configDir = tempfile.mkdtemp()
+		self.runNames = []
+		self.server = ipc.IpcServer(
+			self.configDir,
+			{
+				"run": self.onRun,
+				"batch": lambda request: {"ok": True, "results": [self.onRun({"name": name}) for name in request["names"]]},
+				"status": lambda request: {"ok": True, "itemCount": 2},
+			},
+		)
+		self.server.start()
+
+	def tearDown(self):
+		self.server.stop()
+		shutil.rmtree(self.configDir)
+
+	def onRun(self, request):
+		name = request.get("name")
+		if name not in ("Notepad", "Mail"):
+			return {"ok": False, "error": "No item named {0}".format(name)}
+		self.runNames.append(name)
+		return {"ok": True}
+
+	def test_run(self):
+		with ipc.IpcClient(self.configDir) as client:
+			self.assertEqual(client.run("Notepad"), {"ok": True})
+			self.assertFalse(client.run("Missing")["ok"])
+		self.assertEqual(self.runNames, ["Notepad"])
+
+	def test_batch(self):
+		with ipc.IpcClient(self.configDir) as client:
+			response = client.runBatch(["Notepad", "Mail"])
+		self.assertEqual(response, {"ok": True, "results": [{"ok": True}, {"ok": True}]})
+		self.assertEqual(self.runNames, ["Notepad", "Mail"])
+
+	def test_status(self):
+		with ipc.IpcClient(self.configDir) as client:
+			self.assertEqual(client.status(), {"ok": True, "itemCount": 2})
+
+	def test_bad_requests(self):
+		with ipc.IpcClient(self.configDir) as client:
+			self.assertFalse(client.request({"command": "delete"})["ok"])
+			self.assertFalse(client.request({"command": [1]})["ok"])
+			self.assertFalse(client.request(["run"])["ok"])
+			# The connection survives them all.
+			self.assertTrue(client.status()["ok"])
+
+	def test_wrong_key(self):
+		with open(self.server.endpointPath, "r", encoding="utf-8") as endpointFile:
+			endpoint = json.load(endpointFile)
+		with self.assertLogs(ipc.log, "WARNING"):
+			with self.assertRaises(ipc.AuthenticationError):
+				Client(endpoint["address"], family=endpoint["family"], authkey=b"wrong key")
+			# Connections are accepted one by one, so this one is served after the rejection.
+			with ipc.IpcClient(self.configDir) as client:
+				self.assertTrue(client.status()["ok"])
+
+	def test_stop(self):
+		endpointPath = self.server.endpointPath
+		self.assertTrue(os.path.exists(endpointPath))
+		self.server.stop()
+		self.assertFalse(os.path.exists(endpointPath))
+		self.assertIsNone(self.server._listener)
+		with self.assertRaises(OSError):
+			ipc.IpcClient(self.configDir)
+		# Stopping twice does nothing.
+		self.server.stop()
+
+	def test_hang_up_during_handshake(self):
+		with open(self.server.endpointPath, "r", encoding="utf-8") as endpointFile:
+			endpoint = json.load(endpointFile)
+		with self.assertLogs(ipc.log, "ERROR"):
+			Client(endpoint["address"], family=endpoint["family"], authkey=None).close()
+			with ipc.IpcClient(self.configDir) as client:
+				self.assertTrue(client.status()["ok"])
+
+	def test_main(self):
+		output = io.StringIO()
+		with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+			self.assertEqual(ipc.main(["--config-dir", self.configDir, "run", "Notepad"]), 0)
+			self.assertEqual(ipc.main(["--config-dir", self.configDir, "run", "Missing"]), 1)
+			self.server.stop()
+			self.assertEqual(ipc.main(["--config-dir", self.configDir, "status"]), 2)
+		self.assertIn("Could not reach instant Access", output.getvalue())
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for turning recorded key events into Keystrokes lines. Run from the
+globalPlugins folder with:
+
+	python -m core._recorder_tests
+"""
+
+import unittest
+
+from . import recorder
+from .keyboard import KEY_DOWN, KEY_UP, KeyboardEvent
+
+
+class TestCompressEvents(unittest.TestCase):
+	def setUp(self):
+		self.events = []
+		self.time = 0.0
+
+	def down(self, *names):
+		for name in names:
+			self.time += 0.1
+			self.events.append(KeyboardEvent(KEY_DOWN, 0, name, time=self.time))
+
+	def up(self, *names):
+		for name in names:
+			self.time += 0.1
+			self.events.append(KeyboardEvent(KEY_UP, 0, name, time=self.time))
+
+	def press(self, name, count=1):
+		for index in range(count):
+			self.down(name)
+			self.up(name)
+
+	def compress(self):
+		return recorder.compressEvents(self.events)
+
+	def test_repeats(self):
+		self.press("down", 5)
+		self.press("a")
+		self.assertEqual(self.compress()[0], ["down 5", "a"])
+
+	def test_chord(self):
+		self.down("left ctrl", "shift")
+		self.press("tab", 2)
+		self.up("shift", "left ctrl")
+		self.assertEqual(self.compress()[0], ["ctrl+shift+tab 2"])
+
+	def test_lone_modifier(self):
+		self.press("alt")
+		self.press("page down")
+		self.assertEqual(self.compress()[0], ["alt", "page down"])
+
+	def test_modifier_only_chord(self):
+		self.down("left alt", "left shift")
+		self.up("left shift", "left alt")
+		self.press("a")
+		self.assertEqual(self.compress()[0], ["alt+shift", "a"])
+
+	def test_modifier_only_chord_released_in_press_order(self):
+		self.down("ctrl", "shift")
+		self.up("ctrl", "shift")
+		self.assertEqual(self.compress()[0], ["shift+ctrl"])
+
+	def test_stop_key_dropped(self):
+		self.press("a")
+		self.press("esc")
+		self.assertEqual(self.compress()[0], ["a"])
+
+	def test_gaps_and_skipped(self):
+		self.press("a")
+		self.press("+")
+		self.press("b")
+		lines, gaps, skipped = self.compress()
+		self.assertEqual(lines, ["a", "b"])
+		self.assertEqual(skipped, 1)
+		self.assertEqual(len(gaps), 1)
+		self.assertAlmostEqual(gaps[0], 0.4)
+
+	def test_median_gap(self):
+		self.assertIsNone(recorder.getMedianGap([]))
+		self.assertEqual(recorder.getMedianGap([0.3, 0.1, 0.2]), 0.2)
+		self.assertEqual(recorder.getMedianGap([0.1, 0.2]), 0.15)
+
+
+class TestRecordingBuffer(unittest.TestCase):
+	def test_bounded(self):
+		calls = []
+		buffer = recorder.RecordingBuffer(maxEvents=2, onFull=lambda: calls.append(True))
+		for scanCode in range(1, 5):
+			buffer.put(KeyboardEvent(KEY_DOWN, scanCode, time=scanCode))
+		self.assertEqual([event.scan_code for event in buffer.queue], [1, 2])
+		self.assertTrue(buffer.overflowed)
+		self.assertEqual(calls, [True])
+
+	def test_stop_key(self):
+		calls = []
+		buffer = recorder.RecordingBuffer(onStop=lambda: calls.append(True))
+		for eventType, name in ((KEY_DOWN, "a"), (KEY_UP, "a"), (KEY_DOWN, "esc"), (KEY_UP, "esc"), (KEY_DOWN, "esc")):
+			buffer.put(KeyboardEvent(eventType, 0, name))
+		self.assertEqual(calls, [True])
+		self.assertTrue(buffer.stopped)
+		self.assertEqual([event.name for event in buffer.queue], ["a", "a", "esc"])
+		self.assertEqual(recorder.compressEvents(buffer.queue)[0], ["a"])
+
+
+if __name__ == "__main__":
+	unittest.main()
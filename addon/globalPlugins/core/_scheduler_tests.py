@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for working out when scheduled items are due. Run from the globalPlugins
+folder with:
+
+	python -m core._scheduler_tests
+
+Outside NVDA, translations fall back to the untranslated strings.
+"""
+
+import builtins
+import datetime
+import sys
+import types
+import unittest
+
+try:
+	import addonHandler  # noqa: F401
+except ImportError:
+	addonHandler = types.ModuleType("addonHandler")
+	addonHandler.initTranslation = lambda: setattr(builtins, "_", lambda text: text)
+	sys.modules["addonHandler"] = addonHandler
+
+from . import scheduler  # noqa: E402
+
+
+def at(*args):
+	return datetime.datetime(*args).timestamp()
+
+
+class TestGetNextRunTime(unittest.TestCase):
+	def test_startup(self):
+		schedule = {"kind": scheduler.SCHEDULE_STARTUP, "seconds": 30}
+		self.assertEqual(scheduler.getNextRunTime(schedule, 500, 100), 130)
+		self.assertIsNone(scheduler.getNextRunTime(schedule, 500, 100, lastRun=130))
+
+	def test_interval(self):
+		schedule = {"kind": scheduler.SCHEDULE_INTERVAL, "minutes": 5}
+		self.assertEqual(scheduler.getNextRunTime(schedule, 1000, 0), 1300)
+		self.assertEqual(scheduler.getNextRunTime(schedule, 1000, 0, lastRun=900), 1200)
+
+	def test_interval_missed_runs_are_due_now(self):
+		schedule = {"kind": scheduler.SCHEDULE_INTERVAL, "minutes": 5}
+		self.assertLessEqual(scheduler.getNextRunTime(schedule, 10000, 0, lastRun=100), 10000)
+
+	def test_daily_later_today(self):
+		schedule = {"kind": scheduler.SCHEDULE_DAILY, "time": "09:30", "days": list(scheduler.ALL_DAYS)}
+		now = at(2024, 1, 1, 8, 0)
+		self.assertEqual(scheduler.getNextRunTime(schedule, now, 0), at(2024, 1, 1, 9, 30))
+
+	def test_daily_passed_today(self):
+		schedule = {"kind": scheduler.SCHEDULE_DAILY, "time": "09:30", "days": list(scheduler.ALL_DAYS)}
+		now = at(2024, 1, 1, 10, 0)
+		self.assertEqual(scheduler.getNextRunTime(schedule, now, 0), at(2024, 1, 2, 9, 30))
+
+	def test_daily_skips_other_days(self):
+		# 2024-01-05 is a Friday.
+		schedule = {"kind": scheduler.SCHEDULE_DAILY, "time": "09:30", "days": list(scheduler.WEEKDAYS)}
+		now = at(2024, 1, 5, 10, 0)
+		self.assertEqual(scheduler.getNextRunTime(schedule, now, 0), at(2024, 1, 8, 9, 30))
+
+	def test_daily_missed_run_is_due_now(self):
+		schedule = {"kind": scheduler.SCHEDULE_DAILY, "time": "09:30", "days": list(scheduler.ALL_DAYS)}
+		lastRun = at(2024, 1, 1, 9, 30)
+		now = at(2024, 1, 5, 12, 0)
+		self.assertEqual(scheduler.getNextRunTime(schedule, now, 0, lastRun), at(2024, 1, 2, 9, 30))
+
+	def test_unknown_kind(self):
+		self.assertIsNone(scheduler.getNextRunTime({"kind": "never"}, 0, 0))
+
+
+class TestSetItems(unittest.TestCase):
+	def setUp(self):
+		self.scheduler = scheduler.Scheduler(lambda name: None)
+		# Pretend NVDA started a minute ago.
+		self.scheduler._startTime -= 60
+
+	def names(self):
+		return [name for dueTime, name in self.scheduler.getNextRuns()]
+
+	def startupItem(self, name, seconds, **fields):
+		item = {"name": name, "schedule": {"kind": scheduler.SCHEDULE_STARTUP, "seconds": seconds}}
+		item.update(fields)
+		return item
+
+	def markRun(self, name):
+		# What the scheduler thread does once the run is due.
+		self.scheduler._lastRuns[name] = self.scheduler._startTime
+		self.scheduler._heap = [entry for entry in self.scheduler._heap if entry[2] != name]
+
+	def test_startup_items_at_start_are_queued(self):
+		self.scheduler.setItems([self.startupItem("early", 10), self.startupItem("late", 600)])
+		self.assertEqual(self.names(), ["early", "late"])
+
+	def test_startup_item_added_after_its_time_is_not_queued(self):
+		self.scheduler.setItems([])
+		self.scheduler.setItems([self.startupItem("new", 10)])
+		self.assertEqual(self.names(), [])
+
+	def test_startup_item_added_before_its_time_is_queued(self):
+		self.scheduler.setItems([])
+		self.scheduler.setItems([self.startupItem("new", 600)])
+		self.assertEqual(self.names(), ["new"])
+
+	def test_pending_startup_item_stays_queued_across_edits(self):
+		self.scheduler.setItems([self.startupItem("pending", 10)])
+		self.scheduler.setItems([self.startupItem("pending", 10), {"name": "other"}])
+		self.assertEqual(self.names(), ["pending"])
+
+	def test_startup_item_does_not_run_again_after_rename(self):
+		self.scheduler.setItems([self.startupItem("old", 10)])
+		self.markRun("old")
+		self.scheduler.setItems([self.startupItem("new", 10)])
+		self.assertEqual(self.names(), [])
+
+	def test_startup_item_does_not_run_again_after_disable_and_enable(self):
+		self.scheduler.setItems([self.startupItem("item", 10)])
+		self.markRun("item")
+		self.scheduler.setItems([self.startupItem("item", 10, enabled=False)])
+		self.assertEqual(self.names(), [])
+		self.scheduler.setItems([self.startupItem("item", 10)])
+		self.assertEqual(self.names(), [])
+
+	def test_interval_is_not_pushed_back_by_edits(self):
+		item = {"name": "poll", "schedule": {"kind": scheduler.SCHEDULE_INTERVAL, "minutes": 5}}
+		self.scheduler.setItems([item])
+		firstDue = self.scheduler.getNextRuns()[0][0]
+		self.scheduler.setItems([item, {"name": "other"}])
+		self.assertEqual(self.scheduler.getNextRuns(), [(firstDue, "poll")])
+
+	def test_changed_interval_starts_afresh(self):
+		item = {"name": "poll", "schedule": {"kind": scheduler.SCHEDULE_INTERVAL, "minutes": 5}}
+		self.scheduler.setItems([item])
+		self.scheduler._lastRuns["poll"] -= 1000
+		item = {"name": "poll", "schedule": {"kind": scheduler.SCHEDULE_INTERVAL, "minutes": 10}}
+		self.scheduler.setItems([item])
+		dueTime = self.scheduler.getNextRuns()[0][0]
+		self.assertGreater(dueTime, self.scheduler._lastRuns["poll"] + 599)
+
+	def test_daily_is_queued_and_disabled_items_are_dropped(self):
+		daily = {"kind": scheduler.SCHEDULE_DAILY, "time": "09:30", "days": list(scheduler.ALL_DAYS)}
+		self.scheduler.setItems([
+			{"name": "daily", "schedule": daily},
+			{"name": "off", "schedule": daily, "enabled": False},
+			{"name": "unscheduled"},
+		])
+		self.assertEqual(self.names(), ["daily"])
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -1,48 +1,104 @@
 # -*- coding: utf-8 -*-
 
-from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
-from locale import strxfrm
+import threading
 
 import addonHandler
 import gui
-from gui import guiHelper
+from gui import guiHelper, nvdaControls
 import wx
 
 from .constants import ERROR_CAPTION
-from .nvda_commands import getAllActiveNvdaCommands
+from .nvda_commands import getNvdaCommandCatalog, peekNvdaCommandCatalog
+from .search_index import SearchIndex
+from .usage import usageStats
 
 addonHandler.initTranslation()
 
 
-_COMMAND_LOADER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="instantAccessCommandPicker")
+_commandLoader = None
+_commandLoaderLock = threading.Lock()
+
+
+def loadCommandCatalogAsync():
+	"""Start building the NVDA command catalog off the main thread and return its future."""
+	global _commandLoader
+	with _commandLoaderLock:
+		if _commandLoader is None:
+			_commandLoader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="instantAccessCommandPicker")
+		return _commandLoader.submit(getNvdaCommandCatalog)
+
+
+def shutdownCommandLoader():
+	"""Stop the thread building the command catalog, dropping the builds still queued."""
+	global _commandLoader
+	with _commandLoaderLock:
+		loader = _commandLoader
+		_commandLoader = None
+	if loader is not None:
+		loader.shutdown(wait=False, cancel_futures=True)
+
+
+class _CommandListCtrl(nvdaControls.AutoWidthColumnListCtrl):
+	"""Virtual list of commands; row text is produced only for the rows being displayed."""
+
+	def __init__(self, parent):
+		super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL | wx.BORDER_SUNKEN)
+		# Translators: Column label for the command list in NVDA command selection dialog.
+		self.InsertColumn(0, _("Command"))
+		self.commands = []
+
+	def setCommands(self, commands):
+		self.commands = commands
+		self.SetItemCount(len(commands))
+		self.Refresh()
+
+	def OnGetItemText(self, item, column):
+		try:
+			return self.commands[item].label
+		except IndexError:
+			return ""
 
 
 class NvdaCommandPickerDialog(wx.Dialog):
+	# Remembers the chosen view for the rest of the NVDA session.
+	showFlatList = False
+
 	def __init__(self, parent, selectedCommandId=""):
 		# Translators: Title of the dialog used to select an NVDA command.
 		wx.Dialog.__init__(self, parent, title=_("Select NVDA command"), style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
 		self.selectedCommandId = selectedCommandId or ""
 		self.commands = []
 		self._commandById = {}
+		self._searchIndex = SearchIndex([])
+		self._docBoosts = {}
+		self._categoryOrder = []
 		self._filteredGrouped = {}
+		self._categoryItems = {}
+		self._categoryChildIds = {}
 		self._populatedCategories = set()
 		self._itemToCommandId = {}
 		self._isDestroyed = False
 		self._loadFuture = None
 		self._filterCallLater = None
 		self._isPopulatingTree = False
+		self._isPopulatingList = False
 
 		mainSizer = wx.BoxSizer(wx.VERTICAL)
 		sizerHelper = guiHelper.BoxSizerHelper(self, wx.VERTICAL)
 
 		# Translators: Label for filter field in NVDA command selection dialog.
 		self.filterCtrl = sizerHelper.addLabeledControl(_("Filter"), wx.TextCtrl)
+		# Translators: Label for the checkbox that shows NVDA commands as one flat list instead of a tree.
+		self.flatListCheck = sizerHelper.addItem(wx.CheckBox(self, label=_("Show commands as a flat &list")))
+		self.flatListCheck.SetValue(NvdaCommandPickerDialog.showFlatList)
 		self.tree = wx.TreeCtrl(
 			self,
 			style=wx.TR_HAS_BUTTONS | wx.TR_HIDE_ROOT | wx.TR_LINES_AT_ROOT | wx.TR_SINGLE | wx.BORDER_SUNKEN,
 		)
 		sizerHelper.addItem(self.tree, flag=wx.EXPAND, proportion=1)
+		self.commandList = _CommandListCtrl(self)
+		sizerHelper.addItem(self.commandList, flag=wx.EXPAND, proportion=1)
 
 		buttonHelper = guiHelper.ButtonHelper(wx.HORIZONTAL)
 		# Translators: Label for OK button in NVDA command selection dialog.
@@ -56,6 +112,10 @@ class NvdaCommandPickerDialog(wx.Dialog):
 		self.SetSizerAndFit(mainSizer)
 
 		self.filterCtrl.Bind(wx.EVT_TEXT, self.onFilterChange)
+		self.flatListCheck.Bind(wx.EVT_CHECKBOX, self.onFlatListToggle)
+		self.commandList.Bind(wx.EVT_LIST_ITEM_SELECTED, self.onListSelectionChanged)
+		self.commandList.Bind(wx.EVT_LIST_ITEM_DESELECTED, self.onListSelectionChanged)
+		self.commandList.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.onListItemActivated)
 		self.tree.Bind(wx.EVT_TREE_SEL_CHANGED, self.onTreeSelectionChanged)
 		self.tree.Bind(wx.EVT_TREE_ITEM_ACTIVATED, self.onTreeItemActivated)
 		self.tree.Bind(wx.EVT_TREE_ITEM_EXPANDING, self.onTreeItemExpanding)
@@ -64,7 +124,9 @@ class NvdaCommandPickerDialog(wx.Dialog):
 
 		self.filterCtrl.Enable(False)
 		self.tree.Enable(False)
+		self.commandList.Enable(False)
 		self.okButton.Enable(False)
+		self._updateViewVisibility()
 
 		self.filterCtrl.SetFocus()
 		self.CentreOnScreen()
@@ -90,52 +152,187 @@ class NvdaCommandPickerDialog(wx.Dialog):
 			return False
 
 	def _loadCommandsAsync(self):
-		self._loadFuture = _COMMAND_LOADER.submit(getAllActiveNvdaCommands)
+		catalog = peekNvdaCommandCatalog()
+		if catalog is not None:
+			# A catalog cached for this context (possibly by a previous NVDA session) opens instantly.
+			self._setCatalog(catalog)
+			return
+		self._loadFuture = loadCommandCatalogAsync()
 		self._loadFuture.add_done_callback(lambda future: wx.CallAfter(self._onCommandsLoaded, future))
 
 	def _onCommandsLoaded(self, future):
 		if not self._isTreeAlive():
 			return
 		try:
-			self.commands = future.result()
+			catalog = future.result()
 		except Exception:
+			catalog = None
+		self._setCatalog(catalog)
+
+	def _setCatalog(self, catalog):
+		if catalog is not None:
+			self.commands = catalog.commands
+			self._commandById = catalog.byIdentifier
+			# Catalog categories are already in display order.
+			self._categoryOrder = list(catalog.byCategory.keys())
+		else:
 			self.commands = []
-		self._commandById = {command.identifier: command for command in self.commands}
+			self._commandById = {}
+			self._categoryOrder = []
+		self._searchIndex = SearchIndex(
+			{"category": command.category, "command": command.displayName} for command in self.commands
+		)
+		# Commands that items run often and recently rank first.
+		commandScores = usageStats.getCommandScores()
+		self._docBoosts = {}
+		if commandScores:
+			for docId, command in enumerate(self.commands):
+				bonus = commandScores.get(command.identifier)
+				if bonus:
+					self._docBoosts[docId] = bonus
 		self.filterCtrl.Enable(True)
 		self.tree.Enable(True)
-		self.populateTree(self.selectedCommandId)
+		self.commandList.Enable(True)
+		self.refreshView()
+
+	def _isFlatList(self):
+		return self.flatListCheck.GetValue()
+
+	def _updateViewVisibility(self):
+		isFlatList = self._isFlatList()
+		self.tree.Show(not isFlatList)
+		self.commandList.Show(isFlatList)
+		self.Layout()
+
+	def refreshView(self):
+		"""Show the commands matching the filter in the active view."""
+		if self._isFlatList():
+			self.populateList()
+		else:
+			self.populateTree(self.selectedCommandId)
+
+	def onFlatListToggle(self, event):
+		if not self._isTreeAlive():
+			return
+		NvdaCommandPickerDialog.showFlatList = self._isFlatList()
+		self._updateViewVisibility()
+		self.refreshView()
+
+	def populateList(self):
+		"""Show the matches, best first, in the virtual list; cost does not depend on the catalog size."""
+		if not self._isTreeAlive():
+			return
+		selectedCommandId = self.selectedCommandId
+		commands = [self.commands[docId] for docId in self._searchCommands(self.filterCtrl.GetValue())]
+		# Deselecting fires selection events that would clear selectedCommandId before it is restored.
+		self._isPopulatingList = True
+		try:
+			self.commandList.setCommands(commands)
+			selectedIndex = self.commandList.GetFirstSelected()
+			while selectedIndex != -1:
+				self.commandList.Select(selectedIndex, on=0)
+				selectedIndex = self.commandList.GetNextSelected(selectedIndex)
+			for index, command in enumerate(commands):
+				if command.identifier == selectedCommandId:
+					self.commandList.Select(index)
+					self.commandList.Focus(index)
+					break
+		finally:
+			self._isPopulatingList = False
+		self._updateListSelectionState()
+
+	def _updateListSelectionState(self):
+		index = self.commandList.GetFirstSelected()
+		if 0 <= index < len(self.commandList.commands):
+			self.selectedCommandId = self.commandList.commands[index].identifier
+			self.okButton.Enable(True)
+		else:
+			self.selectedCommandId = ""
+			self.okButton.Enable(False)
+
+	def onListSelectionChanged(self, event):
+		if not self._isTreeAlive() or self._isPopulatingList:
+			return
+		self._updateListSelectionState()
+
+	def onListItemActivated(self, event):
+		if not self._isTreeAlive():
+			return
+		index = event.GetIndex()
+		if 0 <= index < len(self.commandList.commands):
+			self.selectedCommandId = self.commandList.commands[index].identifier
+			self.onOk(event)
+
+	def _searchCommands(self, filterText):
+		docBoosts = self._docBoosts
+		if not docBoosts:
+			return self._searchIndex.search(filterText)
+		return self._searchIndex.search(filterText, boost=lambda docId: docBoosts.get(docId, 0.0))
 
 	def _groupCommands(self, filterText):
-		grouped = defaultdict(list)
-		words = [word.strip().lower() for word in (filterText or "").split(" ") if word.strip()]
-		for command in self.commands:
-			searchText = f"{command.category} {command.displayName}".lower()
-			if words and not all(word in searchText for word in words):
-				continue
-			grouped[command.category].append(command)
+		"""Group the matching commands by category, each category listing its best matches first."""
+		grouped = {}
+		for docId in self._searchCommands(filterText):
+			command = self.commands[docId]
+			grouped.setdefault(command.category, []).append(command)
 		return grouped
 
 	def populateTree(self, preferredCommandId=""):
+		"""Bring the tree in line with the current filter, touching only categories that changed."""
 		if not self._isTreeAlive():
 			return
 		self._isPopulatingTree = True
 		self.tree.Freeze()
 		try:
-			self.tree.DeleteAllItems()
-			root = self.tree.AddRoot("root")
-			self._itemToCommandId = {}
-			self._populatedCategories = set()
-			self._filteredGrouped = self._groupCommands(self.filterCtrl.GetValue())
-			for category in sorted(self._filteredGrouped.keys(), key=strxfrm):
-				categoryItem = self.tree.AppendItem(root, category)
-				# Placeholder child ensures categories are expandable while keeping startup fast.
-				self.tree.AppendItem(categoryItem, "")
-			self.tree.CollapseAll()
+			root = self.tree.GetRootItem()
+			if not root or not root.IsOk():
+				root = self.tree.AddRoot("root")
+			previousGrouped = self._filteredGrouped
+			grouped = self._groupCommands(self.filterCtrl.GetValue())
+			self._filteredGrouped = grouped
+			for category in list(self._categoryItems.keys()):
+				if category not in grouped:
+					self._removeCategory(category)
+			previousItem = None
+			for category in self._categoryOrder:
+				commands = grouped.get(category)
+				if commands is None:
+					continue
+				categoryItem = self._categoryItems.get(category)
+				if categoryItem is None:
+					if previousItem is None:
+						categoryItem = self.tree.InsertItem(root, 0, category)
+					else:
+						categoryItem = self.tree.InsertItem(root, previousItem, category)
+					# Placeholder child ensures categories are expandable while keeping startup fast.
+					self.tree.AppendItem(categoryItem, "")
+					self._categoryItems[category] = categoryItem
+				elif category in self._populatedCategories and commands != previousGrouped.get(category):
+					self._populateCategory(categoryItem, category)
+				previousItem = categoryItem
 		finally:
 			self.tree.Thaw()
 			self._isPopulatingTree = False
-		self.selectedCommandId = ""
-		self.okButton.Enable(False)
+		self._updateSelectionState()
+
+	def _removeCategory(self, category):
+		categoryItem = self._categoryItems.pop(category)
+		for itemId in self._categoryChildIds.pop(category, []):
+			self._itemToCommandId.pop(itemId, None)
+		self._populatedCategories.discard(category)
+		self.tree.Delete(categoryItem)
+
+	def _populateCategory(self, categoryItem, category):
+		for itemId in self._categoryChildIds.pop(category, []):
+			self._itemToCommandId.pop(itemId, None)
+		self.tree.DeleteChildren(categoryItem)
+		childIds = []
+		for command in self._filteredGrouped.get(category, []):
+			commandItem = self.tree.AppendItem(categoryItem, command.displayName)
+			self._itemToCommandId[commandItem.GetID()] = command.identifier
+			childIds.append(commandItem.GetID())
+		self._categoryChildIds[category] = childIds
+		self._populatedCategories.add(category)
 
 	def onFilterChange(self, event):
 		if not self._isTreeAlive():
@@ -153,7 +350,7 @@ class NvdaCommandPickerDialog(wx.Dialog):
 		hadFilterFocus = self.FindFocus() == self.filterCtrl
 		insertionPoint = self.filterCtrl.GetInsertionPoint()
 		selectionStart, selectionEnd = self.filterCtrl.GetSelection()
-		self.populateTree(self.selectedCommandId)
+		self.refreshView()
 		if hadFilterFocus and self.filterCtrl:
 			self.filterCtrl.SetFocus()
 			self.filterCtrl.SetInsertionPoint(insertionPoint)
@@ -170,14 +367,9 @@ class NvdaCommandPickerDialog(wx.Dialog):
 			return
 		if category in self._populatedCategories:
 			return
-		commands = self._filteredGrouped.get(category, [])
 		self.tree.Freeze()
 		try:
-			self.tree.DeleteChildren(item)
-			for command in sorted(commands, key=lambda c: strxfrm(c.displayName)):
-				commandItem = self.tree.AppendItem(item, command.displayName)
-				self._itemToCommandId[commandItem.GetID()] = command.identifier
-			self._populatedCategories.add(category)
+			self._populateCategory(item, category)
 		finally:
 			self.tree.Thaw()
 		self._updateSelectionState()
@@ -3,13 +3,20 @@
 import copy
 import json
 import os
+import tempfile
 
 from .constants import TEXT_SNIPPET_ACTION_VALUES, TYPE_SECTIONS, VERBOSITY_VALUES
+from .gestures import normalizeGesture, normalizeGestureSequence
+from .scheduler import normalizeSchedule
+
+# Version 4 stores gestures in canonical form (see gestures.canonicalizeGesture); a sequence
+# of gestures is stored as its steps separated by spaces.
+CONFIG_VERSION = 4
 
 
 def _defaultConfig():
 	return {
-		"version": 3,
+		"version": CONFIG_VERSION,
 		"settings": {"verbosity": VERBOSITY_VALUES[0]},
 		"items": [],
 	}
@@ -67,6 +74,11 @@ def _normalizeActionData(itemType, rawData):
 			keys = ""
 		pressDelay = _toNonNegativeFloat(rawData.get("pressDelay", 0.05), 0.05)
 		return {"keys": keys, "pressDelay": pressDelay}
+	if itemType == "RunItem":
+		itemName = rawData.get("item", "")
+		if not isinstance(itemName, str):
+			itemName = ""
+		return {"item": itemName.strip()}
 	return {}
 
 
@@ -85,10 +97,12 @@ def _normalizeItem(rawItem):
 	if not isinstance(rawItem, dict):
 		return None
 	name = (rawItem.get("name", "") or "").strip()
-	gesture = (rawItem.get("gesture", "") or "").strip().lower()
+	gesture = normalizeGestureSequence(rawItem.get("gesture", "") or "")
 	appName = (rawItem.get("appName", "") or "").strip().lower()
 	interval = _toNonNegativeFloat(rawItem.get("interval", 0.0), 0.0)
-	if not name or not gesture:
+	schedule = normalizeSchedule(rawItem.get("schedule"))
+	# A scheduled item may go without a gesture.
+	if not name or not (gesture or schedule):
 		return None
 	rawActions = rawItem.get("actions", [])
 	if not isinstance(rawActions, list):
@@ -106,9 +120,35 @@ def _normalizeItem(rawItem):
 	}
 	if appName:
 		normalizedItem["appName"] = appName
+	if rawItem.get("enabled", True) is False:
+		normalizedItem["enabled"] = False
+	layer = rawItem.get("layer", "")
+	if isinstance(layer, str) and layer.strip():
+		normalizedItem["layer"] = layer.strip()
+	if schedule:
+		normalizedItem["schedule"] = schedule
 	return normalizedItem
 
 
+def _normalizeLayers(rawLayers):
+	"""Return the named layers as [{"name", "gesture"}], dropping unnamed and repeated ones."""
+	if not isinstance(rawLayers, list):
+		return []
+	layers = []
+	seenNames = set()
+	for rawLayer in rawLayers:
+		if not isinstance(rawLayer, dict):
+			continue
+		name = rawLayer.get("name", "")
+		if not isinstance(name, str) or not name.strip() or name.strip() in seenNames:
+			continue
+		name = name.strip()
+		seenNames.add(name)
+		gesture = rawLayer.get("gesture", "")
+		layers.append({"name": name, "gesture": normalizeGesture(gesture) if isinstance(gesture, str) else ""})
+	return layers
+
+
 def _normalizeConfig(rawConfig):
 	if not isinstance(rawConfig, dict):
 		raise ValueError("Invalid config format")
@@ -121,12 +161,21 @@ def _normalizeConfig(rawConfig):
 	rawItems = rawConfig.get("items", [])
 	if not isinstance(rawItems, list):
 		rawItems = []
+	layers = _normalizeLayers(rawConfig.get("layers", []))
+	layerNames = {layer["name"] for layer in layers}
 	items = []
 	for rawItem in rawItems:
 		item = _normalizeItem(rawItem)
-		if item is not None:
-			items.append(item)
-	return {"version": 3, "settings": {"verbosity": verbosity}, "items": items}
+		if item is None:
+			continue
+		if item.get("layer", "") not in layerNames:
+			# Items of a layer that no longer exists fall back to the default layer.
+			item.pop("layer", None)
+		items.append(item)
+	config = {"version": CONFIG_VERSION, "settings": {"verbosity": verbosity}, "items": items}
+	if layers:
+		config["layers"] = layers
+	return config
 
 
 def ensureConfigFile(configPath):
@@ -140,8 +189,21 @@ def saveConfig(configPath, config):
 	configDir = os.path.dirname(configPath)
 	os.makedirs(configDir, exist_ok=True)
 	normalized = _normalizeConfig(config)
-	with open(configPath, "w", encoding="utf-8") as handle:
-		json.dump(normalized, handle, ensure_ascii=False, indent="\t")
+	# Write next to the target and swap it in, so readers never see a half-written file.
+	handle, tempPath = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=configDir)
+	try:
+		with os.fdopen(handle, "w", encoding="utf-8") as tempFile:
+			json.dump(normalized, tempFile, ensure_ascii=False, indent="\t")
+			tempFile.flush()
+			os.fsync(tempFile.fileno())
+		os.replace(tempPath, configPath)
+	except BaseException:
+		try:
+			os.remove(tempPath)
+		except OSError:
+			pass
+		raise
+	return normalized
 
 
 def loadConfigSafe(configPath):
@@ -149,11 +211,19 @@ def loadConfigSafe(configPath):
 	try:
 		with open(configPath, "r", encoding="utf-8") as handle:
 			rawConfig = json.load(handle)
-		return _normalizeConfig(rawConfig)
+		config = _normalizeConfig(rawConfig)
 	except Exception:
 		defaultConfig = _defaultConfig()
 		saveConfig(configPath, defaultConfig)
 		return copy.deepcopy(defaultConfig)
+	if rawConfig.get("version") != CONFIG_VERSION:
+		# Written by an older version: store the migrated form so it only happens once.
+		try:
+			saveConfig(configPath, config)
+		except OSError:
+			# Not writable; the migration is simply repeated on the next load.
+			pass
+	return config
 
 
 def loadConfigFromPathStrict(configPath):
@@ -1,28 +1,392 @@
 # -*- coding: utf-8 -*-
 
+import addonHandler
+from contextlib import contextmanager
+import copy
 import logging
-from .config_io import ensureConfigFile, loadConfigSafe, saveConfig
+import os
+import threading
+from .config_io import ensureConfigFile, loadConfigFromPathStrict, loadConfigSafe, saveConfig
 from .constants import TYPE_SECTIONS, VERBOSITY_VALUES
+from .dispatch import GestureTrie, buildExecutionPlans, findReferenceCycle, getReferencedNames
+from .gestures import normalizeGesture, normalizeGestureSequence, splitGestureSequence
+from .scheduler import normalizeSchedule
+
+addonHandler.initTranslation()
 
 # Set up logging for better debugging
 log = logging.getLogger(__name__)
 
+HISTORY_LIMIT = 100
+
+
+def _buildItemDiff(oldItems, newItems):
+	"""Return (removed, added) lists of (index, item) pairs that turn oldItems into newItems.
+
+	Items equal in both lists are left out as long as they keep their relative order, so a
+	typical edit records only the items it touched.
+	"""
+	oldNames = [item.get("name", "") for item in oldItems]
+	newNames = [item.get("name", "") for item in newItems]
+	if len(set(oldNames)) == len(oldNames) and len(set(newNames)) == len(newNames):
+		oldByName = dict(zip(oldNames, oldItems))
+		newByName = dict(zip(newNames, newItems))
+		keptOld = [name for name, item in zip(oldNames, oldItems) if newByName.get(name) == item]
+		keptNew = [name for name, item in zip(newNames, newItems) if oldByName.get(name) == item]
+		if keptOld == keptNew:
+			kept = set(keptOld)
+			removed = [(index, item) for index, item in enumerate(oldItems) if oldNames[index] not in kept]
+			added = [(index, item) for index, item in enumerate(newItems) if newNames[index] not in kept]
+			return removed, added
+	# Duplicate names or reordered items: fall back to recording the whole list.
+	return list(enumerate(oldItems)), list(enumerate(newItems))
+
+
+def _getStoredReferences(storedItems):
+	"""Map the name of each stored item to the names of the items it runs."""
+	references = {}
+	for item in storedItems:
+		references.setdefault(item.get("name", ""), []).extend(
+			action.get("data", {}).get("item", "")
+			for action in item.get("actions", [])
+			if action.get("type", "") == "RunItem"
+		)
+	return references
+
+
+def _findNewReferenceCycle(oldItems, newItems):
+	"""Return a cycle of references that newItems have and oldItems did not, or None.
+
+	A new cycle runs through an item whose references changed, so only those items are checked:
+	a cycle written into the file by hand does not block the edits that would remove it.
+	"""
+	oldReferences = _getStoredReferences(oldItems)
+	newReferences = _getStoredReferences(newItems)
+	for name, referencedNames in newReferences.items():
+		if referencedNames != oldReferences.get(name):
+			cycle = findReferenceCycle(newReferences, name)
+			if cycle:
+				return cycle
+	return None
+
+
+def formatCycleError(cycle):
+	"""Return the error message for items that would run each other in a loop."""
+	# Translators: Error shown when items would run each other endlessly. {cycle} lists them, like "A → B → A".
+	return _("Items cannot run each other in a loop: {cycle}").format(cycle=" \u2192 ".join(cycle))
+
+
+def _applyItemDiff(items, removeEntries, insertEntries):
+	"""Remove the items named in removeEntries, then insert insertEntries at their indexes."""
+	removeNames = {entry[1].get("name", "") for entry in removeEntries}
+	result = [item for item in items if item.get("name", "") not in removeNames]
+	for index, item in sorted(insertEntries, key=lambda entry: entry[0]):
+		result.insert(index, copy.deepcopy(item))
+	return result
+
+
+class ItemIndex:
+	"""A read-only snapshot of item names and gesture owners, for conflict checks and lookups.
+
+	It also holds the execution plan of every item (see dispatch.buildExecutionPlans), so
+	items running other items are resolved once per configuration generation.
+	"""
+
+	def __init__(self, items, generation):
+		self.generation = generation
+		self.names = frozenset(item.get("name", "") for item in items)
+		self._itemsByName = {item.get("name", ""): item for item in items}
+		self._references = {item.get("name", ""): getReferencedNames(item) for item in items}
+		self._plans = buildExecutionPlans(items)
+		self.plans = [self._plans[item.get("name", "")] for item in items]
+		self._itemsByFoldedName = {}
+		for item in items:
+			self._itemsByFoldedName.setdefault(item.get("name", "").casefold(), item)
+		self._gestureOwners = {}
+		self._firstStepOwners = {}
+		itemsByLayer = {}
+		for item in items:
+			itemsByLayer.setdefault(item.get("layer", ""), []).append(item)
+			if not item.get("enabled", True):
+				continue
+			appName = (item.get("appName", "") or "").strip().lower()
+			for gesture in item.get("gestures", []):
+				steps = splitGestureSequence(gesture)
+				if not steps:
+					continue
+				key = (item.get("layer", ""), normalizeGestureSequence(gesture), appName)
+				self._gestureOwners.setdefault(key, []).append(item.get("name", ""))
+				self._firstStepOwners.setdefault(steps[0], []).append(item.get("name", ""))
+		self._tries = {layer: GestureTrie(layerItems) for layer, layerItems in itemsByLayer.items()}
+
+	def hasName(self, name, excludeName=""):
+		return name != excludeName and name in self.names
+
+	def findItem(self, name):
+		"""Return the item called name, falling back to a case-insensitive match, or None."""
+		item = self._itemsByName.get(name)
+		if item is None:
+			item = self._itemsByFoldedName.get((name or "").casefold())
+		return item
+
+	def getPlan(self, name):
+		"""Return the execution plan of the item called name, or None."""
+		return self._plans.get(name)
+
+	def findReferenceCycle(self, name, actions, excludeName=""):
+		"""Return the cycle that saving actions as the item called name would create, or None.
+
+		excludeName is the name the item had before, when it is being edited. Only cycles through
+		the item are reported, and none when its references stay the same.
+		"""
+		itemReferences = getReferencedNames({"actions": actions})
+		if name == excludeName and itemReferences == self._references.get(name):
+			return None
+		references = {}
+		for itemName, referencedNames in self._references.items():
+			if itemName != excludeName:
+				# Renaming an item makes the items running it follow the new name.
+				references[itemName] = [
+					name if referenced == excludeName and excludeName else referenced
+					for referenced in referencedNames
+				]
+		references[name] = itemReferences
+		return findReferenceCycle(references, name)
+
+	def findGestureOwners(self, gesture, appName="", excludeName="", layer=""):
+		"""Return the names of enabled items of layer already using gesture in appName (or globally)."""
+		key = (layer, normalizeGestureSequence(gesture), (appName or "").strip().lower())
+		return [name for name in self._gestureOwners.get(key, ()) if name != excludeName]
+
+	def findItemsStartingWith(self, gesture):
+		"""Return the names of the enabled items of any layer or app whose shortcut starts with gesture."""
+		return list(self._firstStepOwners.get(normalizeGesture(gesture), ()))
+
+	def findPrefixCollisions(self, sequence, appName="", excludeName="", layer=""):
+		"""Return the names of enabled items of layer whose sequence starts sequence, or starts with it."""
+		trie = self._tries.get(layer)
+		if trie is None:
+			return []
+		return [
+			item.get("name", "")
+			for item in trie.findPrefixCollisions(sequence, appName=appName, excludeName=excludeName)
+		]
+
 
 class ConfigManager:
-	"""Manages the configuration for the instantAccess add-on."""
+	"""Manages the configuration for the instantAccess add-on.
+
+	The committed configuration is cached in memory and reloaded only when the file changes
+	on disk. Mutations run inside a transaction on a private working copy and are written
+	once, atomically, when the outermost transaction ends; every commit increments
+	``generation``, notifies the registered change listeners and records an undo entry
+	holding only the items the commit changed.
+	"""
 	
 	def __init__(self, configPath):
 		"""Initialize the ConfigManager with a configuration file path."""
 		self.configPath = configPath
+		self.generation = 0
+		self._lock = threading.RLock()
+		self._config = None
+		self._fileStamp = None
+		self._working = None
+		self._transactionDepth = 0
+		self._transactionDescription = ""
+		self._recordHistory = True
+		self._changeListeners = []
+		self._undoStack = []
+		self._redoStack = []
+		self._itemIndex = None
 		ensureConfigFile(self.configPath)
 
+	def _getFileStamp(self):
+		try:
+			stat = os.stat(self.configPath)
+		except OSError:
+			return None
+		return (stat.st_mtime_ns, stat.st_size)
+
+	def _getCommittedConfig(self):
+		"""Return the cached committed configuration, reloading it if the file changed on disk."""
+		with self._lock:
+			fileStamp = self._getFileStamp()
+			if self._config is None or fileStamp is None or fileStamp != self._fileStamp:
+				if self._config is not None:
+					# Changed behind our back (e.g. edited by hand), so cached readers are stale
+					# and the recorded diffs may no longer apply.
+					self.generation += 1
+					self._undoStack = []
+					self._redoStack = []
+				self._config = loadConfigSafe(self.configPath)
+				self._fileStamp = self._getFileStamp()
+			return self._config
+
+	def getGeneration(self):
+		"""Return the current generation, first checking the file for changes made elsewhere."""
+		with self._lock:
+			self._getCommittedConfig()
+			return self.generation
+
 	def loadOrCreateConfig(self):
-		"""Load the configuration from file or create a new one if it doesn't exist."""
-		return loadConfigSafe(self.configPath)
+		"""Return a copy of the current configuration.
+
+		Inside a transaction this reflects the uncommitted changes made so far.
+		"""
+		with self._lock:
+			if self._working is not None:
+				return copy.deepcopy(self._working)
+			return copy.deepcopy(self._getCommittedConfig())
+
+	def _readConfig(self):
+		"""Return the current configuration without copying it; callers must not modify it."""
+		with self._lock:
+			if self._working is not None:
+				return self._working
+			return self._getCommittedConfig()
+
+	def transaction(self, description=""):
+		"""Group mutations into a single atomic write and change notification.
+
+		Yields the working configuration, which may be modified in place. Transactions nest;
+		only the outermost one commits, and nothing is written if the block raises.
+		description names the change in the undo history.
+		"""
+		return self._transaction(description, recordHistory=True)
+
+	@contextmanager
+	def _transaction(self, description, recordHistory):
+		notify = False
+		with self._lock:
+			if self._transactionDepth == 0:
+				self._working = copy.deepcopy(self._getCommittedConfig())
+				self._transactionDescription = description
+				self._recordHistory = recordHistory
+			elif not self._transactionDescription:
+				self._transactionDescription = description
+			self._transactionDepth += 1
+			try:
+				yield self._working
+			except BaseException:
+				self._transactionDepth -= 1
+				if self._transactionDepth == 0:
+					self._working = None
+				raise
+			self._transactionDepth -= 1
+			if self._transactionDepth == 0:
+				working = self._working
+				self._working = None
+				# Undo and redo only bring back items that were committed before.
+				if self._recordHistory and working.get("items", []) != self._config.get("items", []):
+					cycle = _findNewReferenceCycle(self._config.get("items", []), working.get("items", []))
+					if cycle:
+						raise ValueError(formatCycleError(cycle))
+				if working != self._config:
+					oldConfig = self._config
+					self._config = saveConfig(self.configPath, working)
+					self._fileStamp = self._getFileStamp()
+					self.generation += 1
+					if self._recordHistory:
+						self._pushHistory(oldConfig, self._config, self._transactionDescription)
+					notify = True
+		if notify:
+			self._notifyChangeListeners()
+
+	def _pushHistory(self, oldConfig, newConfig, description):
+		removed, added = _buildItemDiff(oldConfig.get("items", []), newConfig.get("items", []))
+		# Everything besides the items (settings, layers) is small, so it is kept whole.
+		oldRest = {key: value for key, value in oldConfig.items() if key != "items"}
+		newRest = {key: value for key, value in newConfig.items() if key != "items"}
+		self._undoStack.append({
+			"description": description,
+			"removed": removed,
+			"added": added,
+			"rest": (oldRest, newRest) if oldRest != newRest else None,
+		})
+		del self._undoStack[:-HISTORY_LIMIT]
+		self._redoStack = []
+
+	def _replay(self, fromStack, toStack, undoing):
+		"""Apply the newest entry of fromStack and move it to toStack.
+
+		Returns the entry's description, or None when fromStack is empty.
+		"""
+		entry = None
+		try:
+			with self._transaction("", recordHistory=False) as config:
+				if not fromStack:
+					return None
+				entry = fromStack.pop()
+				toStack.append(entry)
+				if undoing:
+					removeEntries, insertEntries = entry["added"], entry["removed"]
+				else:
+					removeEntries, insertEntries = entry["removed"], entry["added"]
+				config["items"] = _applyItemDiff(config.get("items", []), removeEntries, insertEntries)
+				if entry["rest"] is not None:
+					items = config["items"]
+					config.clear()
+					config.update(copy.deepcopy(entry["rest"][0 if undoing else 1]))
+					config["items"] = items
+		except BaseException:
+			if entry is not None:
+				with self._lock:
+					if toStack and toStack[-1] is entry:
+						toStack.pop()
+						fromStack.append(entry)
+			raise
+		return entry["description"]
+
+	def undo(self):
+		"""Revert the most recent change and return its description, or None if there is none."""
+		return self._replay(self._undoStack, self._redoStack, undoing=True)
+
+	def redo(self):
+		"""Reapply the most recently undone change and return its description, or None if there is none."""
+		return self._replay(self._redoStack, self._undoStack, undoing=False)
+
+	def canUndo(self):
+		return bool(self._undoStack)
 
-	def saveConfig(self, config):
-		"""Save the configuration to file."""
-		saveConfig(self.configPath, config)
+	def canRedo(self):
+		return bool(self._redoStack)
+
+	def addChangeListener(self, listener):
+		"""Call listener with no arguments after every committed change.
+
+		Listeners run on the committing thread, after the lock has been released.
+		"""
+		with self._lock:
+			if listener not in self._changeListeners:
+				self._changeListeners.append(listener)
+
+	def removeChangeListener(self, listener):
+		with self._lock:
+			if listener in self._changeListeners:
+				self._changeListeners.remove(listener)
+
+	def _notifyChangeListeners(self):
+		with self._lock:
+			listeners = list(self._changeListeners)
+		for listener in listeners:
+			try:
+				listener()
+			except Exception:
+				log.error("Error in configuration change listener", exc_info=True)
+
+	def saveConfig(self, config, description=""):
+		"""Replace the whole configuration."""
+		with self.transaction(description) as working:
+			working.clear()
+			working.update(copy.deepcopy(config))
+
+	def importConfig(self, sourcePath):
+		"""Replace the configuration with the one stored in sourcePath.
+
+		Raises if the file cannot be read or is not a valid configuration.
+		"""
+		# Translators: Undo history description of importing settings from a file.
+		self.saveConfig(loadConfigFromPathStrict(sourcePath), _("import settings"))
 
 	def getConfigPath(self):
 		"""Get the path to the configuration file."""
@@ -66,6 +430,8 @@ class ConfigManager:
 				pressDelay = 0.05
 			if pressDelay < 0:
 				pressDelay = 0.05
+		elif itemType == "RunItem":
+			path = data.get("item", "")
 		return {
 			"type": itemType,
 			"path": path if isinstance(path, str) else "",
@@ -80,13 +446,16 @@ class ConfigManager:
 	def _toPublicItem(self, storedItem):
 		"""Convert a stored item to a public-facing format."""
 		actions = [self._actionToPublic(action) for action in storedItem.get("actions", [])]
-		gesture = (storedItem.get("gesture", "") or "").strip().lower()
+		gesture = normalizeGestureSequence(storedItem.get("gesture", ""))
 		return {
 			"name": storedItem.get("name", ""),
 			"appName": (storedItem.get("appName", "") or "").strip().lower(),
 			"interval": float(storedItem.get("interval", 0.0) or 0.0),
 			"actions": actions,
 			"gestures": [gesture] if gesture else [],
+			"enabled": storedItem.get("enabled", True) is not False,
+			"layer": storedItem.get("layer", "") or "",
+			"schedule": copy.deepcopy(storedItem.get("schedule")),
 		}
 
 	def _buildStoredAction(self, action):
@@ -135,12 +504,16 @@ class ConfigManager:
 				"keys": action.get("path", ""),
 				"pressDelay": pressDelay,
 			}
+		elif itemType == "RunItem":
+			data = {"item": (action.get("path", "") or "").strip()}
 		else:
 			# Defensive fallback — TYPE_SECTIONS guard above should prevent reaching here.
 			data = {}
 		return {"type": itemType, "data": data, "delay": delay}
 
-	def _buildStoredItem(self, name, gesture, actions, interval=0.0, appName=""):
+	def _buildStoredItem(
+		self, name, gesture, actions, interval=0.0, appName="", enabled=True, layer="", schedule=None
+	):
 		"""Build a stored item from public-facing item data."""
 		try:
 			interval = float(interval)
@@ -151,18 +524,25 @@ class ConfigManager:
 		storedActions = [self._buildStoredAction(action) for action in actions]
 		item = {
 			"name": name,
-			"gesture": (gesture or "").strip().lower(),
+			"gesture": normalizeGestureSequence(gesture),
 			"interval": interval,
 			"actions": storedActions,
 		}
 		normalizedAppName = (appName or "").strip().lower()
 		if normalizedAppName:
 			item["appName"] = normalizedAppName
+		if not enabled:
+			item["enabled"] = False
+		if (layer or "").strip():
+			item["layer"] = layer.strip()
+		schedule = normalizeSchedule(schedule)
+		if schedule:
+			item["schedule"] = schedule
 		return item
 
 	def getItems(self):
 		"""Get all configured items."""
-		config = self.loadOrCreateConfig()
+		config = self._readConfig()
 		items = []
 		for storedItem in config.get("items", []):
 			try:
@@ -171,6 +551,20 @@ class ConfigManager:
 				log.error("Error converting item to public format: %s", e)
 		return items
 
+	def getItemIndex(self):
+		"""Return an ItemIndex of the committed items, rebuilt only when the generation changes."""
+		with self._lock:
+			self._getCommittedConfig()
+			if self._itemIndex is None or self._itemIndex.generation != self.generation:
+				items = []
+				for storedItem in self._config.get("items", []):
+					try:
+						items.append(self._toPublicItem(storedItem))
+					except Exception as e:
+						log.error("Error converting item to public format: %s", e)
+				self._itemIndex = ItemIndex(items, self.generation)
+			return self._itemIndex
+
 	def getAllNames(self):
 		"""Get all configured item names."""
 		return {item.get("name", "") for item in self.getItems()}
@@ -181,53 +575,269 @@ class ConfigManager:
 		for item in self.getItems():
 			name = item.get("name", "")
 			for gesture in item.get("gestures", []):
-				normalized = (gesture or "").strip().lower()
+				normalized = normalizeGestureSequence(gesture)
 				if normalized and normalized not in gestureMap:
 					gestureMap[normalized] = name
 		return gestureMap
 
-	def findGestureConflict(self, gesture, appName="", excludeName=""):
-		"""Find if a gesture conflicts with an existing item."""
-		normalizedGesture = (gesture or "").strip().lower()
+	def getGestureConflicts(self):
+		"""Return the names of enabled items sharing a gesture in the same app, one list per conflict."""
+		groups = {}
+		for item in self.getItems():
+			if not item.get("enabled", True):
+				continue
+			itemAppName = (item.get("appName", "") or "").strip().lower()
+			for gesture in item.get("gestures", []):
+				key = (item.get("layer", ""), normalizeGestureSequence(gesture), itemAppName)
+				groups.setdefault(key, []).append(item.get("name", ""))
+		return [names for names in groups.values() if len(names) > 1]
+
+	def getPrefixCollisions(self):
+		"""Return [shorterName, longerName] for every enabled item sequence that starts another one.
+
+		The longer sequence still works, but the shorter one only runs after the sequence timeout.
+		"""
+		itemsByLayer = {}
+		for item in self.getItems():
+			itemsByLayer.setdefault(item.get("layer", ""), []).append(item)
+		collisions = []
+		for layerItems in itemsByLayer.values():
+			trie = GestureTrie(layerItems)
+			collisions.extend(
+				[shorterItem.get("name", ""), longerItem.get("name", "")]
+				for shorterItem, longerItem in trie.iterPrefixCollisions()
+			)
+		return collisions
+
+	def findGestureConflict(self, gesture, appName="", excludeName="", layer=""):
+		"""Find if a gesture conflicts with an existing item of the same layer."""
+		normalizedGesture = normalizeGestureSequence(gesture)
 		normalizedAppName = (appName or "").strip().lower()
 		if not normalizedGesture:
 			return None
 		for item in self.getItems():
 			if excludeName and item.get("name", "") == excludeName:
 				continue
+			if item.get("layer", "") != layer:
+				continue
 			itemAppName = (item.get("appName", "") or "").strip().lower()
 			for itemGesture in item.get("gestures", []):
-				if (itemGesture or "").strip().lower() != normalizedGesture:
+				if normalizeGestureSequence(itemGesture) != normalizedGesture:
 					continue
 				if itemAppName == normalizedAppName:
 					return item
 		return None
 
-	def addItem(self, name, gesture, actions, interval=0.0, appName=""):
-		"""Add a new item to the configuration."""
-		config = self.loadOrCreateConfig()
-		items = [item for item in config.get("items", []) if item.get("name", "") != name]
-		items.append(self._buildStoredItem(name=name, gesture=gesture, actions=actions, interval=interval, appName=appName))
-		config["items"] = items
-		self.saveConfig(config)
+	def addItem(self, name, gesture, actions, interval=0.0, appName="", enabled=True, layer="", schedule=None):
+		"""Add a new item to the configuration and return it in public format."""
+		storedItem = self._buildStoredItem(
+			name=name,
+			gesture=gesture,
+			actions=actions,
+			interval=interval,
+			appName=appName,
+			enabled=enabled,
+			layer=layer,
+			schedule=schedule,
+		)
+		# Translators: Undo history description of adding an item. {name} is the item name.
+		with self.transaction(_("add {name}").format(name=name)) as config:
+			items = [item for item in config.get("items", []) if item.get("name", "") != name]
+			items.append(storedItem)
+			config["items"] = items
+		return self._toPublicItem(storedItem)
 
-	def updateItem(self, oldName, name, gesture, actions, interval=0.0, appName=""):
-		"""Update an existing item in the configuration."""
-		config = self.loadOrCreateConfig()
-		items = [item for item in config.get("items", []) if item.get("name", "") not in (oldName, name)]
-		items.append(self._buildStoredItem(name=name, gesture=gesture, actions=actions, interval=interval, appName=appName))
-		config["items"] = items
-		self.saveConfig(config)
+	def updateItem(
+		self, oldName, name, gesture, actions, interval=0.0, appName="", enabled=True, layer="", schedule=None
+	):
+		"""Update an existing item in place and return it in public format."""
+		storedItem = self._buildStoredItem(
+			name=name,
+			gesture=gesture,
+			actions=actions,
+			interval=interval,
+			appName=appName,
+			enabled=enabled,
+			layer=layer,
+			schedule=schedule,
+		)
+		# Translators: Undo history description of editing an item. {name} is the item name.
+		with self.transaction(_("edit {name}").format(name=name)) as config:
+			items = []
+			replaced = False
+			for item in config.get("items", []):
+				itemName = item.get("name", "")
+				if itemName == oldName and not replaced:
+					items.append(storedItem)
+					replaced = True
+				elif itemName not in (oldName, name):
+					items.append(item)
+			if not replaced:
+				items.append(storedItem)
+			if name != oldName:
+				# Items that run the renamed item keep running it.
+				for item in items:
+					for action in item.get("actions", []):
+						if action.get("type", "") == "RunItem" and action.get("data", {}).get("item") == oldName:
+							action["data"]["item"] = name
+			config["items"] = items
+		return self._toPublicItem(storedItem)
 
 	def deleteItem(self, name):
 		"""Delete an item from the configuration."""
+		self.deleteItems([name])
+
+	def deleteItems(self, names):
+		"""Delete several items with a single configuration write."""
+		names = set(names)
+		if len(names) == 1:
+			# Translators: Undo history description of deleting an item. {name} is the item name.
+			description = _("delete {name}").format(name=next(iter(names)))
+		else:
+			# Translators: Undo history description of deleting several items.
+			description = _("delete items")
+		with self.transaction(description) as config:
+			config["items"] = [item for item in config.get("items", []) if item.get("name", "") not in names]
+
+	def _modifyItems(self, names, modifier, description):
+		"""Apply modifier to each named stored item in one transaction.
+
+		Returns the modified items in public format, in configuration order.
+		"""
+		names = set(names)
+		modified = []
+		with self.transaction(description) as config:
+			for item in config.get("items", []):
+				if item.get("name", "") in names:
+					modifier(item)
+					modified.append(item)
+		return [self._toPublicItem(item) for item in modified]
+
+	def duplicateItems(self, names):
+		"""Append a disabled copy of each named item and return the copies in public format.
+
+		Copies start disabled because they share the original's gesture.
+		"""
+		names = set(names)
+		copies = []
+		# Translators: Undo history description of duplicating items.
+		with self.transaction(_("duplicate items")) as config:
+			items = config.get("items", [])
+			usedNames = {item.get("name", "") for item in items}
+			for item in items:
+				name = item.get("name", "")
+				if name not in names:
+					continue
+				# Translators: Name given to a duplicated item. {name} is the original item name.
+				copyName = _("{name} (copy)").format(name=name)
+				counter = 2
+				while copyName in usedNames:
+					# Translators: Name given to a further duplicate of an item. {name} is the original item name.
+					copyName = _("{name} (copy {number})").format(name=name, number=counter)
+					counter += 1
+				usedNames.add(copyName)
+				itemCopy = copy.deepcopy(item)
+				itemCopy["name"] = copyName
+				itemCopy["enabled"] = False
+				copies.append(itemCopy)
+			config["items"] = items + copies
+		return [self._toPublicItem(item) for item in copies]
+
+	def setItemsAppName(self, names, appName):
+		"""Restrict the named items to an app, or make them global when appName is empty."""
+		normalizedAppName = (appName or "").strip().lower()
+
+		def modifier(item):
+			if normalizedAppName:
+				item["appName"] = normalizedAppName
+			else:
+				item.pop("appName", None)
+
+		# Translators: Undo history description of changing the app restriction of items.
+		return self._modifyItems(names, modifier, _("change app restriction"))
+
+	def shiftItemsDelays(self, names, offset):
+		"""Add offset seconds to the delay of every action of the named items, never going below zero."""
+
+		def modifier(item):
+			for action in item.get("actions", []):
+				try:
+					delay = float(action.get("delay", 0.0) or 0.0)
+				except (ValueError, TypeError):
+					delay = 0.0
+				action["delay"] = max(0.0, delay + offset)
+
+		# Translators: Undo history description of shifting the action delays of items.
+		return self._modifyItems(names, modifier, _("shift delays"))
+
+	def setItemsEnabled(self, names, enabled):
+		"""Enable or disable the named items."""
+
+		def modifier(item):
+			if enabled:
+				item.pop("enabled", None)
+			else:
+				item["enabled"] = False
+
+		if enabled:
+			# Translators: Undo history description of enabling items.
+			description = _("enable items")
+		else:
+			# Translators: Undo history description of disabling items.
+			description = _("disable items")
+		return self._modifyItems(names, modifier, description)
+
+	def setItemsLayer(self, names, layer):
+		"""Move the named items to a layer, or to the default layer when layer is empty."""
+		layer = (layer or "").strip()
+
+		def modifier(item):
+			if layer:
+				item["layer"] = layer
+			else:
+				item.pop("layer", None)
+
+		# Translators: Undo history description of moving items to another layer.
+		return self._modifyItems(names, modifier, _("move to layer"))
+
+	def getLayers(self):
+		"""Return the named layers as a list of {"name", "gesture"} dictionaries.
+
+		The default layer, toggled by the add-on's own gesture, is not part of the list.
+		"""
+		return [dict(layer) for layer in self._readConfig().get("layers", [])]
+
+	def setLayers(self, layers, renames=None):
+		"""Replace the named layers.
+
+		renames maps old layer names to new ones so their items follow; items of a layer that
+		is no longer listed move to the default layer.
+		"""
+		renames = renames or {}
+		# Translators: Undo history description of editing the list of layers.
+		with self.transaction(_("edit layers")) as config:
+			config["layers"] = [
+				{"name": (layer.get("name", "") or "").strip(), "gesture": normalizeGesture(layer.get("gesture", ""))}
+				for layer in layers
+			]
+			layerNames = {layer["name"] for layer in config["layers"]}
+			for item in config.get("items", []):
+				layer = renames.get(item.get("layer", ""), item.get("layer", ""))
+				if layer and layer in layerNames:
+					item["layer"] = layer
+				else:
+					item.pop("layer", None)
+
+	def exportItems(self, names, destinationPath):
+		"""Write the named items, with the current settings, to a separate configuration file."""
+		names = set(names)
 		config = self.loadOrCreateConfig()
-		config["items"] = [item for item in config.get("items", []) if item.get("name", "") != name]
-		self.saveConfig(config)
+		config["items"] = [item for item in config.get("items", []) if item.get("name", "") in names]
+		saveConfig(destinationPath, config)
 
 	def getVerbosityLevel(self):
 		"""Get the current verbosity level setting."""
-		config = self.loadOrCreateConfig()
+		config = self._readConfig()
 		settings = config.get("settings", {})
 		value = (settings.get("verbosity", VERBOSITY_VALUES[0]) or "").strip().lower()
 		if value not in VERBOSITY_VALUES:
@@ -236,10 +846,10 @@ class ConfigManager:
 
 	def setVerbosityLevel(self, value):
 		"""Set the verbosity level setting."""
-		config = self.loadOrCreateConfig()
 		value = (value or "").strip().lower()
 		if value not in VERBOSITY_VALUES:
 			value = VERBOSITY_VALUES[0]
-		config.setdefault("settings", {})
-		config["settings"]["verbosity"] = value
-		self.saveConfig(config)
+		# Translators: Undo history description of changing the verbosity level.
+		with self.transaction(_("change verbosity")) as config:
+			config.setdefault("settings", {})
+			config["settings"]["verbosity"] = value
@@ -19,7 +19,7 @@ CONFIG_SECTIONS = [
 	"Settings",
 ]
 
-TYPE_SECTIONS = ["Websites", "Programs", "Folders", "Files", "NvdaCommands", "TextSnippets", "Keystrokes"]
+TYPE_SECTIONS = ["Websites", "Programs", "Folders", "Files", "NvdaCommands", "TextSnippets", "Keystrokes", "RunItem"]
 
 # Translators: Item types for instant Access entries.
 TYPE_LABELS = [
@@ -30,6 +30,7 @@ TYPE_LABELS = [
 	_("NVDA command"),
 	_("Text snippet"),
 	_("Keystrokes"),
+	_("Run item"),
 ]
 
 TYPE_TO_LABEL = dict(zip(TYPE_SECTIONS, TYPE_LABELS))
@@ -43,6 +44,9 @@ TEXT_SNIPPET_ACTION_TO_LABEL = dict(zip(TEXT_SNIPPET_ACTION_VALUES, TEXT_SNIPPET
 
 RESERVED_GESTURES = {"kb:escape", "kb:nvda+e", "kb:nvda+shift+e"}
 
+# How long instant mode waits for the next key of a gesture sequence before giving up.
+SEQUENCE_TIMEOUT_MS = 1500
+
 # Translators: Category name for the instant Access add-on.
 CATEGORY_LABEL = _("instant Access")
 
@@ -52,12 +56,18 @@ TOGGLE_DESCRIPTION = _("Toggle instant Access mode.")
 # Translators: Description for reporting the currently focused application name.
 REPORT_APP_NAME_DESCRIPTION = _("Report current app name.")
 
+# Translators: Description for the command searching instant Access items by name.
+SEARCH_DESCRIPTION = _("Search instant Access items by name.")
+
 # Translators: Caption for error message dialogs.
 ERROR_CAPTION = _("Error")
 
 # Translators: Caption for confirmation dialogs.
 CONFIRM_CAPTION = _("Confirm")
 
+# Translators: Caption for warning message dialogs.
+WARNING_CAPTION = _("Warning")
+
 ALL_FILES_WILDCARD = "All files (*.*)|*.*"
 
 # Translators: Label for beginner verbosity level.
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+from .gestures import splitGestureSequence
+from .search_index import SearchIndex
+
+# How many ranked matches a type-to-search keeps for moving through with the arrow keys.
+SEARCH_MATCH_LIMIT = 20
+
+_WORD_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def _getAppName(item):
+	return (item.get("appName", "") or "").strip().lower()
+
+
+def _sharesScope(first, second):
+	"""Return True when two items can be active in the same app."""
+	firstAppName = _getAppName(first)
+	secondAppName = _getAppName(second)
+	return not firstAppName or not secondAppName or firstAppName == secondAppName
+
+
+def _getInitials(name):
+	return "".join(word[0] for word in _WORD_SEPARATORS.split(name) if word)
+
+
+def selectItemForApp(items, appName, rank=None):
+	"""Pick the item to run in appName: one restricted to that app first, then a global one.
+
+	rank, if given, is called with an item name; among items of the same scope the highest
+	ranked one wins, and the first one on a tie.
+	"""
+	appItems = [item for item in items if _getAppName(item) and _getAppName(item) == appName]
+	candidates = appItems or [item for item in items if not _getAppName(item)]
+	if not candidates:
+		return None
+	if rank is None or len(candidates) == 1:
+		return candidates[0]
+	return max(candidates, key=lambda item: rank(item.get("name", "")))
+
+
+class GestureTrieNode:
+	"""One step of a gesture sequence: the items ending here and the steps that may follow."""
+
+	__slots__ = ("children", "items")
+
+	def __init__(self):
+		self.children = {}
+		self.items = []
+
+
+class GestureTrie:
+	"""A prefix trie over the gesture sequences of enabled items.
+
+	Steps are canonical gesture identifiers, so following a sequence costs one dictionary
+	lookup per key, whatever the number of items.
+	"""
+
+	def __init__(self, items=()):
+		self.root = GestureTrieNode()
+		self.itemCount = 0
+		for item in items:
+			self.addItem(item)
+
+	def addItem(self, item):
+		if not item.get("enabled", True):
+			return
+		added = False
+		for sequence in item.get("gestures", []):
+			steps = splitGestureSequence(sequence)
+			if not steps:
+				continue
+			node = self.root
+			for step in steps:
+				child = node.children.get(step)
+				if child is None:
+					child = node.children[step] = GestureTrieNode()
+				node = child
+			node.items.append(item)
+			added = True
+		if added:
+			self.itemCount += 1
+
+	def findNode(self, steps):
+		node = self.root
+		for step in steps:
+			node = node.children.get(step)
+			if node is None:
+				return None
+		return node
+
+	def findPrefixCollisions(self, sequence, appName="", excludeName=""):
+		"""Return the items whose sequence is a proper prefix of sequence, or starts with it.
+
+		Only items that can be active together with an item restricted to appName count.
+		"""
+		probe = {"appName": appName}
+		collisions = []
+		steps = splitGestureSequence(sequence)
+		node = self.root
+		for step in steps[:-1]:
+			node = node.children.get(step)
+			if node is None:
+				break
+			collisions.extend(node.items)
+		else:
+			node = node.children.get(steps[-1]) if steps else None
+			pending = list(node.children.values()) if node is not None else []
+			while pending:
+				descendant = pending.pop()
+				collisions.extend(descendant.items)
+				pending.extend(descendant.children.values())
+		return [
+			item
+			for item in collisions
+			if item.get("name", "") != excludeName and _sharesScope(item, probe)
+		]
+
+	def iterPrefixCollisions(self):
+		"""Yield (shorterItem, longerItem) for every item sequence that starts another one."""
+		pending = [(self.root, ())]
+		while pending:
+			node, ancestorItems = pending.pop()
+			for item in node.items:
+				for shorterItem in ancestorItems:
+					if _sharesScope(shorterItem, item):
+						yield shorterItem, item
+			if node.items:
+				ancestorItems = ancestorItems + tuple(node.items)
+			for child in node.children.values():
+				pending.append((child, ancestorItems))
+
+
+class CompiledLayer:
+	"""The dispatch table of one instant layer, compiled once per configuration generation.
+
+	Holds the trie of the layer's items and, per trie node, the map of the keys that may
+	follow it to scriptName, so entering a node only swaps in an existing binding map.
+	The name index used by type-to-search is only built the first time it is needed.
+	"""
+
+	def __init__(self, name, items, generation, scriptName):
+		self.name = name
+		self.generation = generation
+		self.scriptName = scriptName
+		self.items = [
+			item
+			for item in items
+			if (item.get("layer", "") or "") == name and item.get("enabled", True)
+		]
+		self.trie = GestureTrie(self.items)
+		self._bindings = {}
+		self._searchIndex = None
+		self._appDocIds = {}
+
+	def getBindings(self, node):
+		bindings = self._bindings.get(node)
+		if bindings is None:
+			bindings = self._bindings[node] = {gesture: self.scriptName for gesture in node.children}
+		return bindings
+
+	def getSearchIndex(self):
+		"""Return the index of item names and initials, whose document ids are positions in items."""
+		if self._searchIndex is None:
+			documents = []
+			for docId, item in enumerate(self.items):
+				name = item.get("name", "") or ""
+				documents.append({"name": name, "initials": _getInitials(name)})
+				appName = _getAppName(item)
+				if appName:
+					self._appDocIds.setdefault(appName, set()).add(docId)
+			self._searchIndex = SearchIndex(documents)
+		return self._searchIndex
+
+	def getDocBoosts(self, boosts):
+		"""Turn a map of item names to bonuses into a map of search ids to bonuses."""
+		docBoosts = {}
+		for docId, item in enumerate(self.items):
+			bonus = boosts.get(item.get("name", ""))
+			if bonus:
+				docBoosts[docId] = bonus
+		return docBoosts
+
+	def getExcludedDocIds(self, appName):
+		"""Return the search ids of the items restricted to apps other than appName."""
+		self.getSearchIndex()
+		excluded = set()
+		for restrictedApp, docIds in self._appDocIds.items():
+			if restrictedApp != appName:
+				excluded |= docIds
+		return excluded
+
+
+class SearchSession:
+	"""One type-to-search within a layer: the query typed so far and its ranked matches.
+
+	boosts maps item names to the bonus added to their match score.
+	"""
+
+	def __init__(self, compiledLayer, appName, boosts=None):
+		self.compiledLayer = compiledLayer
+		self.index = compiledLayer.getSearchIndex()
+		self.excluded = compiledLayer.getExcludedDocIds(appName)
+		# Resolved once, so ranking a keystroke's matches costs one lookup per match.
+		self._docBoosts = compiledLayer.getDocBoosts(boosts or {})
+		self.query = ""
+		self.matches = []
+		self.position = 0
+
+	@property
+	def current(self):
+		if not self.matches:
+			return None
+		return self.matches[self.position]
+
+	def setQuery(self, query):
+		"""Search again for query and return the best match, or None."""
+		self.query = query
+		self.position = 0
+		if not query.strip():
+			self.matches = []
+			return None
+		items = self.compiledLayer.items
+		boost = None
+		if self._docBoosts:
+			docBoosts = self._docBoosts
+			boost = lambda docId: docBoosts.get(docId, 0.0)
+		docIds = self.index.search(query, boost=boost, limit=SEARCH_MATCH_LIMIT, exclude=self.excluded)
+		self.matches = [items[docId] for docId in docIds]
+		return self.current
+
+	def move(self, offset):
+		"""Move through the matches, wrapping around, and return the new current one."""
+		if self.matches:
+			self.position = (self.position + offset) % len(self.matches)
+		return self.current
+
+
+def getReferencedNames(item):
+	"""Return the names of the items that the "run item" actions of item call, in order."""
+	return [action.get("path", "") for action in item.get("actions", []) if action.get("type", "") == "RunItem"]
+
+
+def findReferenceCycle(references, start):
+	"""Return the names along a cycle of item references through start, beginning and ending with it, or None.
+
+	references maps each item name to the names of the items it runs. Cycles elsewhere are
+	ignored, so a change can be checked without tripping over a cycle the configuration
+	already had.
+	"""
+	path = [start]
+	seen = {start}
+	stack = [iter(references.get(start, ()))]
+	while stack:
+		name = next(stack[-1], None)
+		if name is None:
+			stack.pop()
+			path.pop()
+			continue
+		if name == start:
+			return path + [name]
+		if name in seen or name not in references:
+			continue
+		seen.add(name)
+		path.append(name)
+		stack.append(iter(references[name]))
+	return None
+
+
+def buildExecutionPlans(items):
+	"""Return every item by name with its "run item" actions replaced by the actions they run.
+
+	A plan is the item with a flat action list and no interval: the intervals and delays of
+	the nested items are folded into the delay of each action, so running a plan never looks
+	another item up. Calls to missing items, and calls closing a cycle in a configuration
+	edited by hand, are kept as they are for the executor to report.
+	"""
+	itemsByName = {}
+	for item in items:
+		itemsByName.setdefault(item.get("name", ""), item)
+	steps = {}
+	flattening = set()
+
+	def flatten(name):
+		if name in steps:
+			return steps[name]
+		flattening.add(name)
+		item = itemsByName[name]
+		try:
+			interval = max(0.0, float(item.get("interval", 0.0) or 0.0))
+		except (ValueError, TypeError):
+			interval = 0.0
+		actions = item.get("actions", [])
+		result = []
+		# Waiting time not yet attached to an action: it goes before the next one that runs.
+		pending = 0.0
+		for index, action in enumerate(actions):
+			try:
+				pending += max(0.0, float(action.get("delay", 0.0) or 0.0))
+			except (ValueError, TypeError):
+				pass
+			target = action.get("path", "")
+			if action.get("type", "") == "RunItem" and target in itemsByName and target not in flattening:
+				nested = flatten(target)
+				if nested:
+					result.append((pending + nested[0][0], nested[0][1]))
+					result.extend(nested[1:])
+					pending = 0.0
+			else:
+				result.append((pending, action))
+				pending = 0.0
+			if index < len(actions) - 1:
+				pending += interval
+		flattening.discard(name)
+		steps[name] = result
+		return result
+
+	plans = {}
+	for name, item in itemsByName.items():
+		plan = dict(item)
+		plan["interval"] = 0.0
+		plan["actions"] = [dict(action, delay=delay) for delay, action in flatten(name)]
+		plans[name] = plan
+	return plans
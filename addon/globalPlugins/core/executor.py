@@ -11,6 +11,7 @@ import webbrowser
 import wx
 
 from .nvda_commands import executeNvdaCommand
+from .path_cache import pathCache
 
 addonHandler.initTranslation()
 
@@ -23,13 +24,6 @@ except Exception:
 log = logging.getLogger(__name__)
 
 
-def expandPath(rawPath):
-	"""Expand environment variables and user home directory in a path."""
-	if not rawPath:
-		return rawPath
-	return os.path.expandvars(os.path.expanduser(rawPath))
-
-
 def queueMessage(message):
 	"""Queue a message to be displayed on the main thread."""
 	if message:
@@ -50,7 +44,7 @@ def _setClipboardText(text):
 
 
 def _executeTextSnippet(path, action, typingDelay=0.05):
-	"""Execute a text snippet action (type, copy, or paste)."""
+	"""Execute a text snippet action (type, copy, or paste) and return True on success."""
 	text = path or ""
 	action = (action or "type").strip().lower()
 	try:
@@ -61,35 +55,39 @@ def _executeTextSnippet(path, action, typingDelay=0.05):
 		typingDelay = 0.05
 	if not text:
 		queueMessage(_("Error: Text snippet is empty"))
-		return
+		return False
 
 	if action == "copy":
 		if not _setClipboardText(text):
 			queueMessage(_("Error: Could not copy text snippet"))
-		return
+			return False
+		return True
 
 	if action == "paste":
 		if not _setClipboardText(text):
 			queueMessage(_("Error: Could not copy text snippet"))
-			return
+			return False
 		if keyboard is None:
 			queueMessage(_("Error: Keyboard library is not available"))
-			return
+			return False
 		try:
 			keyboard.send("ctrl+v")
 		except Exception as e:
 			log.error("Error pasting text snippet: %s", e)
 			queueMessage(_("Error: Could not paste text snippet"))
-		return
+			return False
+		return True
 
 	if keyboard is None:
 		queueMessage(_("Error: Keyboard library is not available"))
-		return
+		return False
 	try:
 		keyboard.write(text, delay=typingDelay)
 	except Exception as e:
 		log.error("Error typing text snippet: %s", e)
 		queueMessage(_("Error: Could not type text snippet"))
+		return False
+	return True
 
 
 def _parseKeystrokeLine(raw_line):
@@ -117,7 +115,7 @@ def _parseKeystrokeLine(raw_line):
 def _sendKeystrokeSequence(keys_text, press_delay):
 	"""Send each line in keys_text as a keyboard hotkey, repeating if a count suffix is given.
 
-	Stops on the first send failure and notifies the user via NVDA speech.
+	Stops on the first send failure and notifies the user via NVDA speech; returns False then.
 	Caller is responsible for checking keyboard availability and empty input.
 	"""
 	lines = keys_text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
@@ -126,7 +124,7 @@ def _sendKeystrokeSequence(keys_text, press_delay):
 		if not line or line.startswith("#"):
 			continue
 		hotkey, count = _parseKeystrokeLine(line)
-		for _ in range(count):
+		for repeat in range(count):
 			try:
 				keyboard.send(hotkey)
 			except Exception as e:
@@ -134,18 +132,19 @@ def _sendKeystrokeSequence(keys_text, press_delay):
 				queueMessage(
 					_("Error: Could not send keystroke: {key}").format(key=hotkey)
 				)
-				return
+				return False
 			if press_delay > 0:
 				time.sleep(press_delay)
+	return True
 
 
 def executeInstantAction(itemType, path, arguments="", textAction="type", typingDelay=0.05, press_delay=0.05):
-	"""Execute a single instant action based on its type."""
+	"""Execute a single instant action based on its type and return True on success."""
 	if itemType == "Websites":
 		url = (path or "").strip()
 		if not url:
 			queueMessage(_("Error: URL is empty"))
-			return
+			return False
 		if not url.lower().startswith(("http://", "https://")):
 			url = "https://" + url
 		try:
@@ -153,32 +152,60 @@ def executeInstantAction(itemType, path, arguments="", textAction="type", typing
 		except Exception as e:
 			log.error("Error opening website: %s", e)
 			queueMessage(_("Error: Could not open the website"))
-		return
+			return False
+		return True
 
 	if itemType == "NvdaCommands":
 		wx.CallAfter(executeNvdaCommand, (path or "").strip())
-		return
+		return True
 
 	if itemType == "TextSnippets":
-		_executeTextSnippet(path, textAction, typingDelay=typingDelay)
-		return
+		return _executeTextSnippet(path, textAction, typingDelay=typingDelay)
 
 	if itemType == "Keystrokes":
 		if keyboard is None:
 			queueMessage(_("Error: Keyboard library is not available"))
-			return
+			return False
 		keys_text = (path or "").strip()
 		if not keys_text:
 			queueMessage(_("Error: Keystrokes field is empty"))
-			return
-		_sendKeystrokeSequence(keys_text, press_delay)
-		return
-
-	resolvedPath = expandPath(path or "")
-	if not resolvedPath or not os.path.exists(resolvedPath):
+			return False
+		return _sendKeystrokeSequence(keys_text, press_delay)
+
+	if itemType == "RunItem":
+		# Execution plans replace calls to existing items by their actions, so only calls to
+		# missing items (or ones closing a cycle) get here.
+		# Translators: Reported when an item runs another item that is missing or runs it back. {name} is the item's name.
+		queueMessage(_("Error: Could not run the item {name}").format(name=(path or "").strip()))
+		return False
+
+	rawPath = path or ""
+	resolvedPath = pathCache.resolve(rawPath)
+	if not resolvedPath:
 		queueMessage(_("Error: File not found"))
-		return
+		return False
+	errorMessage = _launchPath(itemType, resolvedPath, arguments)
+	if errorMessage is None:
+		return True
+	# The cached resolution may be stale, so re-check synchronously before reporting the failure.
+	pathCache.invalidate(rawPath)
+	freshPath = pathCache.resolve(rawPath)
+	if not freshPath:
+		queueMessage(_("Error: File not found"))
+		return False
+	if freshPath != resolvedPath:
+		errorMessage = _launchPath(itemType, freshPath, arguments)
+		if errorMessage is None:
+			return True
+	queueMessage(errorMessage)
+	return False
 
+
+def _launchPath(itemType, resolvedPath, arguments=""):
+	"""Open a resolved program, folder or file path.
+
+	Returns None on success, or the error message to report.
+	"""
 	if itemType == "Folders":
 		try:
 			os.startfile(resolvedPath)
@@ -192,23 +219,23 @@ def executeInstantAction(itemType, path, arguments="", textAction="type", typing
 					else:
 						subprocess.Popen(['xdg-open', resolvedPath])
 				else:
-					queueMessage(_("Error: Could not open the item"))
+					return _("Error: Could not open the item")
 			except Exception as e:
 				log.error("Error opening folder: %s", e)
-				queueMessage(_("Error: Could not open the item"))
+				return _("Error: Could not open the item")
 		except Exception as e:
 			log.error("Error opening folder: %s", e)
-			queueMessage(_("Error: Could not open the item"))
-		return
+			return _("Error: Could not open the item")
+		return None
 
 	if itemType == "Files":
 		try:
 			if not wx.LaunchDefaultApplication(resolvedPath):
-				queueMessage(_("Error: Could not open the file"))
+				return _("Error: Could not open the file")
 		except Exception as e:
 			log.error("Error opening file: %s", e)
-			queueMessage(_("Error: Could not open the file"))
-		return
+			return _("Error: Could not open the file")
+		return None
 
 	if itemType == "Programs":
 		try:
@@ -221,13 +248,18 @@ def executeInstantAction(itemType, path, arguments="", textAction="type", typing
 				subprocess.Popen([resolvedPath], cwd=workingDir)
 		except Exception as e:
 			log.error("Error starting program: %s", e)
-			queueMessage(_("Error: Could not start the program"))
+			return _("Error: Could not start the program")
+	return None
 
 
 def executeInstantItem(item):
-	"""Execute all actions within an instant item."""
+	"""Execute all actions within an instant item.
+
+	Returns True when every action succeeded; later actions still run after a failure.
+	"""
 	if not item:
-		return
+		return False
+	succeeded = True
 	actions = item.get("actions", [])
 	try:
 		interval = float(item.get("interval", 0.0) or 0.0)
@@ -242,13 +274,15 @@ def executeInstantItem(item):
 			delay = 0.0
 		if delay > 0:
 			time.sleep(delay)
-		executeInstantAction(
+		if not executeInstantAction(
 			itemType=action.get("type", ""),
 			path=action.get("path", ""),
 			arguments=action.get("arguments", ""),
 			textAction=action.get("textAction", "type"),
 			typingDelay=action.get("typingDelay", 0.05),
 			press_delay=action.get("pressDelay", 0.05),
-		)
+		):
+			succeeded = False
 		if index < len(actions) - 1 and interval > 0:
 			time.sleep(interval)
+	return succeeded
@@ -1,48 +1,103 @@
 # -*- coding: utf-8 -*-
 
+from functools import lru_cache
+import sys
+
 import keyboardHandler
 import wx
 
 
+SEQUENCE_SEPARATOR = " "
+
+
 def formatGestureForDisplay(gesture):
 	if not gesture:
 		return ""
 	gesture = gesture.strip()
+	steps = gesture.split()
+	if len(steps) > 1:
+		return ", ".join(formatGestureForDisplay(step) for step in steps)
 	if gesture.lower().startswith("kb:"):
 		return gesture[3:]
 	return gesture
 
 
+_MODIFIER_ALIASES = {
+	"ctrl": "control",
+	"leftctrl": "leftcontrol",
+	"rightctrl": "rightcontrol",
+	"win": "windows",
+	"leftwin": "leftwindows",
+	"rightwin": "rightwindows",
+}
+
+# Modifiers come first, in the order NVDA uses when it names gestures; other keys follow.
+_MODIFIER_RANKS = {
+	"nvda": 0,
+	"control": 1,
+	"leftcontrol": 1,
+	"rightcontrol": 1,
+	"alt": 2,
+	"leftalt": 2,
+	"rightalt": 2,
+	"shift": 3,
+	"leftshift": 3,
+	"rightshift": 3,
+	"windows": 4,
+	"leftwindows": 4,
+	"rightwindows": 4,
+}
+_KEY_RANK = len(set(_MODIFIER_RANKS.values()))
+
+
+@lru_cache(maxsize=1024)
+def canonicalizeGesture(gestureId):
+	"""Return the canonical, interned form of a gesture identifier.
+
+	The result is lowercase, drops any keyboard layout ("kb(laptop):" becomes "kb:"),
+	resolves modifier aliases such as ctrl and win, and lists modifiers in a fixed order,
+	so every spelling of the same key combination yields the same string.
+	"""
+	gestureId = (gestureId or "").strip().lower()
+	if not gestureId:
+		return ""
+	prefix, separator, main = gestureId.partition(":")
+	if not separator:
+		prefix, main = "", gestureId
+	if prefix.startswith("kb("):
+		prefix = "kb"
+	parts = [_MODIFIER_ALIASES.get(part, part) for part in main.split("+") if part]
+	parts.sort(key=lambda part: (_MODIFIER_RANKS.get(part, _KEY_RANK), part))
+	main = "+".join(parts)
+	if not main:
+		return ""
+	return sys.intern(prefix + separator + main)
+
+
 def normalizeGesture(gesture):
+	"""Return the canonical keyboard gesture for a name such as "control+a" or "kb:ctrl+a"."""
 	if not gesture:
 		return ""
 	gesture = gesture.strip()
-	if gesture.lower().startswith("kb:"):
-		gesture = gesture[3:]
-	gesture = gesture.strip()
-	if not gesture:
-		return ""
-	return "kb:" + gesture.lower()
+	if not gesture.lower().startswith(("kb:", "kb(")):
+		gesture = "kb:" + gesture
+	return canonicalizeGesture(gesture)
 
 
-def normalizeGestureIdentifier(gestureId):
-	if not gestureId:
-		return ""
-	gestureId = gestureId.strip().lower()
-	if gestureId.startswith("kb("):
-		closeIndex = gestureId.find("):")
-		if closeIndex != -1:
-			return "kb:" + gestureId[closeIndex + 2 :]
-	return gestureId
+def splitGestureSequence(sequence):
+	"""Return the canonical steps of a gesture sequence such as "kb:g kb:m"."""
+	steps = (normalizeGesture(part) for part in (sequence or "").split())
+	return tuple(step for step in steps if step)
 
 
-def expandGestureLayouts(gesture):
-	gesture = (gesture or "").strip()
-	if not gesture:
-		return []
-	if gesture.lower().startswith("kb:"):
-		return [gesture, "kb(laptop):" + gesture[3:]]
-	return [gesture]
+def normalizeGestureSequence(sequence):
+	"""Return the canonical form of a gesture sequence; a single gesture is a one-step sequence."""
+	return SEQUENCE_SEPARATOR.join(splitGestureSequence(sequence))
+
+
+def normalizeGestureIdentifier(gestureId):
+	"""Return the canonical form of a gesture identifier reported by NVDA."""
+	return canonicalizeGesture(gestureId)
 
 
 def validateGestureName(gestureName):
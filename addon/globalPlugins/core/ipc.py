@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""Local trigger endpoint for running instant Access items from scripts.
+
+The server listens on a Unix domain socket (a named pipe on Windows) that only clients
+knowing a random key written to the user's configuration directory can talk to. Requests
+and responses are JSON objects:
+
+	{"command": "run", "name": "Notepad"}
+	{"command": "batch", "names": ["Notepad", "Mail"]}
+	{"command": "status"}
+
+This module only uses the standard library so that it also runs as a command-line client:
+
+	python ipc.py --config-dir <NVDA config>/instantAccess run Notepad
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+from multiprocessing.connection import Client, Listener
+
+try:
+	from multiprocessing import AuthenticationError
+except ImportError:
+	from multiprocessing.context import AuthenticationError
+
+log = logging.getLogger(__name__)
+
+ENDPOINT_FILE_NAME = "ipc.json"
+
+# Requests larger than this are refused unread.
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+def _getFamily():
+	return "AF_PIPE" if sys.platform == "win32" else "AF_UNIX"
+
+
+def _getAddress(family):
+	user = os.environ.get("USERNAME") or os.environ.get("USER") or str(os.getpid())
+	if family == "AF_PIPE":
+		return r"\\.\pipe\instantAccess-{user}-{pid}".format(user=user, pid=os.getpid())
+	# Socket paths are limited to about a hundred bytes, so the configuration path is not used.
+	return os.path.join(tempfile.gettempdir(), "instantAccess-{user}-{pid}.sock".format(user=user, pid=os.getpid()))
+
+
+def _writePrivateFile(path, text):
+	"""Write text to path, readable by the current user only."""
+	tempPath = path + ".tmp"
+	fileDescriptor = os.open(tempPath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+	with os.fdopen(fileDescriptor, "w", encoding="utf-8") as endpointFile:
+		endpointFile.write(text)
+	os.replace(tempPath, path)
+
+
+class IpcServer:
+	"""Serve local requests on a background thread.
+
+	handlers maps each request command to a callable taking the request dictionary and
+	returning the response dictionary. Handlers run on the connection's thread.
+	"""
+
+	def __init__(self, configDir, handlers):
+		self.configDir = configDir
+		self.handlers = dict(handlers)
+		self.family = _getFamily()
+		self.address = None
+		self._authKey = None
+		self._listener = None
+		self._thread = None
+		self._stopping = False
+
+	@property
+	def endpointPath(self):
+		return os.path.join(self.configDir, ENDPOINT_FILE_NAME)
+
+	def start(self):
+		self._authKey = os.urandom(32)
+		self.address = _getAddress(self.family)
+		if self.family == "AF_UNIX" and os.path.exists(self.address):
+			# Left behind by a process that used the same id and did not stop cleanly.
+			os.remove(self.address)
+		self._listener = Listener(self.address, family=self.family, authkey=self._authKey)
+		if self.family == "AF_UNIX":
+			os.chmod(self.address, 0o600)
+		os.makedirs(self.configDir, exist_ok=True)
+		_writePrivateFile(
+			self.endpointPath,
+			json.dumps({"family": self.family, "address": self.address, "authkey": self._authKey.hex()}),
+		)
+		self._stopping = False
+		self._thread = threading.Thread(target=self._serve, name="instantAccessIpc", daemon=True)
+		self._thread.start()
+
+	def stop(self):
+		if self._listener is None:
+			return
+		self._stopping = True
+		try:
+			# accept() is not interrupted by closing the listener on every platform.
+			Client(self.address, family=self.family, authkey=self._authKey).close()
+		except Exception:
+			pass
+		self._thread.join(timeout=2)
+		self._listener.close()
+		self._listener = None
+		try:
+			os.remove(self.endpointPath)
+		except OSError:
+			pass
+
+	def _serve(self):
+		# Only stop after accepting the connection stop() makes, which would otherwise wait forever.
+		while True:
+			try:
+				connection = self._listener.accept()
+			except AuthenticationError:
+				log.warning("Rejected an instant Access IPC client with a wrong key")
+				continue
+			except (EOFError, OSError):
+				# Also raised for a client hanging up during the handshake.
+				if self._stopping:
+					break
+				log.error("Error accepting an instant Access IPC client", exc_info=True)
+				continue
+			if self._stopping:
+				connection.close()
+				break
+			threading.Thread(
+				target=self._handleConnection,
+				args=(connection,),
+				name="instantAccessIpcClient",
+				daemon=True,
+			).start()
+
+	def _handleConnection(self, connection):
+		try:
+			while True:
+				try:
+					data = connection.recv_bytes(MAX_REQUEST_BYTES)
+				except (EOFError, OSError):
+					break
+				connection.send_bytes(json.dumps(self.handleRequest(data)).encode("utf-8"))
+		finally:
+			connection.close()
+
+	def handleRequest(self, data):
+		"""Decode one request, run its handler and return the response dictionary."""
+		try:
+			request = json.loads(data.decode("utf-8"))
+		except (UnicodeDecodeError, ValueError):
+			return {"ok": False, "error": "Request is not valid JSON."}
+		if not isinstance(request, dict):
+			return {"ok": False, "error": "Request must be a JSON object."}
+		command = request.get("command")
+		handler = self.handlers.get(command) if isinstance(command, str) else None
+		if handler is None:
+			return {"ok": False, "error": "Unknown command: {0}".format(command)}
+		try:
+			return handler(request)
+		except Exception as e:
+			log.error("Error handling instant Access IPC request %r", request, exc_info=True)
+			return {"ok": False, "error": str(e)}
+
+
+class IpcClient:
+	"""Talk to a running IpcServer, found through the endpoint file in configDir."""
+
+	def __init__(self, configDir):
+		with open(os.path.join(configDir, ENDPOINT_FILE_NAME), "r", encoding="utf-8") as endpointFile:
+			endpoint = json.load(endpointFile)
+		self._connection = Client(
+			endpoint["address"],
+			family=endpoint["family"],
+			authkey=bytes.fromhex(endpoint["authkey"]),
+		)
+
+	def request(self, request):
+		self._connection.send_bytes(json.dumps(request).encode("utf-8"))
+		return json.loads(self._connection.recv_bytes().decode("utf-8"))
+
+	def run(self, name):
+		return self.request({"command": "run", "name": name})
+
+	def runBatch(self, names):
+		return self.request({"command": "batch", "names": list(names)})
+
+	def status(self):
+		return self.request({"command": "status"})
+
+	def close(self):
+		self._connection.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *excInfo):
+		self.close()
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Run instant Access items from the command line.")
+	parser.add_argument("--config-dir", required=True, help="the instantAccess folder of the NVDA configuration")
+	subparsers = parser.add_subparsers(dest="command", required=True)
+	runParser = subparsers.add_parser("run", help="run one or more items, in order")
+	runParser.add_argument("names", nargs="+")
+	subparsers.add_parser("status", help="report the state of instant Access")
+	args = parser.parse_args(argv)
+	try:
+		with IpcClient(args.config_dir) as client:
+			if args.command == "status":
+				response = client.status()
+			elif len(args.names) == 1:
+				response = client.run(args.names[0])
+			else:
+				response = client.runBatch(args.names)
+	except (OSError, EOFError, AuthenticationError, ValueError, KeyError) as e:
+		print("Could not reach instant Access: {0}".format(e), file=sys.stderr)
+		return 2
+	print(json.dumps(response, indent=2))
+	return 0 if response.get("ok") else 1
+
+
+if __name__ == "__main__":
+	sys.exit(main())
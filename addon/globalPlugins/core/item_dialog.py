@@ -2,10 +2,14 @@
 
 import addonHandler
 import gui
+import inputCore
+import logging
 from gui import guiHelper, nvdaControls
+import ui
 import wx
 
-from .command_picker_dialog import NvdaCommandPickerDialog
+from .command_picker_dialog import NvdaCommandPickerDialog, loadCommandCatalogAsync
+from .config_manager import formatCycleError
 from .constants import (
 	ALL_FILES_WILDCARD,
 	ERROR_CAPTION,
@@ -21,11 +25,27 @@ from .gestures import (
 	buildGestureNameFromEvent,
 	formatGestureForDisplay,
 	normalizeGesture,
+	normalizeGestureSequence,
+	SEQUENCE_SEPARATOR,
+	splitGestureSequence,
 	validateGestureName,
 )
+from .nvda_commands import findCommandsForGesture, peekNvdaCommandCatalog
+from . import recorder
+from .scheduler import (
+	ALL_DAYS,
+	formatSchedule,
+	normalizeSchedule,
+	SCHEDULE_DAILY,
+	SCHEDULE_INTERVAL,
+	SCHEDULE_STARTUP,
+	WEEKDAYS,
+)
 
 addonHandler.initTranslation()
 
+log = logging.getLogger(__name__)
+
 
 def _formatDelay(delayValue):
 	try:
@@ -91,11 +111,58 @@ class ShortcutCaptureDialog(wx.Dialog):
 		self.EndModal(wx.ID_OK)
 
 
+class KeystrokeRecordingDialog(wx.Dialog):
+	"""Record key presses until Escape is pressed.
+
+	Meanwhile NVDA gestures and keys sent to this dialog do nothing else; system shortcuts,
+	such as Alt+Tab, still act.
+	"""
+
+	def __init__(self, parent):
+		# Translators: Title of the dialog shown while keystrokes are being recorded.
+		wx.Dialog.__init__(self, parent, title=_("Recording keystrokes"), style=wx.DEFAULT_DIALOG_STYLE)
+		self.events = []
+		mainSizer = wx.BoxSizer(wx.VERTICAL)
+		# Translators: Shown while keystrokes are being recorded.
+		label = wx.StaticText(self, wx.ID_ANY, _("Recording. Press the keys to record, then Escape to stop."))
+		mainSizer.Add(label, 0, wx.ALL, 10)
+		self.SetSizerAndFit(mainSizer)
+		self.buffer = recorder.RecordingBuffer(
+			onFull=lambda: wx.CallAfter(self._stop),
+			onStop=lambda: wx.CallAfter(self._stop),
+		)
+		self.Bind(wx.EVT_CHAR_HOOK, self.onKeyPress)
+		self.CentreOnScreen()
+
+	def ShowModal(self):
+		previousCaptureFunc = inputCore.manager._captureFunc
+		# Returning False keeps NVDA from running the gesture.
+		inputCore.manager._captureFunc = lambda gesture: False
+		recorder.startRecording(self.buffer)
+		try:
+			return wx.Dialog.ShowModal(self)
+		finally:
+			self.events = recorder.stopRecording()
+			inputCore.manager._captureFunc = previousCaptureFunc
+
+	def onKeyPress(self, event):
+		# Keys are only recorded here, never acted on. The recorder ends the recording on
+		# Escape even when another window has the focus; this covers the dialog itself.
+		if event.GetKeyCode() == wx.WXK_ESCAPE:
+			self._stop()
+
+	def _stop(self):
+		if self.IsModal():
+			self.EndModal(wx.ID_OK)
+
+
 class InstantAccessActionDialog(wx.Dialog):
-	def __init__(self, parent, title, existingAction=None):
+	def __init__(self, parent, title, existingAction=None, itemNames=()):
 		wx.Dialog.__init__(self, parent, title=title, style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
 		self.selectedCommandId = ""
 		self.selectedCommandLabel = ""
+		# The items a "run item" action can call.
+		self._itemNames = sorted(itemNames, key=str.casefold)
 
 		mainSizer = wx.BoxSizer(wx.VERTICAL)
 		sizerHelper = guiHelper.BoxSizerHelper(self, wx.VERTICAL)
@@ -112,6 +179,9 @@ class InstantAccessActionDialog(wx.Dialog):
 		self.commandRow, self.commandCtrl, self.commandButton = self._createCommandRow()
 		sizerHelper.addItem(self.commandRow, flag=wx.EXPAND)
 
+		self.runItemRow, self.runItemChoice = self._createRunItemRow()
+		sizerHelper.addItem(self.runItemRow, flag=wx.EXPAND)
+
 		self.snippetRow, self.snippetCtrl = self._createSnippetRow()
 		sizerHelper.addItem(self.snippetRow, flag=wx.EXPAND)
 
@@ -120,6 +190,8 @@ class InstantAccessActionDialog(wx.Dialog):
 		self.typingDelayRow, self.typingDelayCtrl = self._createTypingDelayRow()
 		sizerHelper.addItem(self.typingDelayRow, flag=wx.EXPAND)
 		self.typingDelayCtrl.SetValue("0.05")
+		self.recordRow, self.recordButton, self.recordTimingCheck = self._createRecordRow()
+		sizerHelper.addItem(self.recordRow, flag=wx.EXPAND)
 
 		self.delayCtrl = sizerHelper.addLabeledControl(_("Delay before executing this action"), wx.TextCtrl)
 		self.delayCtrl.SetValue("0")
@@ -137,6 +209,7 @@ class InstantAccessActionDialog(wx.Dialog):
 		self.snippetActionChoice.Bind(wx.EVT_CHOICE, self.onSnippetActionChange)
 		self.browseButton.Bind(wx.EVT_BUTTON, self.onBrowse)
 		self.commandButton.Bind(wx.EVT_BUTTON, self.onSelectCommand)
+		self.recordButton.Bind(wx.EVT_BUTTON, self.onRecord)
 		self.okButton.Bind(wx.EVT_BUTTON, self.onOk)
 
 		if existingAction:
@@ -188,6 +261,22 @@ class InstantAccessActionDialog(wx.Dialog):
 		row.Add(button, 0)
 		return row, ctrl, button
 
+	def _createRunItemRow(self):
+		row = wx.BoxSizer(wx.HORIZONTAL)
+		# Translators: Label of the choice selecting the item that a "run item" action runs.
+		label = wx.StaticText(self, wx.ID_ANY, _("Item to run"))
+		choice = wx.Choice(self, wx.ID_ANY, choices=self._itemNames)
+		if self._itemNames:
+			choice.SetSelection(0)
+		row.Add(
+			label,
+			0,
+			wx.ALIGN_CENTER_VERTICAL | wx.RIGHT,
+			guiHelper.SPACE_BETWEEN_ASSOCIATED_CONTROL_HORIZONTAL,
+		)
+		row.Add(choice, 1)
+		return row, choice
+
 	def _createSnippetRow(self):
 		row = wx.BoxSizer(wx.HORIZONTAL)
 		self.snippetLabel = wx.StaticText(self, wx.ID_ANY, _("Text snippet"))
@@ -228,6 +317,17 @@ class InstantAccessActionDialog(wx.Dialog):
 		row.Add(ctrl, 0)
 		return row, ctrl
 
+	def _createRecordRow(self):
+		row = wx.BoxSizer(wx.HORIZONTAL)
+		# Translators: Button recording key presses into a keystrokes action.
+		button = wx.Button(self, wx.ID_ANY, _("&Record keystrokes..."))
+		button.Enable(recorder.keyboard is not None)
+		# Translators: Check box keeping the pace of recorded keystrokes as the delay between them.
+		check = wx.CheckBox(self, wx.ID_ANY, _("Use the recorded &timing"))
+		row.Add(button, 0, wx.RIGHT, guiHelper.SPACE_BETWEEN_ASSOCIATED_CONTROL_HORIZONTAL)
+		row.Add(check, 0, wx.ALIGN_CENTER_VERTICAL)
+		return row, button, check
+
 	def _setRowVisible(self, row, visible):
 		for child in row.GetChildren():
 			if child.IsWindow():
@@ -247,6 +347,12 @@ class InstantAccessActionDialog(wx.Dialog):
 			self.snippetCtrl.SetValue(action.get("path", ""))
 		else:
 			self.snippetCtrl.SetValue("")
+		if itemType == "RunItem" and action.get("path", ""):
+			selection = self.runItemChoice.FindString(action["path"], caseSensitive=True)
+			if selection == wx.NOT_FOUND:
+				# The item it runs was deleted; keep showing its name.
+				selection = self.runItemChoice.Append(action["path"])
+			self.runItemChoice.SetSelection(selection)
 		actionValue = (action.get("textAction", TEXT_SNIPPET_ACTION_VALUES[0]) or "").strip().lower()
 		if actionValue in TEXT_SNIPPET_ACTION_VALUES:
 			self.snippetActionChoice.SetSelection(TEXT_SNIPPET_ACTION_VALUES.index(actionValue))
@@ -261,6 +367,7 @@ class InstantAccessActionDialog(wx.Dialog):
 		showPath = itemType in ("Websites", "Programs", "Folders", "Files")
 		showArguments = itemType == "Programs"
 		showCommand = itemType == "NvdaCommands"
+		showRunItem = itemType == "RunItem"
 		showSnippetArea = itemType in ("TextSnippets", "Keystrokes")
 		showSnippetActionChoice = itemType == "TextSnippets"
 		showDelayField = (
@@ -279,9 +386,11 @@ class InstantAccessActionDialog(wx.Dialog):
 		self._setRowVisible(self.pathRow, showPath)
 		self._setRowVisible(self.argumentsRow, showArguments)
 		self._setRowVisible(self.commandRow, showCommand)
+		self._setRowVisible(self.runItemRow, showRunItem)
 		self._setRowVisible(self.snippetRow, showSnippetArea)
 		self._setRowVisible(self.snippetActionRow, showSnippetActionChoice)
 		self._setRowVisible(self.typingDelayRow, showDelayField)
+		self._setRowVisible(self.recordRow, itemType == "Keystrokes")
 		self.browseButton.Enable(itemType in ("Programs", "Folders", "Files"))
 		self.Layout()
 
@@ -321,6 +430,39 @@ class InstantAccessActionDialog(wx.Dialog):
 				self.pathCtrl.SetValue(dialog.GetPath())
 			dialog.Destroy()
 
+	def onRecord(self, event):
+		dialog = KeystrokeRecordingDialog(self)
+		buffer = dialog.buffer
+		try:
+			dialog.ShowModal()
+		except Exception:
+			log.error("Could not record keystrokes", exc_info=True)
+			# Translators: Error shown when the keyboard cannot be recorded.
+			gui.messageBox(_("Could not record keystrokes."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
+			return
+		finally:
+			events = dialog.events
+			dialog.Destroy()
+		lines, gaps, skipped = recorder.compressEvents(events)
+		if lines:
+			self.snippetCtrl.SetValue("\n".join(lines))
+			medianGap = recorder.getMedianGap(gaps)
+			if self.recordTimingCheck.GetValue() and medianGap is not None:
+				self.typingDelayCtrl.SetValue(_formatDelay(medianGap))
+		messages = []
+		if buffer.overflowed:
+			# Translators: Reported when a recording got too long. {count} is the number of key events kept.
+			messages.append(_("The recording was stopped after {count} key events.").format(count=buffer.maxEvents))
+		if skipped:
+			# Translators: Reported when recorded keys cannot be written as keystrokes. {count} is how many.
+			messages.append(_("{count} keys could not be recorded.").format(count=skipped))
+		if not lines:
+			# Translators: Reported when a recording holds no keys.
+			messages.append(_("No keystrokes were recorded."))
+		if messages:
+			gui.messageBox(" ".join(messages), ERROR_CAPTION, wx.OK | wx.ICON_WARNING)
+		self.snippetCtrl.SetFocus()
+
 	def onSelectCommand(self, event):
 		dialog = NvdaCommandPickerDialog(self, selectedCommandId=self.selectedCommandId)
 		if dialog.ShowModal() == wx.ID_OK:
@@ -338,6 +480,8 @@ class InstantAccessActionDialog(wx.Dialog):
 			path = self.snippetCtrl.GetValue()
 		elif itemType == "NvdaCommands":
 			path = self.selectedCommandId.strip()
+		elif itemType == "RunItem":
+			path = self.runItemChoice.GetStringSelection()
 		else:
 			path = self.pathCtrl.GetValue().strip().strip("'\"")
 
@@ -419,6 +563,10 @@ class InstantAccessItemDialog(wx.Dialog):
 		self.existingItem = existingItem
 		self.gesture = ""
 		self.actions = []
+		# Conflicts are checked against snapshots taken once, never by reloading the configuration.
+		self._itemIndex = configManager.getItemIndex()
+		self._nvdaCatalog = peekNvdaCommandCatalog()
+		self._catalogFuture = None
 
 		mainSizer = wx.BoxSizer(wx.VERTICAL)
 		sizerHelper = guiHelper.BoxSizerHelper(self, wx.VERTICAL)
@@ -453,9 +601,23 @@ class InstantAccessItemDialog(wx.Dialog):
 		)
 		sizerHelper.addItem(self.restrictionRow, flag=wx.EXPAND)
 
-		self.shortcutRow, self.shortcutButton = self._createShortcutRow()
+		self._layers = configManager.getLayers()
+		# Translators: The layer of an item that has not been put in a named layer.
+		layerChoices = [_("Default")] + [layer["name"] for layer in self._layers]
+		# Translators: Label of the choice selecting the instant layer an item belongs to.
+		self.layerChoice = sizerHelper.addLabeledControl(_("&Layer"), wx.Choice, choices=layerChoices)
+		self.layerChoice.SetSelection(0)
+
+		self._customDays = None
+		self.scheduleRow, self.scheduleChoice, self.scheduleValueCtrl = self._createScheduleRow()
+		sizerHelper.addItem(self.scheduleRow, flag=wx.EXPAND)
+
+		self.shortcutRow, self.shortcutButton, self.nextKeyButton = self._createShortcutRow()
 		sizerHelper.addItem(self.shortcutRow, flag=wx.EXPAND)
 
+		self.conflictText = wx.StaticText(self, wx.ID_ANY, "")
+		sizerHelper.addItem(self.conflictText, flag=wx.EXPAND)
+
 		buttonSizer = guiHelper.ButtonHelper(wx.HORIZONTAL)
 		self.okButton = buttonSizer.addButton(self, wx.ID_OK, _("&OK"))
 		buttonSizer.addButton(self, wx.ID_CANCEL, _("&Cancel"))
@@ -474,7 +636,12 @@ class InstantAccessItemDialog(wx.Dialog):
 		self.actionsList.Bind(wx.EVT_LIST_ITEM_DESELECTED, self.onActionsSelectionChanged)
 		self.actionsList.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.onEditAction)
 		self.shortcutButton.Bind(wx.EVT_BUTTON, self.onSetShortcut)
+		self.nextKeyButton.Bind(wx.EVT_BUTTON, self.onAddNextKey)
 		self.restrictToAppsCheck.Bind(wx.EVT_CHECKBOX, self.onRestrictionToggle)
+		self.nameCtrl.Bind(wx.EVT_TEXT, self.onConflictInputChanged)
+		self.appNameCtrl.Bind(wx.EVT_TEXT, self.onConflictInputChanged)
+		self.layerChoice.Bind(wx.EVT_CHOICE, self.onConflictInputChanged)
+		self.scheduleChoice.Bind(wx.EVT_CHOICE, self.onScheduleChoice)
 		self.okButton.Bind(wx.EVT_BUTTON, self.onOk)
 		self.Bind(wx.EVT_CHAR_HOOK, self.onCharHook)
 
@@ -483,9 +650,104 @@ class InstantAccessItemDialog(wx.Dialog):
 
 		self.updateShortcutLabel()
 		self.updateRestrictionState()
+		self.updateScheduleState()
 		self.refreshActionsList()
+		self.updateConflictStatus()
+		if self._nvdaCatalog is None:
+			self._loadNvdaCatalogAsync()
 		self.CentreOnScreen()
 
+	def _loadNvdaCatalogAsync(self):
+		self._catalogFuture = loadCommandCatalogAsync()
+		self._catalogFuture.add_done_callback(lambda future: wx.CallAfter(self._onNvdaCatalogLoaded, future))
+
+	def _onNvdaCatalogLoaded(self, future):
+		if future is not self._catalogFuture or not self:
+			return
+		try:
+			self._nvdaCatalog = future.result()
+		except Exception:
+			return
+		self.updateConflictStatus()
+
+	def _getAppNameValue(self):
+		if not self.restrictToAppsCheck.GetValue():
+			return ""
+		return self.appNameCtrl.GetValue().strip().lower()
+
+	def _getLayerValue(self):
+		selection = self.layerChoice.GetSelection()
+		if selection <= 0:
+			return ""
+		return self._layers[selection - 1]["name"]
+
+	def findConflicts(self):
+		"""Return (errors, warnings) for the current name and shortcut, from the snapshots."""
+		errors = []
+		warnings = []
+		excludeName = self.existingItem["name"] if self.existingItem else ""
+		name = self.nameCtrl.GetValue().strip()
+		if name and self._itemIndex.hasName(name, excludeName=excludeName):
+			errors.append(_("This name already exists."))
+		if not self.gesture:
+			return errors, warnings
+		appName = self._getAppNameValue()
+		layer = self._getLayerValue()
+		firstStep = splitGestureSequence(self.gesture)[0]
+		for layerInfo in self._layers:
+			if normalizeGestureSequence(layerInfo.get("gesture", "")) == firstStep:
+				errors.append(
+					# Translators: Error shown when an item shortcut starts with the toggle key of a layer. {layer} is its name.
+					_("This shortcut switches the {layer} layer.").format(layer=layerInfo["name"])
+				)
+		owners = self._itemIndex.findGestureOwners(
+			self.gesture, appName=appName, excludeName=excludeName, layer=layer
+		)
+		if owners:
+			if appName:
+				message = _("This shortcut is already assigned for this app.")
+			else:
+				message = _("This global shortcut is already assigned.")
+			# Translators: Appended to a shortcut conflict message. {names} lists the conflicting items.
+			usedBy = _("Used by: {names}").format(names=", ".join(owners))
+			message = "{message} {usedBy}".format(message=message, usedBy=usedBy)
+			if self.existingItem and not self.existingItem.get("enabled", True):
+				# A disabled item never fires, so it may share a shortcut until it is enabled.
+				warnings.append(message)
+			else:
+				errors.append(message)
+		prefixNames = self._itemIndex.findPrefixCollisions(
+			self.gesture, appName=appName, excludeName=excludeName, layer=layer
+		)
+		if prefixNames:
+			warnings.append(
+				# Translators: Warning shown when one item's key sequence begins another's. {names} lists the other items.
+				_("This key sequence overlaps with {names}; the shorter one runs only after a pause.").format(
+					names=", ".join(prefixNames),
+				)
+			)
+		if self._nvdaCatalog is not None:
+			commands = findCommandsForGesture(self._nvdaCatalog, firstStep)
+			if commands:
+				warnings.append(
+					# Translators: Warning shown when an item shortcut is also an NVDA command gesture. {commands} lists the commands.
+					_("In instant mode this shortcut replaces the NVDA command: {commands}").format(
+						commands="; ".join(command.label for command in commands),
+					)
+				)
+		return errors, warnings
+
+	def updateConflictStatus(self):
+		"""Show the current conflicts below the shortcut and return them as (errors, warnings)."""
+		errors, warnings = self.findConflicts()
+		self.conflictText.SetLabel("\n".join(errors + warnings))
+		self.Layout()
+		return errors, warnings
+
+	def onConflictInputChanged(self, event):
+		self.updateConflictStatus()
+		event.Skip()
+
 	def _createRestrictionRow(self):
 		row = wx.BoxSizer(wx.HORIZONTAL)
 		check = wx.CheckBox(self, wx.ID_ANY, _("Restrict this shortcut to work in certain apps"))
@@ -502,10 +764,97 @@ class InstantAccessItemDialog(wx.Dialog):
 		row.Add(appCtrl, 1, wx.LEFT, guiHelper.SPACE_BETWEEN_ASSOCIATED_CONTROL_HORIZONTAL)
 		return row, check, appLabel, appCtrl
 
+	def _createScheduleRow(self):
+		row = wx.BoxSizer(wx.HORIZONTAL)
+		# Translators: Label of the choice making an item run on its own.
+		label = wx.StaticText(self, wx.ID_ANY, _("Run &automatically"))
+		choice = wx.Choice(
+			self,
+			wx.ID_ANY,
+			choices=[
+				# Translators: Schedule choice for an item only run by its shortcut.
+				_("Never"),
+				# Translators: Schedule choice for an item run every day at a time typed next to it.
+				_("Every day at (HH:MM)"),
+				# Translators: Schedule choice for an item run Monday to Friday at a time typed next to it.
+				_("Weekdays at (HH:MM)"),
+				# Translators: Schedule choice for an item run repeatedly, every number of minutes typed next to it.
+				_("Every (minutes)"),
+				# Translators: Schedule choice for an item run once, a number of seconds typed next to it after NVDA starts.
+				_("After NVDA starts (seconds)"),
+			],
+		)
+		choice.SetSelection(0)
+		valueCtrl = wx.TextCtrl(self, wx.ID_ANY)
+		row.Add(
+			label,
+			0,
+			wx.ALIGN_CENTER_VERTICAL | wx.RIGHT,
+			guiHelper.SPACE_BETWEEN_ASSOCIATED_CONTROL_HORIZONTAL,
+		)
+		row.Add(choice, 0)
+		row.Add(valueCtrl, 1, wx.LEFT, guiHelper.SPACE_BETWEEN_ASSOCIATED_CONTROL_HORIZONTAL)
+		return row, choice, valueCtrl
+
+	def _loadSchedule(self, schedule):
+		schedule = normalizeSchedule(schedule)
+		if not schedule:
+			return
+		kind = schedule["kind"]
+		if kind == SCHEDULE_DAILY:
+			days = tuple(schedule["days"])
+			if days == ALL_DAYS:
+				self.scheduleChoice.SetSelection(1)
+			elif days == WEEKDAYS:
+				self.scheduleChoice.SetSelection(2)
+			else:
+				# Days set in the configuration file are kept as they are.
+				self._customDays = list(days)
+				self.scheduleChoice.Append(formatSchedule(dict(schedule, time="(HH:MM)")))
+				self.scheduleChoice.SetSelection(self.scheduleChoice.GetCount() - 1)
+			self.scheduleValueCtrl.SetValue(schedule["time"])
+		elif kind == SCHEDULE_INTERVAL:
+			self.scheduleChoice.SetSelection(3)
+			self.scheduleValueCtrl.SetValue("{0:g}".format(schedule["minutes"]))
+		elif kind == SCHEDULE_STARTUP:
+			self.scheduleChoice.SetSelection(4)
+			self.scheduleValueCtrl.SetValue("{0:g}".format(schedule["seconds"]))
+
+	def updateScheduleState(self):
+		self.scheduleValueCtrl.Enable(self.scheduleChoice.GetSelection() > 0)
+
+	def onScheduleChoice(self, event):
+		self.updateScheduleState()
+
+	def _getScheduleValue(self):
+		"""Return (schedule, error): the schedule entered, None for none, or an error message."""
+		selection = self.scheduleChoice.GetSelection()
+		if selection <= 0:
+			return None, None
+		value = self.scheduleValueCtrl.GetValue().strip()
+		if selection in (1, 2) or selection > 4:
+			days = ALL_DAYS if selection == 1 else WEEKDAYS if selection == 2 else self._customDays
+			schedule = normalizeSchedule({"kind": SCHEDULE_DAILY, "time": value, "days": list(days)})
+			# Translators: Error shown when the time of a daily schedule is not valid.
+			error = _("Enter the time of day as HH:MM, for example 09:55.")
+		elif selection == 3:
+			schedule = normalizeSchedule({"kind": SCHEDULE_INTERVAL, "minutes": value})
+			# Translators: Error shown when the minutes of a repeating schedule are not valid.
+			error = _("Enter the number of minutes between runs.")
+		else:
+			schedule = normalizeSchedule({"kind": SCHEDULE_STARTUP, "seconds": value})
+			# Translators: Error shown when the delay of a schedule after NVDA starts is not valid.
+			error = _("Enter the number of seconds to wait after NVDA starts.")
+		if schedule is None:
+			return None, error
+		return schedule, None
+
 	def _createShortcutRow(self):
 		row = wx.BoxSizer(wx.HORIZONTAL)
 		label = wx.StaticText(self, wx.ID_ANY, _("Shortcut"))
 		button = wx.Button(self, wx.ID_ANY, "")
+		# Translators: Label for the button appending another key to the shortcut, making it a sequence.
+		nextKeyButton = wx.Button(self, wx.ID_ANY, _("Add &next key..."))
 		row.Add(
 			label,
 			0,
@@ -513,19 +862,25 @@ class InstantAccessItemDialog(wx.Dialog):
 			guiHelper.SPACE_BETWEEN_ASSOCIATED_CONTROL_HORIZONTAL,
 		)
 		row.Add(button, 0)
-		return row, button
+		row.Add(nextKeyButton, 0, wx.LEFT, guiHelper.SPACE_BETWEEN_BUTTONS_HORIZONTAL)
+		return row, button, nextKeyButton
 
 	def _loadExistingItem(self, item):
 		self.nameCtrl.SetValue(item.get("name", ""))
 		gestures = item.get("gestures", [])
 		if gestures:
-			self.gesture = normalizeGesture(gestures[0])
+			self.gesture = normalizeGestureSequence(gestures[0])
 		self.actions = [dict(action) for action in item.get("actions", [])]
 		self.intervalCtrl.SetValue(_formatDelay(item.get("interval", 0.0)))
 		appName = (item.get("appName", "") or "").strip()
 		if appName:
 			self.restrictToAppsCheck.SetValue(True)
 			self.appNameCtrl.SetValue(appName)
+		layerNames = [layer["name"] for layer in self._layers]
+		layer = item.get("layer", "")
+		if layer in layerNames:
+			self.layerChoice.SetSelection(layerNames.index(layer) + 1)
+		self._loadSchedule(item.get("schedule"))
 
 	def onCharHook(self, event):
 		if event.GetKeyCode() == wx.WXK_ESCAPE:
@@ -534,6 +889,7 @@ class InstantAccessItemDialog(wx.Dialog):
 		event.Skip()
 
 	def updateShortcutLabel(self):
+		self.nextKeyButton.Enable(bool(self.gesture))
 		if self.gesture:
 			label = _("Shortcut key: {gesture}").format(gesture=formatGestureForDisplay(self.gesture))
 		else:
@@ -548,6 +904,7 @@ class InstantAccessItemDialog(wx.Dialog):
 
 	def onRestrictionToggle(self, event):
 		self.updateRestrictionState()
+		self.updateConflictStatus()
 
 	def getSelectedActionIndex(self):
 		return self.actionsList.GetFirstSelected()
@@ -575,8 +932,13 @@ class InstantAccessItemDialog(wx.Dialog):
 	def onActionsSelectionChanged(self, event):
 		self.updateActionButtons()
 
+	def _getRunnableItemNames(self):
+		"""Return the names of the items an action of this item may run."""
+		ownName = self.existingItem["name"] if self.existingItem else ""
+		return [name for name in self._itemIndex.names if name != ownName]
+
 	def onAddAction(self, event):
-		dialog = InstantAccessActionDialog(self, _("Add action"))
+		dialog = InstantAccessActionDialog(self, _("Add action"), itemNames=self._getRunnableItemNames())
 		if dialog.ShowModal() == wx.ID_OK:
 			self.actions.append(dialog.result)
 			self.refreshActionsList(selectIndex=len(self.actions) - 1)
@@ -587,7 +949,9 @@ class InstantAccessItemDialog(wx.Dialog):
 		index = self.getSelectedActionIndex()
 		if index == -1:
 			return
-		dialog = InstantAccessActionDialog(self, _("Edit action"), existingAction=self.actions[index])
+		dialog = InstantAccessActionDialog(
+			self, _("Edit action"), existingAction=self.actions[index], itemNames=self._getRunnableItemNames()
+		)
 		if dialog.ShowModal() == wx.ID_OK:
 			self.actions[index] = dialog.result
 			self.refreshActionsList(selectIndex=index)
@@ -628,33 +992,53 @@ class InstantAccessItemDialog(wx.Dialog):
 		self.refreshActionsList(selectIndex=index + 1)
 		self.actionsList.SetFocus()
 
-	def onSetShortcut(self, event):
+	def _captureGesture(self):
+		"""Ask for one key and return it as a canonical gesture, or "" if cancelled or rejected."""
 		dialog = ShortcutCaptureDialog(self)
+		gestureName = ""
 		if dialog.ShowModal() == wx.ID_OK:
 			gestureName = normalizeGesture(dialog.gestureName)
-			if not gestureName:
-				dialog.Destroy()
-				return
-			if gestureName in RESERVED_GESTURES:
-				gui.messageBox(
-					_("This shortcut is reserved for instant Access."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR
-				)
-				dialog.Destroy()
-				return
-			if not validateGestureName(formatGestureForDisplay(gestureName)):
-				gui.messageBox(_("Invalid shortcut key."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
-				dialog.Destroy()
-				return
-			self.gesture = gestureName
-			self.updateShortcutLabel()
 		dialog.Destroy()
+		if not gestureName:
+			return ""
+		if gestureName in RESERVED_GESTURES:
+			gui.messageBox(
+				_("This shortcut is reserved for instant Access."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR
+			)
+			return ""
+		if not validateGestureName(formatGestureForDisplay(gestureName)):
+			gui.messageBox(_("Invalid shortcut key."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
+			return ""
+		return gestureName
+
+	def _setGesture(self, gesture):
+		self.gesture = gesture
+		self.updateShortcutLabel()
+		errors, warnings = self.updateConflictStatus()
+		if errors or warnings:
+			ui.message(" ".join(errors + warnings))
+
+	def onSetShortcut(self, event):
+		gestureName = self._captureGesture()
+		if gestureName:
+			self._setGesture(gestureName)
+
+	def onAddNextKey(self, event):
+		gestureName = self._captureGesture()
+		if gestureName:
+			self._setGesture(SEQUENCE_SEPARATOR.join(splitGestureSequence(self.gesture) + (gestureName,)))
 
 	def validate(self):
 		name = self.nameCtrl.GetValue().strip()
 		gesture = self.gesture
 		appName = self.appNameCtrl.GetValue().strip().lower() if self.restrictToAppsCheck.GetValue() else ""
 
-		if not name or not gesture:
+		schedule, scheduleError = self._getScheduleValue()
+		if scheduleError:
+			gui.messageBox(scheduleError, ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
+			return None
+		# An item that runs on a schedule does not need a shortcut.
+		if not name or not (gesture or schedule):
 			gui.messageBox(_("All fields are required."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
 			return None
 		if not self.actions:
@@ -677,44 +1061,37 @@ class InstantAccessItemDialog(wx.Dialog):
 			gui.messageBox(_("Interval must be zero or greater."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
 			return None
 
-		normalizedGesture = normalizeGesture(gesture)
-		if normalizedGesture in RESERVED_GESTURES:
+		steps = splitGestureSequence(gesture)
+		normalizedGesture = SEQUENCE_SEPARATOR.join(steps)
+		if any(step in RESERVED_GESTURES for step in steps):
 			gui.messageBox(
 				_("This shortcut is reserved for instant Access."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR
 			)
 			return None
-		if not validateGestureName(formatGestureForDisplay(normalizedGesture)):
+		if not all(validateGestureName(formatGestureForDisplay(step)) for step in steps):
 			gui.messageBox(_("Invalid shortcut key."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
 			return None
 
-		allNames = self.configManager.getAllNames()
-		if self.existingItem:
-			allNames.discard(self.existingItem["name"])
-		if name in allNames:
-			gui.messageBox(_("This name already exists."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
+		errors, warnings = self.updateConflictStatus()
+		if errors:
+			gui.messageBox(errors[0], ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
 			return None
 
-		excludeName = self.existingItem["name"] if self.existingItem else ""
-		conflictItem = self.configManager.findGestureConflict(
-			normalizedGesture, appName=appName, excludeName=excludeName
+		cycle = self._itemIndex.findReferenceCycle(
+			name, self.actions, excludeName=self.existingItem["name"] if self.existingItem else ""
 		)
-		if conflictItem:
-			if appName:
-				gui.messageBox(
-					_("This shortcut is already assigned for this app."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR
-				)
-			else:
-				gui.messageBox(
-					_("This global shortcut is already assigned."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR
-				)
+		if cycle:
+			gui.messageBox(formatCycleError(cycle), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
 			return None
 
 		return {
 			"name": name,
 			"gesture": normalizedGesture,
 			"appName": appName,
+			"layer": self._getLayerValue(),
 			"interval": interval,
 			"actions": [dict(action) for action in self.actions],
+			"schedule": schedule,
 		}
 
 	def onOk(self, event):
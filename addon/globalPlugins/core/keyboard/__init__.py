@@ -83,6 +83,7 @@ version = '0.13.5'
 
 import re as _re
 import itertools as _itertools
+import bisect as _bisect
 import collections as _collections
 from threading import Thread as _Thread, Lock as _Lock
 import time as _time
@@ -127,11 +128,23 @@ elif _platform.system() == 'Darwin':
 else:
     raise OSError("Unsupported platform '{}'".format(_platform.system()))
 
-from ._keyboard_event import KEY_DOWN, KEY_UP, KeyboardEvent
+from ._keyboard_event import KEY_DOWN, KEY_UP, KeyboardEvent, KeyboardEventBuffer
 from ._generic import GenericListener as _GenericListener
 from ._canonical_names import all_modifiers, sided_modifiers, normalize_name
 
-_modifier_scan_codes = set()
+# Scan codes of all modifier keys, and the `tables_version` of the OS module
+# they were computed from. The listener compares the version on every event, so
+# the check stays a plain integer comparison.
+_modifier_scan_codes = frozenset()
+_modifier_scan_codes_version = None
+def _update_modifier_scan_codes():
+    global _modifier_scan_codes, _modifier_scan_codes_version
+    # Read first: tables rebuilt meanwhile leave a stale version, and another update.
+    version = _os_keyboard.tables_version
+    scan_codes = (key_to_scan_codes(name, False) for name in all_modifiers)
+    _modifier_scan_codes = frozenset().union(*scan_codes)
+    _modifier_scan_codes_version = version
+
 def is_modifier(key):
     """
     Returns True if `key` is a scan code or name of a modifier key.
@@ -139,15 +152,28 @@ def is_modifier(key):
     if _is_str(key):
         return key in all_modifiers
     else:
-        if not _modifier_scan_codes:
-            scan_codes = (key_to_scan_codes(name, False) for name in all_modifiers) 
-            _modifier_scan_codes.update(*scan_codes)
+        if _os_keyboard.tables_version != _modifier_scan_codes_version:
+            _update_modifier_scan_codes()
         return key in _modifier_scan_codes
 
 _pressed_events_lock = _Lock()
 _pressed_events = {}
 _physically_pressed_keys = _pressed_events
 _logically_pressed_keys = {}
+# The keys of `_pressed_events`, sorted. Kept up to date by the listener, so
+# that hotkeys can be looked up without sorting the pressed keys every event.
+_pressed_scan_codes = ()
+
+def _sync_pressed_scan_codes():
+    """
+    Returns `_pressed_scan_codes`, rebuilt if `_pressed_events` was cleared
+    meanwhile. Must be called with `_pressed_events_lock` held.
+    """
+    global _pressed_scan_codes
+    if len(_pressed_scan_codes) != len(_pressed_events):
+        _pressed_scan_codes = tuple(sorted(_pressed_events))
+    return _pressed_scan_codes
+
 class _KeyboardListener(_GenericListener):
     transition_table = {
         #Current state of the modifier, per `modifier_states`.
@@ -195,6 +221,9 @@ class _KeyboardListener(_GenericListener):
     def init(self):
         _os_keyboard.init()
 
+        # Computed here, as the name tables are ready now, and again whenever they are rebuilt.
+        _update_modifier_scan_codes()
+
         self.active_modifiers = set()
         self.blocking_hooks = []
         self.blocking_keys = _collections.defaultdict(list)
@@ -209,12 +238,13 @@ class _KeyboardListener(_GenericListener):
         self.modifier_states = {} # "alt" -> "allowed"
 
     def pre_process_event(self, event):
-        for key_hook in self.nonblocking_keys[event.scan_code]:
+        # The hook tables are defaultdicts; `get` keeps misses from adding entries.
+        for key_hook in self.nonblocking_keys.get(event.scan_code, ()):
             key_hook(event)
 
         with _pressed_events_lock:
-            hotkey = tuple(sorted(_pressed_events))
-        for callback in self.nonblocking_hotkeys[hotkey]:
+            hotkey = _sync_pressed_scan_codes()
+        for callback in self.nonblocking_hotkeys.get(hotkey, ()):
             callback(event)
 
         return event.scan_code or (event.name and event.name != 'unknown')
@@ -239,18 +269,31 @@ class _KeyboardListener(_GenericListener):
         event_type = event.event_type
         scan_code = event.scan_code
 
-        # Update tables of currently pressed keys and modifiers.
+        if _os_keyboard.tables_version != _modifier_scan_codes_version:
+            _update_modifier_scan_codes()
+        is_modifier_key = scan_code in _modifier_scan_codes
+
+        # Update tables of currently pressed keys and modifiers. Held keys
+        # repeat KEY_DOWN events, which leave the sorted scan codes as they are.
+        global _pressed_scan_codes
         with _pressed_events_lock:
+            hotkey = _sync_pressed_scan_codes()
             if event_type == KEY_DOWN:
-                if is_modifier(scan_code): self.active_modifiers.add(scan_code)
+                if is_modifier_key: self.active_modifiers.add(scan_code)
+                if scan_code not in _pressed_events:
+                    i = _bisect.bisect_left(hotkey, scan_code)
+                    hotkey = _pressed_scan_codes = hotkey[:i] + (scan_code,) + hotkey[i:]
                 _pressed_events[scan_code] = event
-            hotkey = tuple(sorted(_pressed_events))
-            if event_type == KEY_UP:
+            elif event_type == KEY_UP:
                 self.active_modifiers.discard(scan_code)
-                if scan_code in _pressed_events: del _pressed_events[scan_code]
+                if scan_code in _pressed_events:
+                    del _pressed_events[scan_code]
+                    i = _bisect.bisect_left(hotkey, scan_code)
+                    # The hotkey still holds the released key, as before.
+                    _pressed_scan_codes = hotkey[:i] + hotkey[i + 1:]
 
         # Mappings based on individual keys instead of hotkeys.
-        for key_hook in self.blocking_keys[scan_code]:
+        for key_hook in self.blocking_keys.get(scan_code, ()):
             if not key_hook(event):
                 return False
 
@@ -263,9 +306,9 @@ class _KeyboardListener(_GenericListener):
                 modifiers_to_update = set([scan_code])
             else:
                 modifiers_to_update = self.active_modifiers
-                if is_modifier(scan_code):
+                if is_modifier_key:
                     modifiers_to_update = modifiers_to_update | {scan_code}
-                callback_results = [callback(event) for callback in self.blocking_hotkeys[hotkey]]
+                callback_results = [callback(event) for callback in self.blocking_hotkeys.get(hotkey, ())]
                 if callback_results:
                     accept = all(callback_results)
                     origin = 'hotkey'
@@ -295,6 +338,49 @@ class _KeyboardListener(_GenericListener):
 
 _listener = _KeyboardListener()
 
+# Parsed hotkeys and key names, least recently used first. Macros send the same few hotkeys
+# over and over, so each string is only parsed once. Both caches are dropped when the OS
+# module rebuilds its name tables (it then bumps `tables_version`) or is mocked out.
+_HOTKEY_CACHE_SIZE = 256
+_hotkey_cache = _collections.OrderedDict()
+_scan_codes_cache = _collections.OrderedDict()
+_hotkey_cache_lock = _Lock()
+_hotkey_cache_stamp = None
+
+def _cache_lookup(cache, key):
+    """
+    Returns (stamp, value) for `key` in `cache`, with value None when missing.
+    Pass the stamp back to `_cache_store`.
+    """
+    global _hotkey_cache_stamp
+    stamp = (_os_keyboard.map_name, getattr(_os_keyboard, 'tables_version', 0))
+    with _hotkey_cache_lock:
+        if stamp != _hotkey_cache_stamp:
+            _hotkey_cache.clear()
+            _scan_codes_cache.clear()
+            _hotkey_cache_stamp = stamp
+            return stamp, None
+        value = cache.pop(key, None)
+        if value is not None:
+            cache[key] = value
+        return stamp, value
+
+def _cache_store(cache, key, value, stamp):
+    with _hotkey_cache_lock:
+        # Computed from tables that were rebuilt meanwhile.
+        if stamp != _hotkey_cache_stamp:
+            return
+        cache[key] = value
+        if len(cache) > _HOTKEY_CACHE_SIZE:
+            cache.popitem(last=False)
+
+def _clear_hotkey_cache():
+    global _hotkey_cache_stamp
+    with _hotkey_cache_lock:
+        _hotkey_cache.clear()
+        _scan_codes_cache.clear()
+        _hotkey_cache_stamp = None
+
 def key_to_scan_codes(key, error_if_missing=True):
     """
     Returns a list of scan codes associated with this key (name or scan code).
@@ -306,11 +392,27 @@ def key_to_scan_codes(key, error_if_missing=True):
     elif not _is_str(key):
         raise ValueError('Unexpected key type ' + str(type(key)) + ', value (' + repr(key) + ')')
 
+    stamp, cached = _cache_lookup(_scan_codes_cache, key)
+    if cached is None:
+        cached = _map_key(key)
+        _cache_store(_scan_codes_cache, key, cached, stamp)
+    t, e = cached
+
+    if not t and error_if_missing:
+        raise ValueError('Key {} is not mapped to any known key.'.format(repr(key)), e)
+    else:
+        return t
+
+def _map_key(key):
+    """
+    Returns (scan_codes, exception) for the key name `key`, where exception
+    is the one that kept the OS module from mapping it, if any.
+    """
     normalized = normalize_name(key)
     if normalized in sided_modifiers:
         left_scan_codes = key_to_scan_codes('left ' + normalized, False)
         right_scan_codes = key_to_scan_codes('right ' + normalized, False)
-        return left_scan_codes + tuple(c for c in right_scan_codes if c not in left_scan_codes)
+        return left_scan_codes + tuple(c for c in right_scan_codes if c not in left_scan_codes), None
 
     try:
         # Put items in ordered dict to remove duplicates.
@@ -319,11 +421,7 @@ def key_to_scan_codes(key, error_if_missing=True):
     except (KeyError, ValueError) as exception:
         t = ()
         e = exception
-
-    if not t and error_if_missing:
-        raise ValueError('Key {} is not mapped to any known key.'.format(repr(key)), e)
-    else:
-        return t
+    return t, e
 
 def parse_hotkey(hotkey):
     """
@@ -340,6 +438,15 @@ def parse_hotkey(hotkey):
 
         # ((alt_codes, shift_codes, a_codes), (alt_codes, b_codes), (c_codes,))
     """
+    if _is_str(hotkey):
+        stamp, steps = _cache_lookup(_hotkey_cache, hotkey)
+        if steps is None:
+            steps = _parse_hotkey(hotkey)
+            _cache_store(_hotkey_cache, hotkey, steps, stamp)
+        return steps
+    return _parse_hotkey(hotkey)
+
+def _parse_hotkey(hotkey):
     if _is_number(hotkey) or len(hotkey) == 1:
         scan_codes = key_to_scan_codes(hotkey)
         step = (scan_codes,)
@@ -1011,7 +1118,8 @@ def start_recording(recorded_events_queue=None):
 
     Use `stop_recording()` or `unhook(hooked_function)` to stop.
     """
-    recorded_events_queue = recorded_events_queue or _queue.Queue()
+    if recorded_events_queue is None:
+        recorded_events_queue = KeyboardEventBuffer()
     global _recording
     _recording = (recorded_events_queue, hook(recorded_events_queue.put))
     return _recording
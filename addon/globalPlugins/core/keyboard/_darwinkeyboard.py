@@ -403,6 +403,9 @@ class KeyEventListener(object):
 
 key_controller = KeyController()
 
+# The name tables of this module are never rebuilt (see keyboard/__init__.py).
+tables_version = 0
+
 """ Exported functions below """
 
 def init():
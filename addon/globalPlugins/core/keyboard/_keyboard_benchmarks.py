@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Microbenchmarks for the hot paths of keyboard macros.
+
+Like the tests, these mock out keyboard._os_keyboard, so nothing is sent to the
+OS and the numbers only measure this library. The listener replay feeds
+millions of synthetic key events through the listener, as the OS hook would.
+Run with:
+
+    python -m keyboard._keyboard_benchmarks
+"""
+from __future__ import print_function
+
+import time
+import timeit
+
+import keyboard
+from ._keyboard_event import KeyboardEvent, KeyboardEventBuffer, KEY_DOWN, KEY_UP
+
+# A name table shaped like the ones the OS modules build: several entries per
+# name, looked up through a generator.
+_names = ['ctrl', 'shift', 'alt', 'windows', 'tab', 'enter', 'esc', 'space', 'down', 'up', 'left', 'right', 'f4', 'f10', 'v']
+_names += [chr(c) for c in range(ord('a'), ord('z') + 1) if chr(c) not in _names]
+_from_name = {}
+for _scan_code, _name in enumerate(_names, 1):
+    _from_name[_name] = [(_scan_code, ()), (_scan_code, ('shift',))]
+for _side, _offset in (('left', 100), ('right', 200)):
+    for _modifier in ('ctrl', 'shift', 'alt', 'windows'):
+        _from_name[_side + ' ' + _modifier] = [(_offset + _names.index(_modifier), ())]
+
+def _map_name(name):
+    if name not in _from_name:
+        raise ValueError('Key name {} is not mapped to any known key.'.format(repr(name)))
+    for entry in _from_name[name]:
+        yield entry
+
+keyboard._os_keyboard.init = lambda: None
+keyboard._os_keyboard.listen = lambda callback: None
+keyboard._os_keyboard.map_name = _map_name
+keyboard._os_keyboard.press = lambda scan_code: None
+keyboard._os_keyboard.release = lambda scan_code: None
+
+# What a typical Keystrokes macro sends over and over.
+HOTKEYS = ['down', 'ctrl+shift+tab', 'alt+f4', 'ctrl+v', 'enter', 'shift+f10']
+KEYS = ['down', 'ctrl', 'shift', 'tab', 'alt', 'f4', 'v', 'enter', 'f10']
+
+def _run_all(function, arguments=HOTKEYS):
+    for argument in arguments:
+        function(argument)
+
+def _uncached(function):
+    def run(argument):
+        keyboard._clear_hotkey_cache()
+        function(argument)
+    return run
+
+def bench(label, statement, number, count=len(HOTKEYS), unit='hotkey'):
+    best = min(timeit.repeat(statement, number=number, repeat=5))
+    print('{:<32}{:>10.2f} us per {}'.format(label, best / number / count * 1e6, unit))
+
+def _make_replay_events():
+    """
+    One cycle of synthetic typing: plain letters, a held key repeating, a
+    shifted letter and a ctrl chord, as the OS would report them.
+    """
+    events = []
+    def key(event_type, name):
+        scan_code = _from_name[name][0][0]
+        events.append(KeyboardEvent(event_type, scan_code, name=name))
+    for name in 'hello':
+        key(KEY_DOWN, name)
+        key(KEY_UP, name)
+    for i in range(5):
+        key(KEY_DOWN, 'down')
+    key(KEY_UP, 'down')
+    key(KEY_DOWN, 'left shift')
+    key(KEY_DOWN, 'a')
+    key(KEY_UP, 'a')
+    key(KEY_UP, 'left shift')
+    key(KEY_DOWN, 'left ctrl')
+    key(KEY_DOWN, 'v')
+    key(KEY_UP, 'v')
+    key(KEY_UP, 'left ctrl')
+    return events
+
+def bench_replay(count=2000000, batch=10000):
+    """
+    Feeds `count` synthetic events through the listener, with a few hotkeys
+    registered, and waits for the non-blocking handlers to process them.
+    """
+    keyboard.add_hotkey('ctrl+v', lambda: None, suppress=True)
+    keyboard.add_hotkey('ctrl+shift+tab', lambda: None)
+    keyboard.hook_key('down', lambda event: None)
+    # Keep the benchmark from sending the keys that suppression replays.
+    keyboard._os_keyboard.press = lambda scan_code: None
+    cycle = _make_replay_events()
+    events = (cycle * (batch // len(cycle) + 1))[:batch]
+    direct_callback = keyboard._listener.direct_callback
+    start = time.perf_counter() if hasattr(time, 'perf_counter') else time.time()
+    for i in range(count // batch):
+        for event in events:
+            direct_callback(event)
+        keyboard._listener.queue.join()
+    elapsed = (time.perf_counter() if hasattr(time, 'perf_counter') else time.time()) - start
+    keyboard.unhook_all()
+    print('{:<32}{:>10.2f} us per event ({} events)'.format('listener replay', elapsed / count * 1e6, count))
+
+def bench_recording(count=200000):
+    """
+    Records `count` events into a queue and into a `KeyboardEventBuffer`, and
+    compares the time per event and the memory the buffer holds per event.
+    """
+    cycle = _make_replay_events()
+    events = (cycle * (count // len(cycle) + 1))[:count]
+    for label, factory in (('record, queue', keyboard._queue.Queue), ('record, event buffer', KeyboardEventBuffer)):
+        best = min(timeit.repeat(lambda: _run_all(factory().put, events), number=1, repeat=5))
+        print('{:<32}{:>10.2f} us per event'.format(label, best / count * 1e6))
+    buffer = KeyboardEventBuffer()
+    _run_all(buffer.put, events)
+    columns = (buffer._times, buffer._scan_codes, buffer._event_types, buffer._name_ids, buffer._device_ids, buffer._modifiers_ids, buffer._is_keypad)
+    size = sum(column.itemsize * len(column) for column in columns)
+    print('{:<32}{:>10.2f} bytes per event'.format('event buffer size', float(size) / count))
+
+def main(number=2000):
+    bench('parse_hotkey, cached', lambda: _run_all(keyboard.parse_hotkey), number)
+    bench('parse_hotkey, uncached', lambda: _run_all(_uncached(keyboard.parse_hotkey)), number)
+    bench('key_to_scan_codes, cached', lambda: _run_all(keyboard.key_to_scan_codes, KEYS), number, len(KEYS), 'key')
+    bench('key_to_scan_codes, uncached', lambda: _run_all(_uncached(keyboard.key_to_scan_codes), KEYS), number, len(KEYS), 'key')
+    bench('send, cached', lambda: _run_all(keyboard.send), number)
+    bench('send, uncached', lambda: _run_all(_uncached(keyboard.send)), number)
+    bench_replay()
+    bench_recording()
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 
 from time import time as now
+from array import array
+from threading import Lock
 import json
 from ._canonical_names import canonical_names, normalize_name
 
@@ -12,14 +14,24 @@ except NameError:
 KEY_DOWN = 'down'
 KEY_UP = 'up'
 
+# Raw key names to their normalized form. Every event of a key then shares one
+# name string, and only the first event of each key pays for `normalize_name`.
+_MAX_NORMALIZED_NAMES = 4096
+_normalized_names = {}
+
+def _normalize_event_name(name):
+    normalized = _normalized_names.get(name)
+    if normalized is None:
+        if len(_normalized_names) >= _MAX_NORMALIZED_NAMES:
+            # Typed text can bring endless names; start over rather than grow.
+            _normalized_names.clear()
+        normalized = normalize_name(name)
+        normalized = _normalized_names.setdefault(normalized, normalized)
+        _normalized_names[name] = normalized
+    return normalized
+
 class KeyboardEvent(object):
-    event_type = None
-    scan_code = None
-    name = None
-    time = None
-    device = None
-    modifiers = None
-    is_keypad = None
+    __slots__ = ('event_type', 'scan_code', 'name', 'time', 'device', 'modifiers', 'is_keypad')
 
     def __init__(self, event_type, scan_code, name=None, time=None, device=None, modifiers=None, is_keypad=None):
         self.event_type = event_type
@@ -28,8 +40,7 @@ class KeyboardEvent(object):
         self.device = device
         self.is_keypad = is_keypad
         self.modifiers = modifiers
-        if name:
-            self.name = normalize_name(name)
+        self.name = _normalize_event_name(name) if name else None
 
     def to_json(self, ensure_ascii=False):
         attrs = dict(
@@ -51,3 +62,112 @@ class KeyboardEvent(object):
                 not self.name or not other.name or self.name == other.name
             )
         )
+
+class KeyboardEventBuffer(object):
+    """
+    Stores keyboard events compactly, as parallel `array` columns of time,
+    scan code, event type and the ids of their name, device and modifiers.
+
+    It can stand in for the queue given to `start_recording`: events come in
+    through `put`, and indexing, slicing or iterating it (or its `queue`)
+    gives back `KeyboardEvent` objects. With `maxlen`, at most that many events
+    are kept: a `ring` buffer drops the oldest ones, otherwise new events are
+    ignored once it is full.
+    """
+    _NONE = -1
+    _NO_SCAN_CODE = -(2 ** 31)
+    _EVENT_TYPES = (KEY_DOWN, KEY_UP)
+
+    def __init__(self, maxlen=None, ring=False):
+        self.maxlen = maxlen
+        self.ring = ring
+        self._lock = Lock()
+        # Names, devices and modifiers are few and repeat, so they are stored once.
+        self._values = []
+        self._value_ids = {}
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._times = array('d')
+            self._scan_codes = array('l')
+            self._event_types = array('b')
+            self._name_ids = array('l')
+            self._device_ids = array('l')
+            self._modifiers_ids = array('l')
+            self._is_keypad = array('b')
+            # Index of the oldest event, once a ring buffer has wrapped around.
+            self._start = 0
+
+    def _value_id(self, value):
+        if value is None:
+            return self._NONE
+        value_id = self._value_ids.get(value)
+        if value_id is None:
+            value_id = self._value_ids[value] = len(self._values)
+            self._values.append(value)
+        return value_id
+
+    def put(self, event):
+        scan_code = self._NO_SCAN_CODE if event.scan_code is None else event.scan_code
+        event_type = 0 if event.event_type == KEY_DOWN else 1
+        is_keypad = self._NONE if event.is_keypad is None else int(bool(event.is_keypad))
+        with self._lock:
+            name_id = self._value_id(event.name)
+            device_id = self._value_id(event.device)
+            modifiers_id = self._value_id(event.modifiers)
+            if self.maxlen is None or len(self._times) < self.maxlen:
+                self._times.append(event.time)
+                self._scan_codes.append(scan_code)
+                self._event_types.append(event_type)
+                self._name_ids.append(name_id)
+                self._device_ids.append(device_id)
+                self._modifiers_ids.append(modifiers_id)
+                self._is_keypad.append(is_keypad)
+            elif self.ring and self.maxlen:
+                i = self._start
+                self._times[i] = event.time
+                self._scan_codes[i] = scan_code
+                self._event_types[i] = event_type
+                self._name_ids[i] = name_id
+                self._device_ids[i] = device_id
+                self._modifiers_ids[i] = modifiers_id
+                self._is_keypad[i] = is_keypad
+                self._start = (i + 1) % self.maxlen
+
+    def _event_at(self, i):
+        scan_code = self._scan_codes[i]
+        name_id, device_id, modifiers_id = self._name_ids[i], self._device_ids[i], self._modifiers_ids[i]
+        is_keypad = self._is_keypad[i]
+        event = KeyboardEvent(self._EVENT_TYPES[self._event_types[i]], None if scan_code == self._NO_SCAN_CODE else scan_code, time=self._times[i])
+        # Set directly: the stored names are normalized already.
+        event.name = None if name_id == self._NONE else self._values[name_id]
+        event.device = None if device_id == self._NONE else self._values[device_id]
+        event.modifiers = None if modifiers_id == self._NONE else self._values[modifiers_id]
+        event.is_keypad = None if is_keypad == self._NONE else bool(is_keypad)
+        return event
+
+    def __len__(self):
+        return len(self._times)
+
+    def __getitem__(self, index):
+        with self._lock:
+            count = len(self._times)
+            if isinstance(index, slice):
+                return [self._event_at((self._start + i) % count) for i in range(*index.indices(count))]
+            if index < 0:
+                index += count
+            if not 0 <= index < count:
+                raise IndexError('event index out of range')
+            return self._event_at((self._start + index) % count)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    @property
+    def queue(self):
+        """ The events, oldest first, like the `queue` of a `queue.Queue`. """
+        return self
+
+    def __repr__(self):
+        return 'KeyboardEventBuffer({} events)'.format(len(self))
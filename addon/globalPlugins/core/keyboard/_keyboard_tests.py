@@ -14,11 +14,15 @@ and added to `output_events` immediately, mimicking real functionality.
 """
 from __future__ import print_function
 
+import os
+import platform
+import shutil
+import tempfile
 import unittest
 import time
 
 import keyboard
-from ._keyboard_event import KeyboardEvent, KEY_DOWN, KEY_UP
+from ._keyboard_event import KeyboardEvent, KeyboardEventBuffer, KEY_DOWN, KEY_UP
 
 dummy_keys = {
     'space': [(0, [])],
@@ -129,6 +133,46 @@ class TestKeyboard(unittest.TestCase):
 
         keyboard._listener.queue.join()
 
+    def test_event_slots(self):
+        event = KeyboardEvent(KEY_DOWN, 1, 'Control')
+        self.assertFalse(hasattr(event, '__dict__'))
+        self.assertEqual(event.name, 'ctrl')
+        self.assertIs(event.name, KeyboardEvent(KEY_UP, 1, 'Control').name)
+        self.assertIs(event.name, KeyboardEvent(KEY_UP, 1, 'ctrl').name)
+        self.assertIsNone(KeyboardEvent(KEY_DOWN, 1).name)
+    def test_event_buffer(self):
+        buffer = KeyboardEventBuffer()
+        events = [
+            KeyboardEvent(KEY_DOWN, 1, 'a', time=1.5, device='kbd', modifiers=('shift',), is_keypad=False),
+            KeyboardEvent(KEY_UP, None, time=2.5),
+            KeyboardEvent(KEY_UP, 1, 'a', time=3.5, is_keypad=True),
+        ]
+        for event in events:
+            buffer.put(event)
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(list(buffer), events)
+        self.assertEqual(list(buffer.queue), events)
+        for original, stored in zip(events, buffer):
+            for attr in KeyboardEvent.__slots__:
+                self.assertEqual(getattr(stored, attr), getattr(original, attr))
+        self.assertEqual(buffer[-1].time, 3.5)
+        self.assertEqual([e.time for e in buffer[1:]], [2.5, 3.5])
+        with self.assertRaises(IndexError):
+            buffer[3]
+        buffer.clear()
+        self.assertEqual(list(buffer), [])
+    def test_event_buffer_bounded(self):
+        buffer = KeyboardEventBuffer(maxlen=2)
+        for i in range(5):
+            buffer.put(KeyboardEvent(KEY_DOWN, i + 1, time=i))
+        self.assertEqual([e.scan_code for e in buffer], [1, 2])
+    def test_event_buffer_ring(self):
+        buffer = KeyboardEventBuffer(maxlen=3, ring=True)
+        for i in range(7):
+            buffer.put(KeyboardEvent(KEY_DOWN, i + 1, time=i))
+        self.assertEqual([e.scan_code for e in buffer], [5, 6, 7])
+        self.assertEqual(buffer[0].time, 4)
+        self.assertEqual(buffer[-1].time, 6)
     def test_event_json(self):
         event = make_event(KEY_DOWN, u'á \'"', 999)
         import json
@@ -207,6 +251,43 @@ class TestKeyboard(unittest.TestCase):
         self.assertEqual(keyboard.parse_hotkey(result), (((1,),),))
     def test_parse_hotkey_list_names(self):
         self.assertEqual(keyboard.parse_hotkey(['a', 'b', 'c']), (((1,), (2,), (3,)),))
+    def test_parse_hotkey_cached(self):
+        self.assertIs(keyboard.parse_hotkey('a+b, c'), keyboard.parse_hotkey('a+b, c'))
+    def test_parse_hotkey_cache_bounded(self):
+        for i in range(keyboard._HOTKEY_CACHE_SIZE + 10):
+            keyboard.parse_hotkey(', '.join(['a'] * (i + 1)))
+        self.assertEqual(len(keyboard._hotkey_cache), keyboard._HOTKEY_CACHE_SIZE)
+    def test_parse_hotkey_cache_tables_rebuilt(self):
+        self.assertEqual(keyboard.parse_hotkey('a+b'), (((1,), (2,)),))
+        original = dummy_keys['b']
+        dummy_keys['b'] = [(30, [])]
+        version = getattr(keyboard._os_keyboard, 'tables_version', 0)
+        keyboard._os_keyboard.tables_version = version + 1
+        try:
+            self.assertEqual(keyboard.parse_hotkey('a+b'), (((1,), (30,)),))
+            self.assertEqual(keyboard.key_to_scan_codes('b'), (30,))
+        finally:
+            dummy_keys['b'] = original
+            keyboard._os_keyboard.tables_version = version + 2
+    def test_modifier_scan_codes_tables_rebuilt(self):
+        self.assertTrue(keyboard.is_modifier(4))
+        self.assertFalse(keyboard.is_modifier(30))
+        original = dummy_keys['left alt']
+        dummy_keys['left alt'] = [(30, [])]
+        version = getattr(keyboard._os_keyboard, 'tables_version', 0)
+        keyboard._os_keyboard.tables_version = version + 1
+        try:
+            self.assertTrue(keyboard.is_modifier(30))
+            self.do([KeyboardEvent(KEY_DOWN, 30, 'left alt')])
+            self.assertEqual(keyboard._listener.active_modifiers, {30})
+        finally:
+            dummy_keys['left alt'] = original
+            keyboard._os_keyboard.tables_version = version + 2
+    def test_key_to_scan_code_cached_error(self):
+        for i in range(2):
+            with self.assertRaises(ValueError):
+                keyboard.key_to_scan_codes('none')
+        self.assertEqual(keyboard.key_to_scan_codes('none', False), ())
 
     def test_is_pressed_none(self):
         self.assertFalse(keyboard.is_pressed('a'))
@@ -436,6 +517,13 @@ class TestKeyboard(unittest.TestCase):
         keyboard.start_recording()
         self.do(d_a+u_a)
         self.assertEqual(keyboard.stop_recording(), d_a+u_a)
+    def test_start_recording_buffer(self):
+        queue, hooked = keyboard.start_recording()
+        self.assertIsInstance(queue, KeyboardEventBuffer)
+        self.do(d_a+u_a)
+        events = keyboard.stop_recording()
+        self.assertEqual(events, d_a+u_a)
+        self.assertEqual(events[0].name, 'a')
     def test_stop_recording_error(self):
         with self.assertRaises(ValueError):
             keyboard.stop_recording()
@@ -823,5 +911,73 @@ class TestKeyboard(unittest.TestCase):
     #    self.do(du_a+du_b+du_c+du_space, [])
 
 
+dummy_keys_dump = """keycode   1 = Escape
+keycode  28 = Return
+keycode  30 = +a +A
+keycode  79 = KP_1
+"""
+dummy_long_info_dump = """Control_m for Return
+"""
+
+@unittest.skipUnless(platform.system() == 'Linux', 'Linux name tables')
+class TestNixTables(unittest.TestCase):
+    def setUp(self):
+        from . import _nixkeyboard
+        self.nix = _nixkeyboard
+        self.saved = (_nixkeyboard.to_name, _nixkeyboard.from_name, _nixkeyboard.keypad_scan_codes)
+        self.saved_functions = (_nixkeyboard.ensure_root, _nixkeyboard.dump_keymap, _nixkeyboard.get_tables_cache_path)
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.cache_dir, 'keyboard', 'nix_tables.json')
+        self.dumps = [(dummy_keys_dump, dummy_long_info_dump)]
+        _nixkeyboard.ensure_root = lambda: None
+        _nixkeyboard.dump_keymap = lambda: self.dumps[0]
+        _nixkeyboard.get_tables_cache_path = lambda: self.cache_path
+
+    def tearDown(self):
+        self.nix.ensure_root, self.nix.dump_keymap, self.nix.get_tables_cache_path = self.saved_functions
+        self.nix.install_tables(self.saved)
+        shutil.rmtree(self.cache_dir)
+
+    def test_parse_tables(self):
+        to_name, from_name, keypad_scan_codes = self.nix.parse_tables(dummy_keys_dump, dummy_long_info_dump)
+        self.assertEqual(to_name[(30, ())], ['a'])
+        self.assertEqual(to_name[(30, ('shift',))], ['A'])
+        self.assertEqual(from_name['keypad 1'], [(79, ())])
+        self.assertIn((28, ()), from_name['m'])
+        self.assertEqual(keypad_scan_codes, {79})
+
+    def test_save_load_tables(self):
+        tables = self.nix.parse_tables(dummy_keys_dump, dummy_long_info_dump)
+        self.nix.save_tables(self.cache_path, 'hash', tables)
+        keymap_hash, loaded = self.nix.load_tables(self.cache_path)
+        self.assertEqual(keymap_hash, 'hash')
+        self.assertEqual([dict(table) if isinstance(table, dict) else table for table in loaded], [dict(tables[0]), dict(tables[1]), tables[2]])
+
+    def test_load_tables_missing_or_corrupt(self):
+        self.assertIsNone(self.nix.load_tables(self.cache_path))
+        os.makedirs(os.path.dirname(self.cache_path))
+        with open(self.cache_path, 'w') as cache_file:
+            cache_file.write('{"format": 1, "to_n')
+        self.assertIsNone(self.nix.load_tables(self.cache_path))
+
+    def test_build_tables_from_cache(self):
+        self.nix.install_tables(({}, {}, set()))
+        self.nix.build_tables()
+        self.assertTrue(os.path.exists(self.cache_path))
+        self.nix.install_tables(({}, {}, set()))
+        self.dumps[0] = (dummy_keys_dump.replace('+a +A', '+b +B'), dummy_long_info_dump)
+        version = self.nix.tables_version
+        self.nix.build_tables()
+        # The cached tables are used at once...
+        self.assertEqual(self.nix.to_name[(30, ())], ['a'])
+        # ...and replaced in the background, as the keymap changed.
+        for i in range(100):
+            if self.nix.tables_version > version + 1:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.nix.to_name[(30, ())], ['b'])
+        self.assertEqual(self.nix.load_tables(self.cache_path)[1][0][(30, ())], ['b'])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
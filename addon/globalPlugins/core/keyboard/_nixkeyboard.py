@@ -44,24 +44,54 @@ def cleanup_modifier(modifier):
 Use `dumpkeys --keys-only` to list all scan codes and their names. We
 then parse the output and built a table. For each scan code and modifiers we
 have a list of names and vice-versa.
+
+Running and parsing dumpkeys is slow, so the tables are also saved to the
+user's cache directory, along with a hash of the dumpkeys output they were
+built from. Later sessions start from the saved tables and check the keymap
+in the background, rebuilding the tables only if it changed.
 """
 from subprocess import check_output
 from collections import defaultdict
+from threading import Lock, Thread
+import hashlib
+import json
+import os
 import re
+import tempfile
 
 to_name = defaultdict(list)
 from_name = defaultdict(list)
+# Bumped whenever the tables above are (re)built, so cached lookups know to start over.
+tables_version = 0
 keypad_scan_codes = set()
+tables_lock = Lock()
 
-def register_key(key_and_modifiers, name):
-    if name not in to_name[key_and_modifiers]:
-        to_name[key_and_modifiers].append(name)
-    if key_and_modifiers not in from_name[name]:
-        from_name[name].append(key_and_modifiers)
+TABLES_CACHE_FORMAT = 1
 
-def build_tables():
-    if to_name and from_name: return
-    ensure_root()
+def get_tables_cache_path():
+    cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_dir, 'keyboard', 'nix_tables.json')
+
+def dump_keymap():
+    """ Returns the dumpkeys output the tables are built from. """
+    keys_dump = check_output(['dumpkeys', '--keys-only'], universal_newlines=True)
+    long_info_dump = check_output(['dumpkeys', '--long-info'], universal_newlines=True)
+    return keys_dump, long_info_dump
+
+def hash_keymap(dumps):
+    return hashlib.sha256('\0'.join(dumps).encode('utf-8')).hexdigest()
+
+def parse_tables(keys_dump, long_info_dump):
+    """ Returns new (to_name, from_name, keypad_scan_codes) tables parsed from dumpkeys output. """
+    new_to_name = defaultdict(list)
+    new_from_name = defaultdict(list)
+    new_keypad_scan_codes = set()
+
+    def register_key(key_and_modifiers, name):
+        if name not in new_to_name[key_and_modifiers]:
+            new_to_name[key_and_modifiers].append(name)
+        if key_and_modifiers not in new_from_name[name]:
+            new_from_name[name].append(key_and_modifiers)
 
     modifiers_bits = {
         'shift': 1,
@@ -70,37 +100,121 @@ def build_tables():
         'alt': 8,
     }
     keycode_template = r'^keycode\s+(\d+)\s+=(.*?)$'
-    dump = check_output(['dumpkeys', '--keys-only'], universal_newlines=True)
-    for str_scan_code, str_names in re.findall(keycode_template, dump, re.MULTILINE):
+    for str_scan_code, str_names in re.findall(keycode_template, keys_dump, re.MULTILINE):
         scan_code = int(str_scan_code)
         for i, str_name in enumerate(str_names.strip().split()):
             modifiers = tuple(sorted(modifier for modifier, bit in modifiers_bits.items() if i & bit))
             name, is_keypad = cleanup_key(str_name)
             register_key((scan_code, modifiers), name)
             if is_keypad:
-                keypad_scan_codes.add(scan_code)
+                new_keypad_scan_codes.add(scan_code)
                 register_key((scan_code, modifiers), 'keypad ' + name)
 
     # dumpkeys consistently misreports the Windows key, sometimes
     # skipping it completely or reporting as 'alt. 125 = left win,
     # 126 = right win.
-    if (125, ()) not in to_name or to_name[(125, ())] == 'alt':
+    if (125, ()) not in new_to_name or new_to_name[(125, ())] == 'alt':
         register_key((125, ()), 'windows')
-    if (126, ()) not in to_name or to_name[(126, ())] == 'alt':
+    if (126, ()) not in new_to_name or new_to_name[(126, ())] == 'alt':
         register_key((126, ()), 'windows')
 
     # The menu key is usually skipped altogether, so we also add it manually.
-    if (127, ()) not in to_name:
+    if (127, ()) not in new_to_name:
         register_key((127, ()), 'menu')
 
     synonyms_template = r'^(\S+)\s+for (.+)$'
-    dump = check_output(['dumpkeys', '--long-info'], universal_newlines=True)
-    for synonym_str, original_str in re.findall(synonyms_template, dump, re.MULTILINE):
+    for synonym_str, original_str in re.findall(synonyms_template, long_info_dump, re.MULTILINE):
         synonym, _ = cleanup_key(synonym_str)
         original, _ = cleanup_key(original_str)
         if synonym != original:
-            from_name[original].extend(from_name[synonym])
-            from_name[synonym].extend(from_name[original])
+            new_from_name[original].extend(new_from_name[synonym])
+            new_from_name[synonym].extend(new_from_name[original])
+
+    return new_to_name, new_from_name, new_keypad_scan_codes
+
+def install_tables(tables):
+    """ Makes the given (to_name, from_name, keypad_scan_codes) the current tables. """
+    global to_name, from_name, keypad_scan_codes, tables_version
+    # Rebinding keeps the listener from ever seeing half-filled tables.
+    to_name, from_name, keypad_scan_codes = tables
+    tables_version += 1
+
+def save_tables(path, keymap_hash, tables):
+    table_to_name, table_from_name, table_keypad_scan_codes = tables
+    data = {
+        'format': TABLES_CACHE_FORMAT,
+        'keymap_hash': keymap_hash,
+        'to_name': [[scan_code, list(modifiers), names] for (scan_code, modifiers), names in table_to_name.items()],
+        'from_name': [[name, [[scan_code, list(modifiers)] for scan_code, modifiers in entries]] for name, entries in table_from_name.items()],
+        'keypad_scan_codes': sorted(table_keypad_scan_codes),
+    }
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    # Write next to the cache and rename it over, so readers never see a partial file.
+    handle, temp_path = tempfile.mkstemp(prefix='.nix_tables-', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(handle, 'w') as temp_file:
+            json.dump(data, temp_file)
+        os.rename(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+def load_tables(path):
+    """ Returns (keymap_hash, tables) saved by `save_tables`, or None. """
+    try:
+        with open(path) as cache_file:
+            data = json.load(cache_file)
+        if data.get('format') != TABLES_CACHE_FORMAT:
+            return None
+        table_to_name = defaultdict(list)
+        for scan_code, modifiers, names in data['to_name']:
+            table_to_name[(scan_code, tuple(modifiers))] = names
+        table_from_name = defaultdict(list)
+        for name, entries in data['from_name']:
+            table_from_name[name] = [(scan_code, tuple(modifiers)) for scan_code, modifiers in entries]
+        tables = (table_to_name, table_from_name, set(data['keypad_scan_codes']))
+        return data['keymap_hash'], tables
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        return None
+
+def _build_and_save_tables(dumps, keymap_hash):
+    tables = parse_tables(*dumps)
+    install_tables(tables)
+    try:
+        save_tables(get_tables_cache_path(), keymap_hash, tables)
+    except (IOError, OSError):
+        traceback.print_exc()
+
+def _refresh_tables(cached_hash):
+    """ Rebuilds the tables loaded from the cache if the keymap changed since. """
+    try:
+        dumps = dump_keymap()
+        keymap_hash = hash_keymap(dumps)
+        if keymap_hash != cached_hash:
+            with tables_lock:
+                _build_and_save_tables(dumps, keymap_hash)
+    except Exception:
+        traceback.print_exc()
+
+def build_tables():
+    if to_name and from_name: return
+    with tables_lock:
+        if to_name and from_name: return
+        ensure_root()
+
+        cached = load_tables(get_tables_cache_path())
+        if cached is not None:
+            cached_hash, tables = cached
+            install_tables(tables)
+            refresh = Thread(target=_refresh_tables, args=(cached_hash,), name='keyboard tables refresh')
+            refresh.daemon = True
+            refresh.start()
+            return
+
+        dumps = dump_keymap()
+        _build_and_save_tables(dumps, hash_keymap(dumps))
 
 device = None
 def build_device():
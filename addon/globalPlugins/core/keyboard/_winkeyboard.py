@@ -332,6 +332,8 @@ official_virtual_keys = {
 tables_lock = Lock()
 to_name = defaultdict(list)
 from_name = defaultdict(list)
+# Bumped whenever the tables above are (re)built, so cached lookups know to start over.
+tables_version = 0
 scan_code_to_vk = {}
 
 distinct_modifiers = [
@@ -385,6 +387,7 @@ def _setup_name_tables():
     Ensures the scan code/virtual key code/name translation tables are
     filled.
     """
+    global tables_version
     with tables_lock:
         if to_name: return
 
@@ -435,6 +438,8 @@ def _setup_name_tables():
     for name, entries in list(from_name.items()):
         from_name[name] = sorted(set(entries), key=order_key)
 
+    tables_version += 1
+
 # Called by keyboard/__init__.py
 init = _setup_name_tables
 
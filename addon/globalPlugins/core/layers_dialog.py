@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+import addonHandler
+import gui
+from gui import guiHelper, nvdaControls
+import wx
+
+from .command_picker_dialog import loadCommandCatalogAsync
+from .constants import CONFIRM_CAPTION, ERROR_CAPTION, RESERVED_GESTURES, WARNING_CAPTION
+from .gestures import formatGestureForDisplay, normalizeGesture, validateGestureName
+from .item_dialog import ShortcutCaptureDialog
+from .nvda_commands import findCommandsForGesture, peekNvdaCommandCatalog
+
+addonHandler.initTranslation()
+
+
+class LayersDialog(wx.Dialog):
+	"""Edit the named instant layers and the keys toggling them.
+
+	On OK, result holds the new layer list and renames maps old layer names to new ones.
+	itemIndex, when given, is used to warn about toggle keys that items already start with.
+	"""
+
+	def __init__(self, parent, layers, itemIndex=None):
+		# Translators: Title of the dialog editing the instant layers.
+		wx.Dialog.__init__(self, parent, title=_("Layers"), style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+		self.layers = [
+			{"name": layer["name"], "gesture": layer.get("gesture", ""), "originalName": layer["name"]}
+			for layer in layers
+		]
+		self.result = None
+		self.renames = {}
+		self._itemIndex = itemIndex
+		self._nvdaCatalog = peekNvdaCommandCatalog()
+		self._catalogFuture = None
+
+		mainSizer = wx.BoxSizer(wx.VERTICAL)
+		sizerHelper = guiHelper.BoxSizerHelper(self, wx.VERTICAL)
+		# Translators: Label of the list of instant layers.
+		sizerHelper.addItem(wx.StaticText(self, wx.ID_ANY, _("&Layers")))
+		self.layersList = nvdaControls.AutoWidthColumnListCtrl(
+			self, style=wx.LC_REPORT | wx.LC_SINGLE_SEL | wx.BORDER_SUNKEN
+		)
+		self.layersList.InsertColumn(0, _("Name"))
+		# Translators: Column label for the key toggling a layer.
+		self.layersList.InsertColumn(1, _("Toggle key"))
+		sizerHelper.addItem(self.layersList, flag=wx.EXPAND, proportion=1)
+
+		layerButtons = guiHelper.ButtonHelper(wx.HORIZONTAL)
+		self.addButton = layerButtons.addButton(self, label=_("&Add"))
+		# Translators: Label of the button renaming the selected layer.
+		self.renameButton = layerButtons.addButton(self, label=_("&Rename"))
+		# Translators: Label of the button setting the key toggling the selected layer.
+		self.toggleKeyButton = layerButtons.addButton(self, label=_("Set &toggle key..."))
+		self.removeButton = layerButtons.addButton(self, label=_("Re&move"))
+		sizerHelper.addItem(layerButtons.sizer, flag=wx.EXPAND)
+
+		buttonSizer = guiHelper.ButtonHelper(wx.HORIZONTAL)
+		self.okButton = buttonSizer.addButton(self, wx.ID_OK, _("&OK"))
+		buttonSizer.addButton(self, wx.ID_CANCEL, _("&Cancel"))
+
+		mainSizer.Add(sizerHelper.sizer, 1, wx.ALL | wx.EXPAND, 10)
+		mainSizer.Add(buttonSizer.sizer, 0, wx.ALL | wx.ALIGN_CENTER, 5)
+		self.SetSizerAndFit(mainSizer)
+		self.SetMinSize((500, 360))
+
+		self.addButton.Bind(wx.EVT_BUTTON, self.onAdd)
+		self.renameButton.Bind(wx.EVT_BUTTON, self.onRename)
+		self.toggleKeyButton.Bind(wx.EVT_BUTTON, self.onSetToggleKey)
+		self.removeButton.Bind(wx.EVT_BUTTON, self.onRemove)
+		self.layersList.Bind(wx.EVT_LIST_ITEM_SELECTED, self.onSelectionChange)
+		self.layersList.Bind(wx.EVT_LIST_ITEM_DESELECTED, self.onSelectionChange)
+		self.okButton.Bind(wx.EVT_BUTTON, self.onOk)
+
+		self.refreshList()
+		if self._nvdaCatalog is None:
+			self._catalogFuture = loadCommandCatalogAsync()
+			self._catalogFuture.add_done_callback(lambda future: wx.CallAfter(self._onNvdaCatalogLoaded, future))
+		self.CentreOnScreen()
+
+	def _onNvdaCatalogLoaded(self, future):
+		if future is not self._catalogFuture or not self:
+			return
+		try:
+			self._nvdaCatalog = future.result()
+		except Exception:
+			return
+
+	def findToggleKeyWarnings(self, gestureName):
+		"""Return warnings about what gestureName would stop reaching as the toggle key of a layer."""
+		warnings = []
+		if self._itemIndex is not None:
+			names = self._itemIndex.findItemsStartingWith(gestureName)
+			if names:
+				warnings.append(
+					# Translators: Warning shown when a layer toggle key starts item shortcuts. {names} lists the items.
+					_("This key switches the layer instead of running {names}.").format(names=", ".join(names))
+				)
+		if self._nvdaCatalog is not None:
+			commands = findCommandsForGesture(self._nvdaCatalog, gestureName)
+			if commands:
+				warnings.append(
+					# Translators: Warning shown when a layer toggle key is also an NVDA command gesture. {commands} lists the commands.
+					_("This key replaces the NVDA command, even outside instant mode: {commands}").format(
+						commands="; ".join(command.label for command in commands),
+					)
+				)
+		return warnings
+
+	def refreshList(self, selectIndex=-1):
+		self.layersList.DeleteAllItems()
+		for index, layer in enumerate(self.layers):
+			gesture = layer["gesture"]
+			# Translators: Shown in place of the toggle key of a layer that has none.
+			gestureText = formatGestureForDisplay(gesture) if gesture else _("None")
+			self.layersList.InsertItem(index, layer["name"])
+			self.layersList.SetItem(index, 1, gestureText)
+		if 0 <= selectIndex < len(self.layers):
+			self.layersList.Select(selectIndex)
+			self.layersList.Focus(selectIndex)
+		self.updateButtons()
+
+	def updateButtons(self):
+		hasSelection = self.layersList.GetFirstSelected() != -1
+		self.renameButton.Enable(hasSelection)
+		self.toggleKeyButton.Enable(hasSelection)
+		self.removeButton.Enable(hasSelection)
+
+	def onSelectionChange(self, event):
+		self.updateButtons()
+
+	def _askName(self, title, value=""):
+		"""Ask for a layer name; return it, or None if cancelled or already taken."""
+		# Translators: Prompt for the name of a layer.
+		dialog = wx.TextEntryDialog(self, _("Layer name:"), title, value)
+		name = None
+		if dialog.ShowModal() == wx.ID_OK:
+			name = dialog.GetValue().strip()
+		dialog.Destroy()
+		if not name:
+			return None
+		selectedIndex = self.layersList.GetFirstSelected() if value else -1
+		for index, layer in enumerate(self.layers):
+			if index != selectedIndex and layer["name"].lower() == name.lower():
+				# Translators: Error shown when a layer name is already used.
+				gui.messageBox(_("A layer with this name already exists."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
+				return None
+		return name
+
+	def onAdd(self, event):
+		# Translators: Title of the dialog adding a layer.
+		name = self._askName(_("Add layer"))
+		if name is None:
+			return
+		self.layers.append({"name": name, "gesture": "", "originalName": ""})
+		self.refreshList(len(self.layers) - 1)
+
+	def onRename(self, event):
+		index = self.layersList.GetFirstSelected()
+		if index == -1:
+			return
+		# Translators: Title of the dialog renaming a layer.
+		name = self._askName(_("Rename layer"), self.layers[index]["name"])
+		if name is None:
+			return
+		self.layers[index]["name"] = name
+		self.refreshList(index)
+
+	def onSetToggleKey(self, event):
+		index = self.layersList.GetFirstSelected()
+		if index == -1:
+			return
+		dialog = ShortcutCaptureDialog(self)
+		gestureName = ""
+		if dialog.ShowModal() == wx.ID_OK:
+			gestureName = normalizeGesture(dialog.gestureName)
+		dialog.Destroy()
+		if not gestureName:
+			return
+		if gestureName in RESERVED_GESTURES:
+			gui.messageBox(
+				_("This shortcut is reserved for instant Access."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR
+			)
+			return
+		if not validateGestureName(formatGestureForDisplay(gestureName)):
+			gui.messageBox(_("Invalid shortcut key."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
+			return
+		for otherIndex, layer in enumerate(self.layers):
+			if otherIndex != index and layer["gesture"] == gestureName:
+				gui.messageBox(
+					# Translators: Error shown when a toggle key already switches another layer. {layer} is its name.
+					_("This key already toggles the {layer} layer.").format(layer=layer["name"]),
+					ERROR_CAPTION,
+					wx.OK | wx.ICON_ERROR,
+				)
+				return
+		warnings = self.findToggleKeyWarnings(gestureName)
+		if warnings:
+			# Translators: Asked after the warnings about a layer toggle key.
+			message = "\n".join(warnings + [_("Use this key anyway?")])
+			if gui.messageBox(message, WARNING_CAPTION, wx.YES_NO | wx.ICON_WARNING) != wx.YES:
+				return
+		self.layers[index]["gesture"] = gestureName
+		self.refreshList(index)
+
+	def onRemove(self, event):
+		index = self.layersList.GetFirstSelected()
+		if index == -1:
+			return
+		# Translators: Confirmation before removing a layer. {layer} is its name.
+		message = _("Remove the {layer} layer? Its items move to the default layer.").format(
+			layer=self.layers[index]["name"],
+		)
+		if gui.messageBox(message, CONFIRM_CAPTION, wx.YES_NO | wx.ICON_QUESTION) != wx.YES:
+			return
+		del self.layers[index]
+		self.refreshList(min(index, len(self.layers) - 1))
+
+	def onOk(self, event):
+		self.result = [{"name": layer["name"], "gesture": layer["gesture"]} for layer in self.layers]
+		self.renames = {
+			layer["originalName"]: layer["name"]
+			for layer in self.layers
+			if layer["originalName"] and layer["originalName"] != layer["name"]
+		}
+		self.EndModal(wx.ID_OK)
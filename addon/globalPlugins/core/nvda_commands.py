@@ -1,18 +1,27 @@
 # -*- coding: utf-8 -*-
 
 from dataclasses import dataclass
+import json
 from locale import strxfrm
+import logging
+import os
+import threading
 
 import addonHandler
 import api
+import globalVars
 import inputCore
 import keyboardHandler
 import scriptHandler
 import ui
 import wx
 
+from .gestures import normalizeGestureIdentifier
+
 addonHandler.initTranslation()
 
+log = logging.getLogger(__name__)
+
 
 COMMAND_ID_SEPARATOR = "|"
 
@@ -24,6 +33,7 @@ class NvdaCommand:
 	moduleName: str
 	className: str
 	scriptName: str
+	gestures: tuple = ()
 
 	@property
 	def identifier(self):
@@ -45,12 +55,23 @@ def parseCommandIdentifier(commandId):
 	return {"moduleName": parts[0], "className": parts[1], "scriptName": parts[2]}
 
 
-def _getAllGestureScriptInfo():
+def _getMappingFocus():
+	"""Return the focus and ancestors whose gestures apply, ignoring NVDA's own dialogs."""
 	try:
 		import gui
 
 		prevFocus = getattr(gui.mainFrame, "prevFocus", None)
 		prevFocusAncestors = getattr(gui.mainFrame, "prevFocusAncestors", None)
+		if prevFocus:
+			return prevFocus, prevFocusAncestors
+	except Exception:
+		pass
+	return None, None
+
+
+def _getAllGestureScriptInfo():
+	try:
+		prevFocus, prevFocusAncestors = _getMappingFocus()
 		if prevFocus:
 			mappings = inputCore.manager.getAllGestureMappings(obj=prevFocus, ancestors=prevFocusAncestors)
 		else:
@@ -60,7 +81,7 @@ def _getAllGestureScriptInfo():
 	return mappings
 
 
-def getAllActiveNvdaCommands():
+def _buildActiveNvdaCommands():
 	mappings = _getAllGestureScriptInfo()
 	commands = []
 	for category in sorted(mappings.keys(), key=strxfrm):
@@ -81,16 +102,198 @@ def getAllActiveNvdaCommands():
 					moduleName=moduleName,
 					className=className,
 					scriptName=scriptName,
+					gestures=tuple(getattr(scriptInfo, "gestures", ()) or ()),
 				),
 			)
 	return commands
 
 
+class NvdaCommandCatalog:
+	"""An immutable, indexed snapshot of the NVDA commands available in one context."""
+
+	def __init__(self, commands, fingerprint=()):
+		self.commands = list(commands)
+		self.fingerprint = tuple(fingerprint)
+		self.byIdentifier = {}
+		self.byCategory = {}
+		self.byGesture = {}
+		for command in self.commands:
+			self.byIdentifier.setdefault(command.identifier, command)
+			self.byCategory.setdefault(command.category, []).append(command)
+			for gesture in command.gestures:
+				gesture = normalizeGestureIdentifier(gesture)
+				if gesture:
+					self.byGesture.setdefault(gesture, []).append(command)
+
+	def toJson(self):
+		return {
+			"fingerprint": list(self.fingerprint),
+			"commands": [
+				[
+					command.category,
+					command.displayName,
+					command.moduleName,
+					command.className,
+					command.scriptName,
+					list(command.gestures),
+				]
+				for command in self.commands
+			],
+		}
+
+	@classmethod
+	def fromJson(cls, data):
+		commands = []
+		for row in data.get("commands", []):
+			if not (isinstance(row, list) and len(row) == 6 and isinstance(row[5], list)):
+				continue
+			if all(isinstance(value, str) for value in row[:5] + row[5]):
+				commands.append(NvdaCommand(*row[:5], gestures=tuple(row[5])))
+		return cls(commands, fingerprint=data.get("fingerprint", []))
+
+
+class _CatalogStore:
+	"""Keeps the catalog for the current context in memory and on disk.
+
+	A catalog is valid for as long as its fingerprint matches: the focused app module, the active
+	configuration profile, the user gesture map, the language, the NVDA version and the running
+	global plugins. Any change there produces a new fingerprint and therefore a rebuild.
+	"""
+
+	CACHE_VERSION = 2
+	MAX_PERSISTED_CATALOGS = 8
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._current = None
+		self._persisted = None
+
+	def _getCachePath(self):
+		return os.path.join(globalVars.appArgs.configPath, "instantAccess", "commandCatalog.json")
+
+	def _getFingerprint(self):
+		focus, _ancestors = _getMappingFocus()
+		if focus is None:
+			focus = api.getFocusObject()
+		appModule = getattr(focus, "appModule", None)
+		appName = getattr(appModule, "appName", "") or ""
+		try:
+			import config
+
+			profileName = config.conf.profiles[-1].name or ""
+		except Exception:
+			profileName = ""
+		try:
+			gestureMapPath = os.path.join(globalVars.appArgs.configPath, "gestures.ini")
+			gestureMapStamp = str(os.stat(gestureMapPath).st_mtime_ns)
+		except OSError:
+			gestureMapStamp = ""
+		try:
+			import languageHandler
+
+			language = languageHandler.getLanguage()
+		except Exception:
+			language = ""
+		try:
+			import buildVersion
+
+			nvdaVersion = buildVersion.version
+		except Exception:
+			nvdaVersion = ""
+		try:
+			import globalPluginHandler
+
+			plugins = ",".join(sorted(type(plugin).__module__ for plugin in globalPluginHandler.runningPlugins))
+		except Exception:
+			plugins = ""
+		return (appName, profileName, gestureMapStamp, language, nvdaVersion, plugins)
+
+	def _loadPersisted(self):
+		if self._persisted is not None:
+			return self._persisted
+		self._persisted = []
+		try:
+			with open(self._getCachePath(), "r", encoding="utf-8") as handle:
+				data = json.load(handle)
+			if isinstance(data, dict) and data.get("version") == self.CACHE_VERSION:
+				for entry in data.get("catalogs", []):
+					if isinstance(entry, dict):
+						self._persisted.append(NvdaCommandCatalog.fromJson(entry))
+		except FileNotFoundError:
+			pass
+		except Exception as e:
+			log.warning("Ignoring unreadable NVDA command catalog cache: %s", e)
+		return self._persisted
+
+	def _persist(self, catalog):
+		persisted = [entry for entry in self._loadPersisted() if entry.fingerprint != catalog.fingerprint]
+		persisted.insert(0, catalog)
+		del persisted[self.MAX_PERSISTED_CATALOGS :]
+		self._persisted = persisted
+		data = {"version": self.CACHE_VERSION, "catalogs": [entry.toJson() for entry in persisted]}
+		cachePath = self._getCachePath()
+		try:
+			os.makedirs(os.path.dirname(cachePath), exist_ok=True)
+			with open(cachePath, "w", encoding="utf-8") as handle:
+				json.dump(data, handle, ensure_ascii=False)
+		except Exception as e:
+			log.warning("Could not save NVDA command catalog cache: %s", e)
+
+	def peek(self):
+		"""Return a valid catalog from memory or disk without building one, or None."""
+		fingerprint = self._getFingerprint()
+		with self._lock:
+			if self._current is not None and self._current.fingerprint == fingerprint:
+				return self._current
+			for catalog in self._loadPersisted():
+				if catalog.fingerprint == fingerprint:
+					self._current = catalog
+					return catalog
+		return None
+
+	def get(self):
+		"""Return the catalog for the current context, building and persisting it if needed."""
+		catalog = self.peek()
+		if catalog is not None:
+			return catalog
+		fingerprint = self._getFingerprint()
+		catalog = NvdaCommandCatalog(_buildActiveNvdaCommands(), fingerprint=fingerprint)
+		with self._lock:
+			self._current = catalog
+			self._persist(catalog)
+		return catalog
+
+	def invalidate(self):
+		with self._lock:
+			self._current = None
+
+
+_catalogStore = _CatalogStore()
+
+
+def getNvdaCommandCatalog():
+	return _catalogStore.get()
+
+
+def peekNvdaCommandCatalog():
+	return _catalogStore.peek()
+
+
+def invalidateNvdaCommandCatalog():
+	_catalogStore.invalidate()
+
+
+def getAllActiveNvdaCommands():
+	return list(getNvdaCommandCatalog().commands)
+
+
 def getCommandByIdentifier(commandId):
-	for command in getAllActiveNvdaCommands():
-		if command.identifier == commandId:
-			return command
-	return None
+	return getNvdaCommandCatalog().byIdentifier.get(commandId)
+
+
+def findCommandsForGesture(catalog, gesture):
+	"""Return the commands of catalog bound to gesture, in any keyboard layout."""
+	return list(catalog.byGesture.get(normalizeGestureIdentifier(gesture), ()))
 
 
 class _InstantCommandGesture:
@@ -111,24 +314,68 @@ class _InstantCommandGesture:
 
 
 def _iterScriptableObjects():
+	"""Yield (source, object) pairs in the order NVDA looks up scripts.
+
+	The source describes where the object was found, so that it can be fetched again
+	directly with _getScriptableObject.
+	"""
 	focus = api.getFocusObject()
 	if not focus:
 		return
-	yield from _safeGetRunningGlobalPlugins()
+	for plugin in _safeGetRunningGlobalPlugins():
+		yield ("globalPlugin",), plugin
 	app = getattr(focus, "appModule", None)
 	if app:
-		yield app
+		yield ("appModule",), app
 	brailleDisplay = _safeGetBrailleDisplay()
 	if brailleDisplay:
-		yield brailleDisplay
-	yield from _safeGetVisionProviders()
+		yield ("brailleDisplay",), brailleDisplay
+	for provider in _safeGetVisionProviders():
+		yield ("visionProvider",), provider
 	treeInterceptor = getattr(focus, "treeInterceptor", None)
 	if treeInterceptor and getattr(treeInterceptor, "isReady", True):
-		yield treeInterceptor
-	yield focus
-	for ancestor in reversed(api.getFocusAncestors()):
-		yield ancestor
-	yield from _safeGetGlobalCommandObjects()
+		yield ("treeInterceptor",), treeInterceptor
+	yield ("focus",), focus
+	for index, ancestor in enumerate(reversed(api.getFocusAncestors())):
+		yield ("ancestor", index), ancestor
+	for index, commandObject in enumerate(_safeGetGlobalCommandObjects()):
+		yield ("globalCommands", index), commandObject
+
+
+def _getScriptableObject(source, ownerType):
+	"""Fetch the object of type ownerType from a source recorded by _iterScriptableObjects."""
+	focus = api.getFocusObject()
+	if not focus:
+		return None
+	kind = source[0]
+	if kind == "globalPlugin":
+		candidates = _safeGetRunningGlobalPlugins()
+	elif kind == "visionProvider":
+		candidates = _safeGetVisionProviders()
+	elif kind == "appModule":
+		candidates = (getattr(focus, "appModule", None),)
+	elif kind == "brailleDisplay":
+		candidates = (_safeGetBrailleDisplay(),)
+	elif kind == "treeInterceptor":
+		treeInterceptor = getattr(focus, "treeInterceptor", None)
+		if not treeInterceptor or not getattr(treeInterceptor, "isReady", True):
+			return None
+		candidates = (treeInterceptor,)
+	elif kind == "focus":
+		candidates = (focus,)
+	elif kind == "ancestor":
+		ancestors = api.getFocusAncestors()
+		if source[1] >= len(ancestors):
+			return None
+		candidates = (ancestors[-1 - source[1]],)
+	elif kind == "globalCommands":
+		candidates = list(_safeGetGlobalCommandObjects())[source[1] : source[1] + 1]
+	else:
+		return None
+	for candidate in candidates:
+		if type(candidate) is ownerType:
+			return candidate
+	return None
 
 
 def _safeGetRunningGlobalPlugins():
@@ -177,15 +424,55 @@ def _safeGetGlobalCommandObjects():
 		return
 
 
-def _resolveBoundScript(moduleName, className, scriptName):
+# Maps (moduleName, className, scriptName, focus class, app module name) to the source and type
+# of the object that owned the script the last time it was resolved.
+_resolvedScriptCache = {}
+
+_FOCUS_RELATIVE_SOURCES = frozenset(("treeInterceptor", "focus", "ancestor"))
+
+
+def invalidateResolvedScripts(focusOnly=False):
+	"""Forget cached script owners; with focusOnly, only those found relative to the focus."""
+	if not focusOnly:
+		_resolvedScriptCache.clear()
+		return
+	for key, (source, _ownerType) in list(_resolvedScriptCache.items()):
+		if source[0] in _FOCUS_RELATIVE_SOURCES:
+			_resolvedScriptCache.pop(key, None)
+
+
+def _getResolutionKey(moduleName, className, scriptName):
+	focus = api.getFocusObject()
+	appModule = getattr(focus, "appModule", None)
+	return (moduleName, className, scriptName, type(focus), getattr(appModule, "appName", ""))
+
+
+def _findBoundScript(moduleName, className, scriptName):
+	"""Walk every scriptable object for the script, returning it with its source and owner type."""
 	targetAttr = f"script_{scriptName}"
-	for obj in _iterScriptableObjects() or ():
+	for source, obj in _iterScriptableObjects() or ():
 		for cls in obj.__class__.__mro__:
 			if cls.__module__ == moduleName and cls.__name__ == className:
 				script = getattr(obj, targetAttr, None)
 				if callable(script):
-					return script
-	return None
+					return script, source, type(obj)
+	return None, None, None
+
+
+def _resolveBoundScript(moduleName, className, scriptName):
+	key = _getResolutionKey(moduleName, className, scriptName)
+	cached = _resolvedScriptCache.get(key)
+	if cached is not None:
+		source, ownerType = cached
+		obj = _getScriptableObject(source, ownerType)
+		script = getattr(obj, f"script_{scriptName}", None) if obj is not None else None
+		if callable(script):
+			return script
+		_resolvedScriptCache.pop(key, None)
+	script, source, ownerType = _findBoundScript(moduleName, className, scriptName)
+	if script is not None:
+		_resolvedScriptCache[key] = (source, ownerType)
+	return script
 
 
 def _emulateKeyboardScript(scriptName):
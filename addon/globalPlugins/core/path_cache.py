@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+DEFAULT_TTL = 30.0
+
+
+def expandPath(rawPath):
+	"""Expand environment variables and user home directory in a path."""
+	if not rawPath:
+		return rawPath
+	return os.path.expandvars(os.path.expanduser(rawPath))
+
+
+class ResolvedPathCache:
+	"""Caches the expansion and existence check of action paths.
+
+	A hit returns the last known resolution immediately; once an entry is older than the TTL
+	it is re-checked on a background thread instead of delaying the launch.
+	"""
+
+	def __init__(self, ttl=DEFAULT_TTL):
+		self.ttl = ttl
+		self._entries = {}
+		self._refreshing = set()
+		self._lock = threading.Lock()
+		# Created on the first refresh, so a shut down cache starts a new one when used again.
+		self._refresher = None
+
+	def _check(self, rawPath):
+		"""Synchronously expand a path and check that it exists."""
+		resolvedPath = expandPath(rawPath)
+		exists = bool(resolvedPath) and os.path.exists(resolvedPath)
+		return resolvedPath, exists
+
+	def _store(self, rawPath, resolvedPath, exists):
+		with self._lock:
+			self._entries[rawPath] = (resolvedPath, exists, time.monotonic())
+			self._refreshing.discard(rawPath)
+
+	def _refresh(self, rawPath):
+		try:
+			resolvedPath, exists = self._check(rawPath)
+		except Exception as e:
+			log.warning("Error refreshing cached path '%s': %s", rawPath, e)
+			with self._lock:
+				self._entries.pop(rawPath, None)
+				self._refreshing.discard(rawPath)
+			return
+		self._store(rawPath, resolvedPath, exists)
+
+	def _scheduleRefresh(self, rawPath):
+		with self._lock:
+			if rawPath in self._refreshing:
+				return
+			self._refreshing.add(rawPath)
+			if self._refresher is None:
+				self._refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="instantAccessPathCache")
+			refresher = self._refresher
+		try:
+			refresher.submit(self._refresh, rawPath)
+		except RuntimeError:
+			# Shut down by another thread meanwhile; the entry simply stays stale.
+			with self._lock:
+				self._refreshing.discard(rawPath)
+
+	def resolve(self, rawPath):
+		"""Return the expanded path if it exists, or an empty string.
+
+		Only paths that were found to exist are served from the cache; a miss or a cached
+		negative result always falls back to the synchronous check.
+		"""
+		if not rawPath:
+			return ""
+		with self._lock:
+			entry = self._entries.get(rawPath)
+		if entry is not None:
+			resolvedPath, exists, checkedAt = entry
+			if exists:
+				if time.monotonic() - checkedAt > self.ttl:
+					self._scheduleRefresh(rawPath)
+				return resolvedPath
+		resolvedPath, exists = self._check(rawPath)
+		self._store(rawPath, resolvedPath, exists)
+		return resolvedPath if exists else ""
+
+	def invalidate(self, rawPath=None):
+		"""Drop one cached path, or every cached path when none is given."""
+		with self._lock:
+			if rawPath is None:
+				self._entries.clear()
+			else:
+				self._entries.pop(rawPath, None)
+
+	def shutdown(self):
+		"""Stop the background refresher, dropping the refreshes still queued."""
+		with self._lock:
+			refresher = self._refresher
+			self._refresher = None
+			self._refreshing.clear()
+		if refresher is not None:
+			refresher.shutdown(wait=False, cancel_futures=True)
+
+
+pathCache = ResolvedPathCache()
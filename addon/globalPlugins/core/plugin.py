@@ -3,6 +3,8 @@
 from concurrent.futures import ThreadPoolExecutor
 import logging
 import os
+import string
+import time
 
 import addonHandler
 import api
@@ -15,37 +17,81 @@ import tones
 import ui
 import wx
 
+from .command_picker_dialog import shutdownCommandLoader
 from .config_manager import ConfigManager
-from .constants import CATEGORY_LABEL, REPORT_APP_NAME_DESCRIPTION, TOGGLE_DESCRIPTION, VERBOSITY_VALUES
+from .constants import (
+	CATEGORY_LABEL,
+	REPORT_APP_NAME_DESCRIPTION,
+	SEARCH_DESCRIPTION,
+	SEQUENCE_TIMEOUT_MS,
+	TOGGLE_DESCRIPTION,
+	VERBOSITY_VALUES,
+)
+from .dispatch import CompiledLayer, GestureTrie, SearchSession, selectItemForApp
 from .executor import executeInstantItem
-from .gestures import expandGestureLayouts, normalizeGestureIdentifier
+from .gestures import normalizeGesture, normalizeGestureIdentifier
+from .ipc import IpcServer
+from .nvda_commands import invalidateResolvedScripts
+from .path_cache import pathCache
+from .scheduler import Scheduler
 from .settings_panel import InstantAccessSettingsPanel
+from .usage import usageStats
 
 addonHandler.initTranslation()
 
 log = logging.getLogger(__name__)
 
+# Keys typed into a search; layout-free key names, so they work whatever the keyboard layout.
+_SEARCH_CHARACTER_KEYS = string.ascii_lowercase + string.digits
+
 
 class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 	def __init__(self):
 		super().__init__()
+		# Global plugins were (re)loaded, so previously resolved script owners may be gone.
+		invalidateResolvedScripts()
 		if globalVars.appArgs.secure:
 			return
 		self.executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="instantAccess")
 		self.verbosityLevel = VERBOSITY_VALUES[0]
 		self.instantMode = False
-		self.gestureToItems = {}
+		self.activeLayer = ""
+		self.compiledLayer = None
+		self.gestureTrie = GestureTrie()
+		self.sequenceNode = self.gestureTrie.root
+		self._sequenceTimer = None
+		self._compiledLayers = {}
+		self._activationCount = 0
+		self.searchSession = None
 		self.loadedCommandCount = 0
 		configPath = os.path.join(globalVars.appArgs.configPath, "instantAccess", "config.json")
+		usageStats.setPath(os.path.join(os.path.dirname(configPath), "usage.log"))
+		self.executor.submit(usageStats.load)
 		self.configManager = ConfigManager(configPath)
+		self.configManager.addChangeListener(self._onConfigCommitted)
+		self.scheduler = Scheduler(self.onScheduledRun)
+		self.scheduler.setItems(self.configManager.getItems())
+		self.scheduler.start()
 		self.setVerbosityLevel(self.configManager.getVerbosityLevel())
+		# Only the toggle keys of named layers are read here; their items are compiled on first use.
+		self.layerToggles = self.buildLayerToggles()
+		self.bindGestures({gesture: "toggleLayer" for gesture in self.layerToggles})
 		InstantAccessSettingsPanel.configManager = self.configManager
-		InstantAccessSettingsPanel.onConfigChanged = self.onConfigChanged
-		InstantAccessSettingsPanel.onRunItem = self.queueRunItemExecution
+		InstantAccessSettingsPanel.onRunItem = self.queueRunItemPlan
 		InstantAccessSettingsPanel.onVerbosityChanged = self.setVerbosityLevel
 		gui.settingsDialogs.NVDASettingsDialog.categoryClasses.append(InstantAccessSettingsPanel)
+		# Started last, so clients never reach a half-initialized plugin.
+		self.ipcServer = IpcServer(
+			os.path.dirname(configPath),
+			{"run": self.onIpcRun, "batch": self.onIpcBatch, "status": self.onIpcStatus},
+		)
+		try:
+			self.ipcServer.start()
+		except Exception:
+			log.error("Could not start the instant Access IPC endpoint", exc_info=True)
 
 	def terminate(self):
+		invalidateResolvedScripts()
 		if not hasattr(self, "executor"):
 			return
 		try:
@@ -58,12 +104,56 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		
 		InstantAccessSettingsPanel.onRunItem = None
 		InstantAccessSettingsPanel.onVerbosityChanged = None
+		self.configManager.removeChangeListener(self._onConfigCommitted)
+		try:
+			self.ipcServer.stop()
+		except Exception:
+			log.error("Error stopping the instant Access IPC endpoint", exc_info=True)
+		self.scheduler.stop()
 		self.deactivateInstantMode(speak=False)
 		self.executor.shutdown(wait=False, cancel_futures=True)
+		pathCache.shutdown()
+		shutdownCommandLoader()
+
+	def event_gainFocus(self, obj, nextHandler):
+		invalidateResolvedScripts(focusOnly=True)
+		nextHandler()
+
+	def _onConfigCommitted(self):
+		# Commits may happen on any thread; rebinding gestures must happen on the main one.
+		wx.CallAfter(self.onConfigChanged)
 
 	def onConfigChanged(self):
+		pathCache.invalidate()
+		self._compiledLayers = {}
+		self.scheduler.setItems(self.configManager.getItems())
+		self.layerToggles = self.buildLayerToggles()
 		if self.instantMode:
-			self.activateInstantMode(speak=False)
+			layer = self.activeLayer if self.activeLayer in self.layerToggles.values() else ""
+			self.activateInstantMode(speak=False, layer=layer)
+		else:
+			self.clearGestureBindings()
+			self.bindGestures(self.buildIdleGestures())
+
+	def buildLayerToggles(self):
+		"""Map the canonical toggle gesture of each named layer to the layer name."""
+		toggles = {}
+		for layer in self.configManager.getLayers():
+			gesture = normalizeGesture(layer.get("gesture", ""))
+			if gesture:
+				toggles.setdefault(gesture, layer["name"])
+		return toggles
+
+	def getCompiledLayer(self, layer):
+		"""Return the dispatch table of layer, compiling it only if the configuration changed since."""
+		generation = self.configManager.getGeneration()
+		compiled = self._compiledLayers.get(layer)
+		if compiled is None or compiled.generation != generation:
+			# Built from the execution plans, so items running other items need no lookup when run.
+			index = self.configManager.getItemIndex()
+			compiled = CompiledLayer(layer, index.plans, index.generation, "runInstantItem")
+			self._compiledLayers[layer] = compiled
+		return compiled
 
 	def setVerbosityLevel(self, value):
 		if value not in VERBOSITY_VALUES:
@@ -81,11 +171,84 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			return
 		self.executor.submit(self.runItemTask, dict(item))
 
+	def queueRunItemPlan(self, item):
+		"""Queue the execution plan of a configured item, falling back to the item as given."""
+		if not item:
+			return
+		self.queueRunItemExecution(self.configManager.getItemIndex().getPlan(item.get("name", "")) or item)
+
 	def runItemTask(self, item):
 		commandName = (item.get("name", "") or "").strip()
 		if commandName:
 			wx.CallAfter(ui.message, commandName)
-		executeInstantItem(item)
+		start = time.monotonic()
+		succeeded = executeInstantItem(item)
+		usageStats.record(
+			commandName,
+			duration=time.monotonic() - start,
+			succeeded=succeeded,
+			commands=[
+				action.get("path", "")
+				for action in item.get("actions", [])
+				if action.get("type", "") == "NvdaCommands"
+			],
+		)
+
+	def _findRunnableItem(self, index, name):
+		"""Return (item, error) for an IPC request naming an item."""
+		item = index.findItem(name) if isinstance(name, str) else None
+		if item is None:
+			return None, "No item named {0!r}.".format(name)
+		if not item.get("enabled", True):
+			return None, "Item {0!r} is disabled.".format(item.get("name", ""))
+		return index.getPlan(item["name"]), None
+
+	def onIpcRun(self, request):
+		item, error = self._findRunnableItem(self.configManager.getItemIndex(), request.get("name"))
+		if error:
+			return {"ok": False, "error": error}
+		self.queueRunItemExecution(item)
+		return {"ok": True, "queued": [item["name"]]}
+
+	def onIpcBatch(self, request):
+		"""Run several items one after another; nothing runs if any of them cannot."""
+		names = request.get("names")
+		if not isinstance(names, list) or not names:
+			return {"ok": False, "error": "names must be a non-empty list."}
+		index = self.configManager.getItemIndex()
+		items = []
+		errors = []
+		for name in names:
+			item, error = self._findRunnableItem(index, name)
+			if error:
+				errors.append(error)
+			else:
+				items.append(dict(item))
+		if errors:
+			return {"ok": False, "error": " ".join(errors)}
+		self.executor.submit(self.runItemsTask, items)
+		return {"ok": True, "queued": [item["name"] for item in items]}
+
+	def onIpcStatus(self, request):
+		return {
+			"ok": True,
+			"instantMode": self.instantMode,
+			"activeLayer": self.activeLayer,
+			"itemCount": len(self.configManager.getItemIndex().names),
+			"layers": [layer["name"] for layer in self.configManager.getLayers()],
+		}
+
+	def onScheduledRun(self, name):
+		"""Queue a scheduled item like any other run; called on the scheduler thread."""
+		index = self.configManager.getItemIndex()
+		item = index.findItem(name)
+		if item is None or not item.get("enabled", True):
+			return
+		self.queueRunItemExecution(index.getPlan(item["name"]))
+
+	def runItemsTask(self, items):
+		for item in items:
+			self.runItemTask(item)
 
 	def getScript(self, gesture):
 		if not self.instantMode:
@@ -94,11 +257,20 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		if not script:
 			script = self.script_invalidKey
 		
+		activationCount = self._activationCount
+
 		def wrappedScript(*args, **kwargs):
 			try:
 				return script(*args, **kwargs)
 			finally:
-				self.finishInstantLayer()
+				# A key that only starts a sequence or edits a search keeps the layer open, and a
+				# key that switched to another layer must not close the layer it just opened.
+				if (
+					not self.isInSequence()
+					and self.searchSession is None
+					and self._activationCount == activationCount
+				):
+					self.finishInstantLayer()
 		
 		return wrappedScript
 
@@ -124,6 +296,11 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 	def getReportAppNameGestures(self):
 		return self._getGesturesForScript(REPORT_APP_NAME_DESCRIPTION, ["kb:NVDA+shift+e"])
 
+	def getSearchGestures(self):
+		# Only bound in instant mode unless a gesture is assigned in Input Gestures. Not reserved,
+		# so items saved on it before search existed keep working.
+		return self._getGesturesForScript(SEARCH_DESCRIPTION, ["kb:NVDA+f"])
+
 	def getCurrentAppName(self):
 		try:
 			focus = api.getFocusObject()
@@ -134,55 +311,98 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			log.warning("Error getting current app name: %s", e)
 			return ""
 
-	def buildInstantGestures(self):
-		items = self.configManager.getItems()
-		self.gestureToItems = {}
-		for item in items:
-			for gesture in item.get("gestures", []):
-				for expanded in expandGestureLayouts(gesture):
-					self.gestureToItems.setdefault(expanded.lower(), []).append(item)
-		self.loadedCommandCount = len({item["name"] for itemsForGesture in self.gestureToItems.values() for item in itemsForGesture})
-		instantGestures = {}
-		for gesture in self.gestureToItems.keys():
-			instantGestures[gesture] = "runInstantItem"
+	def buildInstantGestures(self, layer=""):
+		self.compiledLayer = self.getCompiledLayer(layer)
+		self.activeLayer = layer
+		self.gestureTrie = self.compiledLayer.trie
+		self.sequenceNode = self.gestureTrie.root
+		self.loadedCommandCount = self.gestureTrie.itemCount
+		return self.buildSequenceGestures(self.sequenceNode)
+
+	def buildIdleGestures(self):
+		"""Return the bindings used while instant mode is off."""
+		bindings = {gesture: "toggleInstantMode" for gesture in self.getToggleGestures()}
+		for gesture in self.getReportAppNameGestures():
+			bindings[gesture] = "reportCurrentAppName"
+		for gesture in self.layerToggles:
+			bindings[gesture] = "toggleLayer"
+		return bindings
+
+	def buildSequenceGestures(self, node):
+		"""Return the bindings for the keys that may follow node in a gesture sequence."""
+		# Canonical keys carry no layout, and NVDA matches layout-free bindings in every layout.
+		instantGestures = dict(self.compiledLayer.getBindings(node))
+		for gesture in self.layerToggles:
+			instantGestures[gesture] = "toggleLayer"
 		for gesture in self.getToggleGestures():
 			instantGestures[gesture] = "toggleInstantMode"
 		for gesture in self.getReportAppNameGestures():
 			instantGestures[gesture] = "reportCurrentAppName"
+		if node is self.gestureTrie.root:
+			for gesture in self.getSearchGestures():
+				# An item or layer already on the search gesture keeps it.
+				if normalizeGestureIdentifier(gesture) not in instantGestures:
+					instantGestures[gesture] = "startSearch"
 		instantGestures["kb:escape"] = "exitInstantMode"
 		return instantGestures
 
-	def activateInstantMode(self, speak=True):
-		instantGestures = self.buildInstantGestures()
+	def buildSearchGestures(self):
+		"""Return the bindings used while typing a search."""
+		searchGestures = {"kb:" + key: "searchType" for key in _SEARCH_CHARACTER_KEYS}
+		searchGestures["kb:space"] = "searchType"
+		searchGestures["kb:backspace"] = "searchBackspace"
+		searchGestures["kb:enter"] = "searchRun"
+		searchGestures["kb:upArrow"] = "searchPrevious"
+		searchGestures["kb:downArrow"] = "searchNext"
+		for gesture in self.getToggleGestures():
+			searchGestures[gesture] = "toggleInstantMode"
+		searchGestures["kb:escape"] = "exitInstantMode"
+		return searchGestures
+
+	def activateInstantMode(self, speak=True, layer=""):
+		self.cancelSequenceTimer()
+		self._activationCount += 1
+		self.searchSession = None
+		instantGestures = self.buildInstantGestures(layer)
 		if self.loadedCommandCount <= 0:
 			self.instantMode = False
+			self.activeLayer = ""
+			self.sequenceNode = self.gestureTrie.root
 			self.clearGestureBindings()
-			bindings = {gesture: "toggleInstantMode" for gesture in self.getToggleGestures()}
-			for gesture in self.getReportAppNameGestures():
-				bindings[gesture] = "reportCurrentAppName"
-			self.bindGestures(bindings)
+			self.bindGestures(self.buildIdleGestures())
 			if speak:
-				ui.message(_("No commands configured."))
+				if layer:
+					# Translators: Reported when a named layer is switched on but has no commands. {layer} is its name.
+					ui.message(_("No commands in layer {layer}.").format(layer=layer))
+				else:
+					ui.message(_("No commands configured."))
 			return
 		self.instantMode = True
 		self.clearGestureBindings()
 		self.bindGestures(instantGestures)
 		if speak:
-			if self.isAdvancedVerbosity():
+			count = self.loadedCommandCount
+			if layer and self.isAdvancedVerbosity():
+				# Translators: Reported in advanced verbosity when a named layer is switched on. {layer} is its name.
+				ui.message(_("{layer} on").format(layer=layer))
+			elif layer:
+				# Translators: Reported when a named layer is switched on. {layer} is its name.
+				ui.message(_("{layer} layer On. {count} commands loaded").format(layer=layer, count=count))
+			elif self.isAdvancedVerbosity():
 				ui.message(_("On"))
 			else:
-				count = self.loadedCommandCount
 				ui.message(_("instant Access On. {count} commands loaded").format(count=count))
 
 	def deactivateInstantMode(self, speak=True):
 		if not self.instantMode:
 			return
+		self.cancelSequenceTimer()
+		self.sequenceNode = self.gestureTrie.root
+		self.searchSession = None
 		self.instantMode = False
+		self.activeLayer = ""
 		self.clearGestureBindings()
-		bindings = {gesture: "toggleInstantMode" for gesture in self.getToggleGestures()}
-		for gesture in self.getReportAppNameGestures():
-			bindings[gesture] = "reportCurrentAppName"
-		self.bindGestures(bindings)
+		self.bindGestures(self.buildIdleGestures())
 		if speak:
 			if self.isAdvancedVerbosity():
 				ui.message(_("Off"))
@@ -193,7 +413,38 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		if self.instantMode:
 			self.deactivateInstantMode(speak=False)
 
+	def isInSequence(self):
+		return self.sequenceNode is not self.gestureTrie.root
+
+	def cancelSequenceTimer(self):
+		if self._sequenceTimer is not None:
+			self._sequenceTimer.Stop()
+			self._sequenceTimer = None
+
+	def enterSequenceNode(self, node):
+		"""Wait for the next key of a sequence, binding only the keys that can follow node."""
+		self.cancelSequenceTimer()
+		self.sequenceNode = node
+		self.clearGestureBindings()
+		self.bindGestures(self.buildSequenceGestures(node))
+		if node is not self.gestureTrie.root:
+			self._sequenceTimer = wx.CallLater(SEQUENCE_TIMEOUT_MS, self.onSequenceTimeout)
+
+	def onSequenceTimeout(self):
+		self._sequenceTimer = None
+		if not self.instantMode or not self.isInSequence():
+			return
+		item = selectItemForApp(self.sequenceNode.items, self.getCurrentAppName(), usageStats.score)
+		if item is not None:
+			# The keys typed so far are a complete, shorter sequence.
+			self.queueRunItemExecution(item)
+			self.finishInstantLayer()
+			return
+		self.queueTone(250, 50)
+		self.enterSequenceNode(self.gestureTrie.root)
+
 	def script_invalidKey(self, gesture):
+		self.sequenceNode = self.gestureTrie.root
 		if self.isAdvancedVerbosity():
 			self.queueTone(250, 50)
 			return
@@ -206,42 +457,141 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		gesture="kb:NVDA+e",
 	)
 	def script_toggleInstantMode(self, gesture):
-		if self.instantMode:
+		if self.instantMode and not self.activeLayer:
 			self.deactivateInstantMode()
 		else:
 			self.activateInstantMode()
 
+	def script_toggleLayer(self, gesture):
+		layer = None
+		for gestureId in self._getGestureIdentifiers(gesture):
+			layer = self.layerToggles.get(normalizeGestureIdentifier(gestureId))
+			if layer is not None:
+				break
+		if layer is None:
+			return
+		if self.instantMode and self.activeLayer == layer:
+			self.deactivateInstantMode()
+		else:
+			self.activateInstantMode(layer=layer)
+
 	def script_exitInstantMode(self, gesture):
 		self.deactivateInstantMode()
 
-	def script_runInstantItem(self, gesture):
-		identifiers = []
+	def _getGestureIdentifiers(self, gesture):
 		if hasattr(gesture, "identifiers") and gesture.identifiers:
-			identifiers.extend(gesture.identifiers)
-		elif hasattr(gesture, "identifier"):
-			identifiers.append(gesture.identifier)
-		candidateItems = []
-		for gestureId in identifiers:
-			normalized = normalizeGestureIdentifier(gestureId)
-			items = self.gestureToItems.get(normalized, [])
-			if items:
-				candidateItems.extend(items)
-		if not candidateItems:
-			return
-		currentAppName = self.getCurrentAppName()
-		item = None
-		for candidate in candidateItems:
-			itemAppName = (candidate.get("appName", "") or "").strip().lower()
-			if itemAppName and itemAppName == currentAppName:
-				item = candidate
+			return list(gesture.identifiers)
+		if hasattr(gesture, "identifier"):
+			return [gesture.identifier]
+		return []
+
+	def script_runInstantItem(self, gesture):
+		node = None
+		for gestureId in self._getGestureIdentifiers(gesture):
+			node = self.sequenceNode.children.get(normalizeGestureIdentifier(gestureId))
+			if node is not None:
 				break
+		if node is None:
+			self.sequenceNode = self.gestureTrie.root
+			return
+		if node.children:
+			self.queueTone(600, 30)
+			self.enterSequenceNode(node)
+			return
+		self.cancelSequenceTimer()
+		self.sequenceNode = self.gestureTrie.root
+		item = selectItemForApp(node.items, self.getCurrentAppName(), usageStats.score)
+		if item is None:
+			return
+		self.queueRunItemExecution(item)
+
+	@scriptHandler.script(
+		category=CATEGORY_LABEL,
+		description=SEARCH_DESCRIPTION,
+	)
+	def script_startSearch(self, gesture):
+		if not self.instantMode:
+			self.activateInstantMode(speak=False)
+			if not self.instantMode:
+				ui.message(_("No commands configured."))
+				return
+		self.cancelSequenceTimer()
+		self.sequenceNode = self.gestureTrie.root
+		self.searchSession = SearchSession(
+			self.compiledLayer,
+			self.getCurrentAppName(),
+			boosts=usageStats.getScores(),
+		)
+		self.clearGestureBindings()
+		self.bindGestures(self.buildSearchGestures())
+		# Translators: Reported when type-to-search starts in instant mode.
+		ui.message(_("Search"))
+
+	def _getTypedCharacter(self, gesture):
+		keyName = getattr(gesture, "mainKeyName", "") or ""
+		if not keyName:
+			identifiers = self._getGestureIdentifiers(gesture)
+			keyName = identifiers[0].rpartition(":")[2] if identifiers else ""
+		if keyName == "space":
+			return " "
+		return keyName.lower() if len(keyName) == 1 else ""
+
+	def reportSearchMatch(self, item):
+		session = self.searchSession
 		if item is None:
-			for candidate in candidateItems:
-				if not (candidate.get("appName", "") or "").strip():
-					item = candidate
-					break
+			self.queueTone(250, 50)
+			if not self.isAdvancedVerbosity():
+				# Translators: Reported when no item name matches the search typed in instant mode.
+				ui.message(_("No match"))
+			return
+		name = item.get("name", "")
+		if self.isAdvancedVerbosity():
+			ui.message(name)
+		else:
+			# Translators: Reports a search match. {name} is the item, {position} and {count} its place among the matches.
+			ui.message(_("{name}, {position} of {count}").format(
+				name=name, position=session.position + 1, count=len(session.matches)
+			))
+
+	def script_searchType(self, gesture):
+		if self.searchSession is None:
+			return
+		character = self._getTypedCharacter(gesture)
+		if not character:
+			return
+		self.reportSearchMatch(self.searchSession.setQuery(self.searchSession.query + character))
+
+	def script_searchBackspace(self, gesture):
+		session = self.searchSession
+		if session is None:
+			return
+		if not session.query:
+			self.queueTone(250, 50)
+			return
+		item = session.setQuery(session.query[:-1])
+		if not session.query.strip():
+			# Translators: Reported when the search typed in instant mode has been erased.
+			ui.message(_("Search"))
+			return
+		self.reportSearchMatch(item)
+
+	def script_searchPrevious(self, gesture):
+		if self.searchSession is not None:
+			self.reportSearchMatch(self.searchSession.move(-1))
+
+	def script_searchNext(self, gesture):
+		if self.searchSession is not None:
+			self.reportSearchMatch(self.searchSession.move(1))
+
+	def script_searchRun(self, gesture):
+		session = self.searchSession
+		if session is None:
+			return
+		item = session.current
 		if item is None:
+			self.queueTone(250, 50)
 			return
+		self.searchSession = None
 		self.queueRunItemExecution(item)
 
 	@scriptHandler.script(
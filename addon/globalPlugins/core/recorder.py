@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+try:
+	from . import keyboard
+except Exception:
+	keyboard = None
+
+
+# A recording keeps at most this many key events, so a forgotten recorder stays small.
+MAX_RECORDED_EVENTS = 4000
+
+RECORDING_STOP_KEY = "esc"
+
+_MODIFIERS = frozenset(("alt", "alt gr", "ctrl", "shift", "windows")) | frozenset(
+	side + " " + name for side in ("left", "right") for name in ("alt", "ctrl", "shift", "windows")
+)
+
+
+class RecordingBuffer:
+	"""Collect keyboard events until maxEvents are held, then ignore the rest.
+
+	It stands in for the queue given to keyboard.start_recording: events come in through put,
+	on the hook thread, and stop_recording reads them back from queue, which stores them as
+	compact columns rather than as event objects. onFull is called once, on the hook thread,
+	when the buffer fills up. Likewise onStop is called once when stopKey is pressed, whatever
+	window has the focus; the events after it are ignored.
+	"""
+
+	def __init__(self, maxEvents=MAX_RECORDED_EVENTS, onFull=None, stopKey=RECORDING_STOP_KEY, onStop=None):
+		self.queue = keyboard.KeyboardEventBuffer(maxlen=maxEvents)
+		self.maxEvents = maxEvents
+		self.onFull = onFull
+		self.overflowed = False
+		self.stopKey = stopKey
+		self.onStop = onStop
+		self.stopped = False
+
+	def put(self, event):
+		if self.stopped:
+			return
+		if event.event_type == "down" and _normalizeName(event.name) == self.stopKey:
+			# Kept, so compressEvents finds where the recording ends.
+			self.stopped = True
+			if len(self.queue) < self.maxEvents:
+				self.queue.put(event)
+			if self.onStop:
+				self.onStop()
+			return
+		if len(self.queue) < self.maxEvents:
+			self.queue.put(event)
+			return
+		if not self.overflowed:
+			self.overflowed = True
+			if self.onFull:
+				self.onFull()
+
+
+def startRecording(buffer):
+	"""Start recording every key event into buffer."""
+	keyboard.start_recording(buffer)
+
+
+def stopRecording():
+	"""Stop recording and return the recorded events."""
+	return keyboard.stop_recording()
+
+
+def _formatLine(hotkey, count):
+	# A trailing number on a line is read as its repeat count, so a key whose name ends in one
+	# (such as "num 5") always gets an explicit count.
+	lastWord = hotkey.rsplit(None, 1)[-1]
+	if count > 1 or (" " in hotkey and lastWord.isdigit()):
+		return "{0} {1}".format(hotkey, count)
+	return hotkey
+
+
+def compressEvents(events, stopKey=RECORDING_STOP_KEY):
+	"""Turn recorded key events into Keystrokes lines.
+
+	Each press of a key becomes the chord of it with the modifiers held at that moment, like
+	"ctrl+shift+tab"; a modifier pressed and released on its own is a line of its own. Repeated
+	chords collapse into one line with a count, like "down 5". Everything from the last press
+	of stopKey on is left out.
+
+	Returns (lines, gaps, skipped): gaps holds the seconds between the presses, and skipped
+	counts the presses that the line syntax cannot express.
+	"""
+	events = list(events)
+	for index in range(len(events) - 1, -1, -1):
+		event = events[index]
+		if event.event_type == "down" and _normalizeName(event.name) == stopKey:
+			del events[index:]
+			break
+	lines = []
+	gaps = []
+	skipped = 0
+	heldModifiers = []
+	# Modifiers held since no other key was pressed; released alone, they are a chord.
+	loneModifiers = set()
+	lastHotkey = None
+	count = 0
+	lastPressTime = None
+
+	def addPress(hotkey, pressTime):
+		nonlocal lastHotkey, count, lastPressTime
+		if lastPressTime is not None:
+			gaps.append(max(0.0, pressTime - lastPressTime))
+		lastPressTime = pressTime
+		if hotkey == lastHotkey:
+			count += 1
+			return
+		if lastHotkey is not None:
+			lines.append(_formatLine(lastHotkey, count))
+		lastHotkey = hotkey
+		count = 1
+
+	for event in events:
+		name = _normalizeName(event.name)
+		if name in _MODIFIERS:
+			if event.event_type == "down":
+				if name not in heldModifiers:
+					heldModifiers.append(name)
+					loneModifiers.add(name)
+			elif name in heldModifiers:
+				heldModifiers.remove(name)
+				if name in loneModifiers:
+					# The chord includes the modifiers still held; releasing them adds nothing more.
+					loneModifiers.clear()
+					addPress("+".join(heldModifiers + [name]), event.time)
+			continue
+		if event.event_type != "down":
+			continue
+		loneModifiers.clear()
+		if not name or "+" in name or "," in name:
+			skipped += 1
+			continue
+		addPress("+".join(heldModifiers + [name]), event.time)
+	if lastHotkey is not None:
+		lines.append(_formatLine(lastHotkey, count))
+	return lines, gaps, skipped
+
+
+def _normalizeName(name):
+	"""Return the canonical name of a recorded key, with modifiers of either side merged."""
+	if not name or keyboard is None:
+		return name or ""
+	name = keyboard.normalize_name(name)
+	side, separator, modifier = name.partition(" ")
+	if side in ("left", "right") and name in _MODIFIERS:
+		return modifier
+	return name
+
+
+def getMedianGap(gaps):
+	"""Return the median of gaps in seconds, rounded to milliseconds, or None when empty."""
+	if not gaps:
+		return None
+	ordered = sorted(gaps)
+	middle = len(ordered) // 2
+	if len(ordered) % 2:
+		median = ordered[middle]
+	else:
+		median = (ordered[middle - 1] + ordered[middle]) / 2
+	return round(median, 3)
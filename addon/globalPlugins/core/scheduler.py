@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+import heapq
+import logging
+import threading
+import time
+
+import addonHandler
+
+addonHandler.initTranslation()
+
+log = logging.getLogger(__name__)
+
+SCHEDULE_DAILY = "daily"
+SCHEDULE_INTERVAL = "interval"
+SCHEDULE_STARTUP = "startup"
+
+WEEKDAYS = (0, 1, 2, 3, 4)
+ALL_DAYS = (0, 1, 2, 3, 4, 5, 6)
+
+# The scheduler thread wakes at least this often, so a wall clock that jumped (after sleep,
+# resume or a time change) is noticed within this many seconds.
+MAX_WAIT_SECONDS = 30.0
+
+
+def _parseTime(text):
+	"""Return (hour, minute) from "HH:MM", or None."""
+	hourText, separator, minuteText = (text or "").strip().partition(":")
+	if not separator:
+		return None
+	try:
+		hour = int(hourText)
+		minute = int(minuteText)
+	except ValueError:
+		return None
+	if not (0 <= hour < 24 and 0 <= minute < 60):
+		return None
+	return hour, minute
+
+
+def normalizeSchedule(rawSchedule):
+	"""Return a schedule in stored form, or None when rawSchedule is not a valid schedule.
+
+	Schedules are {"kind": "daily", "time": "HH:MM", "days": [0-6, Monday first]},
+	{"kind": "interval", "minutes": n} or {"kind": "startup", "seconds": n}.
+	"""
+	if not isinstance(rawSchedule, dict):
+		return None
+	kind = rawSchedule.get("kind")
+	if kind == SCHEDULE_DAILY:
+		parsedTime = _parseTime(rawSchedule.get("time"))
+		if parsedTime is None:
+			return None
+		rawDays = rawSchedule.get("days", ALL_DAYS)
+		if not isinstance(rawDays, (list, tuple)):
+			rawDays = ALL_DAYS
+		days = sorted({day for day in rawDays if isinstance(day, int) and 0 <= day < 7})
+		if not days:
+			return None
+		return {"kind": kind, "time": "{0:02d}:{1:02d}".format(*parsedTime), "days": days}
+	if kind in (SCHEDULE_INTERVAL, SCHEDULE_STARTUP):
+		key = "minutes" if kind == SCHEDULE_INTERVAL else "seconds"
+		try:
+			value = float(rawSchedule.get(key, 0))
+		except (ValueError, TypeError):
+			return None
+		if value < 0 or (kind == SCHEDULE_INTERVAL and value == 0):
+			return None
+		return {"kind": kind, key: value}
+	return None
+
+
+def formatSchedule(schedule):
+	"""Describe a schedule for display."""
+	if not schedule:
+		return ""
+	kind = schedule.get("kind")
+	if kind == SCHEDULE_DAILY:
+		days = tuple(schedule.get("days", ALL_DAYS))
+		if days == ALL_DAYS:
+			# Translators: Describes an item run every day. {time} is the time of day.
+			return _("every day at {time}").format(time=schedule["time"])
+		if days == WEEKDAYS:
+			# Translators: Describes an item run Monday to Friday. {time} is the time of day.
+			return _("weekdays at {time}").format(time=schedule["time"])
+		dayNames = ", ".join(datetime.date(2024, 1, 1 + day).strftime("%a") for day in days)
+		# Translators: Describes an item run on some days of the week. {days} lists them, {time} is the time of day.
+		return _("{days} at {time}").format(days=dayNames, time=schedule["time"])
+	if kind == SCHEDULE_INTERVAL:
+		# Translators: Describes an item run repeatedly. {minutes} is the number of minutes between runs.
+		return _("every {minutes:g} minutes").format(minutes=schedule["minutes"])
+	if kind == SCHEDULE_STARTUP:
+		# Translators: Describes an item run once after NVDA starts. {seconds} is the delay.
+		return _("{seconds:g} seconds after start").format(seconds=schedule["seconds"])
+	return ""
+
+
+def getNextRunTime(schedule, now, startTime, lastRun=None):
+	"""Return the wall-clock time a schedule is next due, or None if it never is again.
+
+	Runs missed since lastRun come out as due now or earlier, so however many were missed,
+	the caller runs the item once.
+	"""
+	kind = schedule.get("kind")
+	if kind == SCHEDULE_STARTUP:
+		if lastRun is not None:
+			return None
+		return startTime + schedule["seconds"]
+	if kind == SCHEDULE_INTERVAL:
+		anchor = lastRun if lastRun is not None else now
+		return anchor + schedule["minutes"] * 60
+	if kind == SCHEDULE_DAILY:
+		hour, minute = _parseTime(schedule["time"])
+		after = datetime.datetime.fromtimestamp(lastRun if lastRun is not None else now)
+		days = schedule.get("days", ALL_DAYS)
+		for offset in range(8):
+			candidate = (after + datetime.timedelta(days=offset)).replace(
+				hour=hour, minute=minute, second=0, microsecond=0
+			)
+			if candidate > after and candidate.weekday() in days:
+				return candidate.timestamp()
+	return None
+
+
+class Scheduler:
+	"""Runs scheduled items from one timer heap, serviced by one thread.
+
+	runItem is called with an item name on the scheduler thread when the item is due; it
+	should only queue the run. Only the current schedules live in the heap: setItems
+	replaces it as a whole.
+	"""
+
+	def __init__(self, runItem):
+		self._runItem = runItem
+		self._condition = threading.Condition()
+		self._heap = []
+		self._schedules = {}
+		self._lastRuns = {}
+		self._startTime = time.time()
+		self._hasItems = False
+		self._thread = None
+		self._stopping = False
+
+	def start(self):
+		self._stopping = False
+		self._thread = threading.Thread(target=self._serve, name="instantAccessScheduler", daemon=True)
+		self._thread.start()
+
+	def stop(self):
+		with self._condition:
+			self._stopping = True
+			self._heap = []
+			self._condition.notify()
+		if self._thread is not None:
+			self._thread.join(timeout=2)
+			self._thread = None
+
+	def setItems(self, items):
+		"""Schedule the enabled items that have a schedule, dropping every other entry."""
+		schedules = {}
+		for item in items:
+			schedule = item.get("schedule")
+			if schedule and item.get("enabled", True):
+				schedules[item.get("name", "")] = schedule
+		now = time.time()
+		with self._condition:
+			for name in list(self._lastRuns):
+				if schedules.get(name) != self._schedules.get(name):
+					# A changed schedule starts afresh.
+					del self._lastRuns[name]
+			previousSchedules = self._schedules
+			self._schedules = schedules
+			self._heap = []
+			for sequence, (name, schedule) in enumerate(schedules.items()):
+				if schedule["kind"] == SCHEDULE_INTERVAL:
+					# Intervals count from when they were first scheduled, not from every edit.
+					self._lastRuns.setdefault(name, now)
+				dueTime = getNextRunTime(schedule, now, self._startTime, self._lastRuns.get(name))
+				if (
+					schedule["kind"] == SCHEDULE_STARTUP
+					and self._hasItems
+					and previousSchedules.get(name) != schedule
+					and dueTime is not None
+					and dueTime <= now
+				):
+					# Added (created, renamed, enabled or restored) after its moment had passed.
+					self._lastRuns[name] = now
+					continue
+				if dueTime is not None:
+					self._heap.append((dueTime, sequence, name))
+			self._hasItems = True
+			heapq.heapify(self._heap)
+			self._condition.notify()
+
+	def getNextRuns(self):
+		"""Return (dueTime, name) for every pending run, soonest first."""
+		with self._condition:
+			return [(dueTime, name) for dueTime, sequence, name in sorted(self._heap)]
+
+	def _serve(self):
+		while True:
+			with self._condition:
+				if self._stopping:
+					return
+				now = time.time()
+				dueNames = []
+				while self._heap and self._heap[0][0] <= now:
+					dueTime, sequence, name = heapq.heappop(self._heap)
+					dueNames.append((sequence, name))
+				for sequence, name in dueNames:
+					# Schedule from now, so runs missed while asleep collapse into this one.
+					self._lastRuns[name] = now
+					dueTime = getNextRunTime(self._schedules[name], now, self._startTime, now)
+					if dueTime is not None:
+						heapq.heappush(self._heap, (dueTime, sequence, name))
+				if not dueNames:
+					timeout = MAX_WAIT_SECONDS
+					if self._heap:
+						timeout = min(timeout, max(0.0, self._heap[0][0] - now))
+					self._condition.wait(timeout)
+					continue
+			for sequence, name in dueNames:
+				try:
+					self._runItem(name)
+				except Exception:
+					log.error("Error running scheduled item %r", name, exc_info=True)
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+
+ANY_FIELD = ""
+
+_MAX_GRAM = 3
+
+_WORD_BOUNDARIES = frozenset(" \t\n:+-_/\\.,()[]|")
+
+
+def _iterGrams(text):
+	"""Yield every distinct substring of text up to _MAX_GRAM characters long."""
+	seen = set()
+	length = len(text)
+	for start in range(length):
+		for size in range(1, _MAX_GRAM + 1):
+			if start + size > length:
+				break
+			gram = text[start : start + size]
+			if gram not in seen:
+				seen.add(gram)
+				yield gram
+
+
+def parseQuery(text, fieldAliases=None):
+	"""Split a filter string into (field, value) terms.
+
+	Words are separated by spaces; a word such as ``app:notepad`` targets a single field
+	when its prefix is one of fieldAliases, otherwise it is matched against every field.
+	"""
+	fieldAliases = fieldAliases or {}
+	terms = []
+	for word in (text or "").split(" "):
+		word = word.strip().lower()
+		if not word:
+			continue
+		field = ANY_FIELD
+		prefix, separator, value = word.partition(":")
+		if separator and prefix in fieldAliases:
+			field = fieldAliases[prefix]
+			word = value.strip()
+			if not word:
+				continue
+		terms.append((field, word))
+	return tuple(terms)
+
+
+def scoreMatch(value, text):
+	"""Rate how well value matches text; higher is better, None means no match."""
+	position = text.find(value)
+	if position < 0:
+		return None
+	if text == value:
+		return 100.0
+	score = 10.0
+	end = position + len(value)
+	if position == 0 or text[position - 1] in _WORD_BOUNDARIES:
+		score += 30.0 if position == 0 else 20.0
+		if end == len(text) or text[end] in _WORD_BOUNDARIES:
+			# The value is a whole word of the text.
+			score += 25.0
+	score -= min(position, 50) * 0.1
+	score -= min(len(text), 200) * 0.01
+	return score
+
+
+def _isRefinement(oldTerms, newTerms):
+	"""Return True when every document matching newTerms is known to match oldTerms."""
+	if not oldTerms:
+		return False
+	for oldField, oldValue in oldTerms:
+		if not any(newField == oldField and oldValue in newValue for newField, newValue in newTerms):
+			return False
+	return True
+
+
+class SearchIndex:
+	"""An n-gram index over a list of documents for incremental, ranked filtering.
+
+	Each document is a dict mapping field names to text. Every term of a query must be a
+	substring of the targeted field (or of any field); candidates come from the n-gram
+	postings, and when a query only extends the previous one the previous matches are
+	refined instead of searching the whole index again.
+
+	Documents are identified by the integer returned when they are added; ids grow with
+	insertion order and are never reused, so an empty query lists documents in that order.
+	"""
+
+	def __init__(self, documents, fieldAliases=None):
+		self.fieldAliases = dict(fieldAliases or {})
+		self._fields = set(self.fieldAliases.values())
+		self._texts = {ANY_FIELD: {}}
+		self._postings = {ANY_FIELD: {}}
+		for field in self._fields:
+			self._texts[field] = {}
+			self._postings[field] = {}
+		self._nextId = 0
+		self._lastTerms = ()
+		self._lastMatches = None
+		for document in documents:
+			self.addDocument(document)
+
+	@property
+	def count(self):
+		return len(self._texts[ANY_FIELD])
+
+	def addDocument(self, document):
+		"""Index a document and return its id."""
+		docId = self._nextId
+		self._nextId += 1
+		self._indexDocument(docId, document)
+		return docId
+
+	def updateDocument(self, docId, document):
+		"""Replace the indexed text of an existing document, keeping its id."""
+		self._unindexDocument(docId)
+		self._indexDocument(docId, document)
+
+	def removeDocument(self, docId):
+		self._unindexDocument(docId)
+
+	def _indexDocument(self, docId, document):
+		anyParts = []
+		for text in document.values():
+			text = (text or "").lower()
+			if text:
+				anyParts.append(text)
+		self._indexText(ANY_FIELD, docId, " ".join(anyParts))
+		for field in self._fields:
+			self._indexText(field, docId, (document.get(field, "") or "").lower())
+		self._lastMatches = None
+
+	def _indexText(self, field, docId, text):
+		self._texts[field][docId] = text
+		postings = self._postings[field]
+		for gram in _iterGrams(text):
+			postings.setdefault(gram, set()).add(docId)
+
+	def _unindexDocument(self, docId):
+		for field, texts in self._texts.items():
+			text = texts.pop(docId, None)
+			if text is None:
+				continue
+			postings = self._postings[field]
+			for gram in _iterGrams(text):
+				docIds = postings.get(gram)
+				if docIds is not None:
+					docIds.discard(docId)
+					if not docIds:
+						del postings[gram]
+		self._lastMatches = None
+
+	def _candidatesForTerm(self, field, value):
+		postings = self._postings[field]
+		if len(value) <= _MAX_GRAM:
+			return postings.get(value, set())
+		candidates = None
+		for start in range(len(value) - _MAX_GRAM + 1):
+			docIds = postings.get(value[start : start + _MAX_GRAM])
+			if not docIds:
+				return set()
+			candidates = set(docIds) if candidates is None else candidates & docIds
+			if not candidates:
+				return candidates
+		return candidates
+
+	def _match(self, terms, candidates):
+		for field, value in terms:
+			termCandidates = self._candidatesForTerm(field, value)
+			candidates = set(termCandidates) if candidates is None else candidates & termCandidates
+			if len(value) > _MAX_GRAM:
+				texts = self._texts[field]
+				candidates = {docId for docId in candidates if value in texts[docId]}
+			if not candidates:
+				break
+		return candidates if candidates is not None else set(self._texts[ANY_FIELD])
+
+	def search(self, query, boost=None, limit=None, exclude=None):
+		"""Return the ids of the documents matching query, best match first.
+
+		With an empty query every document is returned in insertion order. boost, if given,
+		is called with a document id and its result added to the score. Only the best limit
+		ids are returned when limit is given, and ids in exclude are never returned.
+		"""
+		terms = parseQuery(query, self.fieldAliases)
+		if not terms:
+			self._lastTerms = ()
+			self._lastMatches = None
+			docIds = self._texts[ANY_FIELD].keys()
+			if exclude:
+				docIds = [docId for docId in docIds if docId not in exclude]
+			if boost is None:
+				return sorted(docIds)[:limit]
+			return self._rank(docIds, boost, limit)
+		if self._lastMatches is not None and _isRefinement(self._lastTerms, terms):
+			matches = self._match(terms, set(self._lastMatches))
+		else:
+			matches = self._match(terms, None)
+		self._lastTerms = terms
+		self._lastMatches = matches
+		if exclude:
+			# Exclusions may differ between calls, so the refinement cache keeps every match.
+			matches = matches - exclude
+
+		def score(docId):
+			total = 0.0
+			for field, value in terms:
+				total += scoreMatch(value, self._texts[field][docId]) or 0.0
+			if boost is not None:
+				total += boost(docId)
+			return total
+
+		return self._rank(matches, score, limit)
+
+	def _rank(self, docIds, score, limit):
+		scores = {docId: score(docId) for docId in docIds}
+		key = lambda docId: (-scores[docId], docId)
+		if limit is not None and limit < len(scores):
+			# Picking a few best ids avoids sorting every match on each keystroke.
+			return heapq.nsmallest(limit, scores, key=key)
+		return sorted(scores, key=key)
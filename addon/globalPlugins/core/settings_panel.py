@@ -4,10 +4,11 @@ import addonHandler
 import gui
 from gui import guiHelper, nvdaControls
 from gui.settingsDialogs import SettingsPanel
+import logging
 import shutil
+import ui
 import wx
 
-from .config_io import loadConfigFromPathStrict, saveConfig
 from .constants import (
 	ALL_FILES_WILDCARD,
 	CONFIRM_CAPTION,
@@ -17,12 +18,19 @@ from .constants import (
 	VERBOSITY_ADVANCED,
 	VERBOSITY_BEGINNER,
 	VERBOSITY_VALUES,
+	WARNING_CAPTION,
 )
 from .gestures import formatGestureForDisplay
 from .item_dialog import InstantAccessItemDialog
+from .layers_dialog import LayersDialog
+from .scheduler import formatSchedule
+from .search_index import SearchIndex
+from .usage import usageStats
 
 addonHandler.initTranslation()
 
+log = logging.getLogger(__name__)
+
 
 def _getActionSummary(action):
 	itemType = action.get("type", "")
@@ -67,17 +75,116 @@ def _getItemDetails(item):
 	return _("{first} (+{count} more)").format(first=first, count=len(actions) - 1)
 
 
+# Filter prefixes understood by the settings panel filter field.
+_FILTER_FIELDS = {
+	"name": "name",
+	"key": "key",
+	"app": "app",
+	"type": "type",
+	"action": "action",
+	"layer": "layer",
+}
+
+
+# Orders the item list can be sorted in, in the order of the sort choice.
+_SORT_NONE, _SORT_NAME, _SORT_MOST_USED, _SORT_RECENTLY_USED = range(4)
+
+_SORT_LABELS = (
+	# Translators: Item list order following the configuration.
+	_("Configuration order"),
+	# Translators: Item list order by item name.
+	_("Name"),
+	# Translators: Item list order putting the most often run items first.
+	_("Most used"),
+	# Translators: Item list order putting the most recently run items first.
+	_("Recently used"),
+)
+
+
+def _buildRow(item):
+	"""Precompute the text of every list column for an item."""
+	gestureText = ", ".join([formatGestureForDisplay(g) for g in item.get("gestures", [])])
+	if item.get("layer"):
+		# Translators: Shortcut column text for an item in a named layer. {layer} is the layer name.
+		gestureText = _("{layer}: {gesture}").format(layer=item["layer"], gesture=gestureText)
+	if item.get("schedule"):
+		scheduleText = formatSchedule(item["schedule"])
+		# Translators: Shortcut column text for a scheduled item. {gesture} is its shortcut, {schedule} when it runs.
+		gestureText = _("{gesture} ({schedule})").format(gesture=gestureText, schedule=scheduleText) if gestureText else scheduleText
+	typeLabel = _getItemTypeLabel(item)
+	if not item.get("enabled", True):
+		# Translators: Type column text for a disabled item. {type} is the item type label.
+		typeLabel = _("{type} (disabled)").format(type=typeLabel)
+	return (item.get("name", ""), typeLabel, gestureText, _getItemDetails(item))
+
+
+def _buildSearchDocument(item, row):
+	"""Collect the searchable text of an item by filter field."""
+	typeTexts = [row[1]]
+	actionTexts = []
+	for action in item.get("actions", []):
+		itemType = action.get("type", "")
+		typeTexts.append(itemType)
+		typeTexts.append(TYPE_TO_LABEL.get(itemType, itemType).replace("&", ""))
+		for key in ("path", "arguments", "commandLabel"):
+			value = action.get(key, "")
+			if value:
+				actionTexts.append(value)
+	return {
+		"name": row[0],
+		"key": row[2],
+		"app": item.get("appName", ""),
+		"type": " ".join(typeTexts),
+		"action": "\n".join(actionTexts),
+		"layer": item.get("layer", ""),
+	}
+
+
+class _ItemListCtrl(nvdaControls.AutoWidthColumnListCtrl):
+	"""Virtual item list whose text comes from the panel's precomputed row model.
+
+	visible holds the row indices shown, in display order, or None to show every row.
+	"""
+
+	def __init__(self, parent, style):
+		super().__init__(parent, style=style | wx.LC_VIRTUAL)
+		self.rows = []
+		self.visible = None
+
+	def getRowIndex(self, listIndex):
+		if self.visible is None:
+			return listIndex
+		return self.visible[listIndex]
+
+	def OnGetItemText(self, item, column):
+		try:
+			return self.rows[self.getRowIndex(item)][column]
+		except IndexError:
+			return ""
+
+
 class InstantAccessSettingsPanel(SettingsPanel):
 	# Translators: Title of the instant Access settings panel.
 	title = _("instant Access")
 	configManager = None
-	onConfigChanged = None
 	onRunItem = None
 	onVerbosityChanged = None
 
 	def makeSettings(self, settingsSizer):
 		sHelper = guiHelper.BoxSizerHelper(self, sizer=settingsSizer)
-		self.listCtrl = nvdaControls.AutoWidthColumnListCtrl(self, style=wx.LC_REPORT | wx.LC_SINGLE_SEL | wx.BORDER_SUNKEN)
+		self.items = []
+		self._docIds = []
+		# Row of each search document, rebuilt only after rows are added or removed.
+		self._rowByDocId = None
+		self._searchIndex = SearchIndex([], fieldAliases=_FILTER_FIELDS)
+		# Translators: Label for the field that filters the item list.
+		self.filterCtrl = sHelper.addLabeledControl(_("&Filter"), wx.TextCtrl)
+		# Translators: Hint for the item filter field, showing the supported field prefixes.
+		self.filterCtrl.SetHint(_("e.g. app:notepad type:program key:control"))
+		# Translators: Label for the choice ordering the item list.
+		self.sortChoice = sHelper.addLabeledControl(_("S&ort by"), wx.Choice, choices=list(_SORT_LABELS))
+		self.sortChoice.SetSelection(_SORT_NONE)
+		self.listCtrl = _ItemListCtrl(self, style=wx.LC_REPORT | wx.BORDER_SUNKEN)
 		# Translators: Column label for item name in the list.
 		self.listCtrl.InsertColumn(0, _("Name"))
 		# Translators: Column label for item type in the list.
@@ -97,6 +204,10 @@ class InstantAccessSettingsPanel(SettingsPanel):
 		self.deleteButton = buttonHelper.addButton(self, label=_("&Delete"))
 		# Translators: Label for the Test button in the settings panel.
 		self.testButton = buttonHelper.addButton(self, label=_("&Test"))
+		# Translators: Label for the button opening the menu of actions on the selected items.
+		self.selectionButton = buttonHelper.addButton(self, label=_("&Selection actions..."))
+		# Translators: Label for the button opening the dialog editing the instant layers.
+		self.layersButton = buttonHelper.addButton(self, label=_("&Layers..."))
 		# Translators: Label for the Export settings button.
 		self.exportButton = buttonHelper.addButton(self, label=_("E&xport settings"))
 		# Translators: Label for the Import settings button.
@@ -112,14 +223,78 @@ class InstantAccessSettingsPanel(SettingsPanel):
 		self.editButton.Bind(wx.EVT_BUTTON, self.onEdit)
 		self.deleteButton.Bind(wx.EVT_BUTTON, self.onDelete)
 		self.testButton.Bind(wx.EVT_BUTTON, self.onTest)
+		self.selectionButton.Bind(wx.EVT_BUTTON, self.onSelectionMenu)
+		self.layersButton.Bind(wx.EVT_BUTTON, self.onEditLayers)
+		self.listCtrl.Bind(wx.EVT_CONTEXT_MENU, self.onSelectionMenu)
 		self.exportButton.Bind(wx.EVT_BUTTON, self.onExportSettings)
 		self.importButton.Bind(wx.EVT_BUTTON, self.onImportSettings)
+		self.filterCtrl.Bind(wx.EVT_TEXT, self.onFilterChange)
+		self.sortChoice.Bind(wx.EVT_CHOICE, self.onFilterChange)
 		self.listCtrl.Bind(wx.EVT_LIST_ITEM_SELECTED, self.onSelectionChange)
 		self.listCtrl.Bind(wx.EVT_LIST_ITEM_DESELECTED, self.onSelectionChange)
+		self.Bind(wx.EVT_CHAR_HOOK, self.onCharHook)
 
 		self.refreshList()
 		self.updateButtons()
 
+	def _reloadFromConfig(self):
+		"""Rebuild the panel after the configuration was replaced as a whole."""
+		selectedItem = self.getSelectedItem()
+		self.refreshList(selectName=selectedItem.get("name", "") if selectedItem else None)
+		currentVerbosity = self.configManager.getVerbosityLevel()
+		self.verbosityChoice.SetSelection(VERBOSITY_VALUES.index(currentVerbosity))
+		if self.onVerbosityChanged:
+			self.onVerbosityChanged(currentVerbosity)
+		self.updateButtons()
+
+	def onCharHook(self, event):
+		keyCode = event.GetKeyCode()
+		# Leave text fields their own undo.
+		if event.ControlDown() and not event.AltDown() and not isinstance(self.FindFocus(), wx.TextCtrl):
+			if keyCode == ord("Z") and not event.ShiftDown():
+				self.onUndo()
+				return
+			if keyCode == ord("Y") or (keyCode == ord("Z") and event.ShiftDown()):
+				self.onRedo()
+				return
+		event.Skip()
+
+	def onUndo(self):
+		if not self.configManager:
+			return
+		try:
+			description = self.configManager.undo()
+		except Exception:
+			log.error("Error undoing configuration change", exc_info=True)
+			# Translators: Error shown when an undo could not be applied.
+			gui.messageBox(_("Could not undo the last change."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
+			return
+		if description is None:
+			# Translators: Reported when there is no change to undo.
+			ui.message(_("Nothing to undo"))
+			return
+		self._reloadFromConfig()
+		# Translators: Reported after undoing a change. {action} describes the change, e.g. "delete notepad".
+		ui.message(_("Undo {action}").format(action=description))
+
+	def onRedo(self):
+		if not self.configManager:
+			return
+		try:
+			description = self.configManager.redo()
+		except Exception:
+			log.error("Error redoing configuration change", exc_info=True)
+			# Translators: Error shown when a redo could not be applied.
+			gui.messageBox(_("Could not redo the last change."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
+			return
+		if description is None:
+			# Translators: Reported when there is no change to redo.
+			ui.message(_("Nothing to redo"))
+			return
+		self._reloadFromConfig()
+		# Translators: Reported after redoing a change. {action} describes the change, e.g. "delete notepad".
+		ui.message(_("Redo {action}").format(action=description))
+
 	def onSave(self):
 		verbosityValue = VERBOSITY_VALUES[self.verbosityChoice.GetSelection()]
 		self.configManager.setVerbosityLevel(verbosityValue)
@@ -130,32 +305,180 @@ class InstantAccessSettingsPanel(SettingsPanel):
 		self.updateButtons()
 
 	def updateButtons(self):
-		hasSelection = self.listCtrl.GetFirstSelected() != -1
-		self.editButton.Enable(hasSelection)
-		self.deleteButton.Enable(hasSelection)
-		self.testButton.Enable(hasSelection)
+		selectedCount = self.listCtrl.GetSelectedItemCount()
+		self.editButton.Enable(selectedCount == 1)
+		self.deleteButton.Enable(selectedCount > 0)
+		self.testButton.Enable(selectedCount == 1)
+		self.selectionButton.Enable(selectedCount > 0)
 
 	def refreshList(self, selectName=None):
-		self.listCtrl.DeleteAllItems()
+		"""Reload every item from the configuration and rebuild the row model and filter index."""
 		self.items = self.configManager.getItems() if self.configManager else []
+		self.listCtrl.rows = [_buildRow(item) for item in self.items]
+		self._searchIndex = SearchIndex(
+			(_buildSearchDocument(item, row) for item, row in zip(self.items, self.listCtrl.rows)),
+			fieldAliases=_FILTER_FIELDS,
+		)
+		self._docIds = list(range(len(self.items)))
+		self._rowByDocId = None
+		self._applyFilter()
 		selectedIndex = -1
-		for index, item in enumerate(self.items):
-			typeLabel = _getItemTypeLabel(item)
-			gestureText = ", ".join([formatGestureForDisplay(g) for g in item.get("gestures", [])])
-			self.listCtrl.InsertItem(index, item["name"])
-			self.listCtrl.SetItem(index, 1, typeLabel)
-			self.listCtrl.SetItem(index, 2, gestureText)
-			self.listCtrl.SetItem(index, 3, _getItemDetails(item))
-			if selectName and item["name"] == selectName:
-				selectedIndex = index
+		if selectName:
+			selectedIndex = self._findItemIndex(selectName)
 		if selectedIndex >= 0:
-			self.listCtrl.Select(selectedIndex)
-			self.listCtrl.Focus(selectedIndex)
+			self._selectItemIndex(selectedIndex)
 			self.listCtrl.SetFocus()
 		self.updateButtons()
 
-	def getSelectedItem(self):
+	def onFilterChange(self, event):
+		self._applyFilter()
+		self.updateButtons()
+
+	def _applyFilter(self):
+		"""Show the rows matching the filter text, refining the previous result while typing."""
+		filterText = self.filterCtrl.GetValue()
+		if not filterText.strip():
+			visible = None
+		else:
+			if self._rowByDocId is None:
+				self._rowByDocId = {docId: index for index, docId in enumerate(self._docIds)}
+			rowByDocId = self._rowByDocId
+			visible = [rowByDocId[docId] for docId in self._searchIndex.search(filterText)]
+		self.listCtrl.visible = self._sortRows(visible)
+		self._syncListCount()
+
+	def _sortRows(self, visible):
+		"""Order the shown rows by the sort choice; ties keep the filter ranking."""
+		sortIndex = self.sortChoice.GetSelection()
+		if sortIndex in (wx.NOT_FOUND, _SORT_NONE):
+			return visible
+		rows = range(len(self.items)) if visible is None else visible
+		items = self.items
+		if sortIndex == _SORT_NAME:
+			key = lambda index: items[index].get("name", "").lower()
+		elif sortIndex == _SORT_MOST_USED:
+			key = lambda index: -usageStats.getCount(items[index].get("name", ""))
+		else:
+			key = lambda index: -usageStats.getLastUsed(items[index].get("name", ""))
+		return sorted(rows, key=key)
+
+	def _syncListCount(self):
+		self._clearSelection()
+		visible = self.listCtrl.visible
+		self.listCtrl.SetItemCount(len(self.listCtrl.rows) if visible is None else len(visible))
+		self.listCtrl.Refresh()
+
+	def _findItemIndex(self, name):
+		for index, item in enumerate(self.items):
+			if item.get("name", "") == name:
+				return index
+		return -1
+
+	def _clearSelection(self):
 		index = self.listCtrl.GetFirstSelected()
+		while index != -1:
+			self.listCtrl.Select(index, on=0)
+			index = self.listCtrl.GetNextSelected(index)
+
+	def _selectListIndex(self, listIndex):
+		self._clearSelection()
+		if 0 <= listIndex < self.listCtrl.GetItemCount():
+			self.listCtrl.Select(listIndex)
+			self.listCtrl.Focus(listIndex)
+			self.listCtrl.EnsureVisible(listIndex)
+
+	def _selectItemIndex(self, index):
+		"""Select the row of an item if the current filter shows it."""
+		visible = self.listCtrl.visible
+		if visible is None:
+			self._selectListIndex(index)
+		elif index in visible:
+			self._selectListIndex(visible.index(index))
+		else:
+			self._clearSelection()
+
+	def _appendItem(self, item):
+		"""Append one item to the row model, replacing any item with the same name."""
+		existingIndex = self._findItemIndex(item.get("name", ""))
+		if existingIndex >= 0:
+			del self.items[existingIndex]
+			del self.listCtrl.rows[existingIndex]
+			self._searchIndex.removeDocument(self._docIds.pop(existingIndex))
+		row = _buildRow(item)
+		self.items.append(item)
+		self.listCtrl.rows.append(row)
+		self._docIds.append(self._searchIndex.addDocument(_buildSearchDocument(item, row)))
+		self._rowByDocId = None
+		self._applyFilter()
+		self._selectItemIndex(len(self.items) - 1)
+
+	def _replaceItem(self, index, item):
+		"""Update the row of one edited item without touching the others."""
+		row = _buildRow(item)
+		self.items[index] = item
+		self.listCtrl.rows[index] = row
+		self._searchIndex.updateDocument(self._docIds[index], _buildSearchDocument(item, row))
+		if self.listCtrl.visible is None:
+			self.listCtrl.RefreshItem(index)
+		else:
+			# The edit may change whether the item matches the filter.
+			self._applyFilter()
+		self._selectItemIndex(index)
+
+	def _removeItem(self, index):
+		del self.items[index]
+		del self.listCtrl.rows[index]
+		self._searchIndex.removeDocument(self._docIds.pop(index))
+		self._rowByDocId = None
+		self._applyFilter()
+
+	def _getSelectedItemIndex(self):
+		listIndex = self.listCtrl.GetFirstSelected()
+		if listIndex == -1:
+			return -1
+		try:
+			return self.listCtrl.getRowIndex(listIndex)
+		except IndexError:
+			return -1
+
+	def _getSelectedItemIndices(self):
+		"""Return the item indices of every selected row, in display order."""
+		indices = []
+		listIndex = self.listCtrl.GetFirstSelected()
+		while listIndex != -1:
+			indices.append(self.listCtrl.getRowIndex(listIndex))
+			listIndex = self.listCtrl.GetNextSelected(listIndex)
+		return indices
+
+	def _selectItemIndices(self, indices):
+		self._clearSelection()
+		visible = self.listCtrl.visible
+		listIndices = []
+		if visible is None:
+			listIndices = [index for index in indices if 0 <= index < len(self.items)]
+		else:
+			listIndexByRow = {rowIndex: listIndex for listIndex, rowIndex in enumerate(visible)}
+			listIndices = [listIndexByRow[index] for index in indices if index in listIndexByRow]
+		for listIndex in listIndices:
+			self.listCtrl.Select(listIndex)
+		if listIndices:
+			self.listCtrl.Focus(listIndices[0])
+			self.listCtrl.EnsureVisible(listIndices[0])
+
+	def _replaceItems(self, updatedItems):
+		"""Update the rows of several items changed in one operation."""
+		indexByName = {item.get("name", ""): index for index, item in enumerate(self.items)}
+		for item in updatedItems:
+			index = indexByName.get(item.get("name", ""), -1)
+			if index < 0:
+				continue
+			row = _buildRow(item)
+			self.items[index] = item
+			self.listCtrl.rows[index] = row
+			self._searchIndex.updateDocument(self._docIds[index], _buildSearchDocument(item, row))
+
+	def getSelectedItem(self):
+		index = self._getSelectedItemIndex()
 		if index == -1:
 			return None
 		try:
@@ -168,16 +491,17 @@ class InstantAccessSettingsPanel(SettingsPanel):
 		dialog = InstantAccessItemDialog(self, self.configManager, _("Add item"))
 		if dialog.ShowModal() == wx.ID_OK:
 			result = dialog.result
-			self.configManager.addItem(
+			newItem = self.configManager.addItem(
 				result["name"],
 				result["gesture"],
 				result.get("actions", []),
 				result.get("interval", 0.0),
 				result.get("appName", ""),
+				layer=result.get("layer", ""),
+				schedule=result.get("schedule"),
 			)
-			self.refreshList(selectName=result["name"])
-			if self.onConfigChanged:
-				self.onConfigChanged()
+			self._appendItem(newItem)
+			self.updateButtons()
 		dialog.Destroy()
 		self.listCtrl.SetFocus()
 
@@ -185,42 +509,241 @@ class InstantAccessSettingsPanel(SettingsPanel):
 		item = self.getSelectedItem()
 		if not item:
 			return
+		index = self._getSelectedItemIndex()
 		# Translators: Title of the edit item dialog.
 		dialog = InstantAccessItemDialog(self, self.configManager, _("Edit item"), existingItem=item)
 		if dialog.ShowModal() == wx.ID_OK:
 			result = dialog.result
-			self.configManager.updateItem(
+			updatedItem = self.configManager.updateItem(
 				item["name"],
 				result["name"],
 				result["gesture"],
 				result.get("actions", []),
 				result.get("interval", 0.0),
 				result.get("appName", ""),
+				item.get("enabled", True),
+				result.get("layer", ""),
+				result.get("schedule"),
 			)
-			self.refreshList(selectName=result["name"])
-			if self.onConfigChanged:
-				self.onConfigChanged()
+			self._replaceItem(index, updatedItem)
+			self.updateButtons()
 		dialog.Destroy()
 		self.listCtrl.SetFocus()
 
 	def onDelete(self, event):
-		item = self.getSelectedItem()
-		if not item:
+		indices = self._getSelectedItemIndices()
+		if not indices:
 			return
 		deletedIndex = self.listCtrl.GetFirstSelected()
-		if gui.messageBox(_("Are you sure you would like to delete the selected item?"), CONFIRM_CAPTION, wx.YES_NO | wx.ICON_QUESTION) == wx.YES:
-			self.configManager.deleteItem(item["name"])
-			self.refreshList()
-			if self.items:
+		if len(indices) == 1:
+			message = _("Are you sure you would like to delete the selected item?")
+		else:
+			message = ngettext(
+				"Are you sure you would like to delete the {count} selected item?",
+				"Are you sure you would like to delete the {count} selected items?",
+				len(indices),
+			).format(count=len(indices))
+		if gui.messageBox(message, CONFIRM_CAPTION, wx.YES_NO | wx.ICON_QUESTION) == wx.YES:
+			self.configManager.deleteItems([self.items[index]["name"] for index in indices])
+			for index in sorted(indices, reverse=True):
+				del self.items[index]
+				del self.listCtrl.rows[index]
+				self._searchIndex.removeDocument(self._docIds.pop(index))
+			self._rowByDocId = None
+			self._applyFilter()
+			itemCount = self.listCtrl.GetItemCount()
+			if itemCount:
 				if deletedIndex < 0:
 					deletedIndex = 0
-				nextIndex = min(deletedIndex, len(self.items) - 1)
-				self.listCtrl.Select(nextIndex)
-				self.listCtrl.Focus(nextIndex)
-			if self.onConfigChanged:
-				self.onConfigChanged()
+				nextIndex = min(deletedIndex, itemCount - 1)
+				self._selectListIndex(nextIndex)
+			self.updateButtons()
 		self.listCtrl.SetFocus()
 
+	def onSelectionMenu(self, event):
+		if not self._getSelectedItemIndices():
+			return
+		menu = wx.Menu()
+		entries = (
+			# Translators: Menu item duplicating the selected items.
+			(_("D&uplicate"), self.onDuplicateSelection),
+			# Translators: Menu item exporting the selected items to a file.
+			(_("E&xport selected items..."), self.onExportSelection),
+			# Translators: Menu item changing the app restriction of the selected items.
+			(_("Change &app restriction..."), self.onChangeAppRestriction),
+			# Translators: Menu item moving the selected items to another instant layer.
+			(_("&Move to layer..."), self.onMoveToLayer),
+			# Translators: Menu item adding or removing seconds from every action delay of the selected items.
+			(_("&Shift delays..."), self.onShiftDelays),
+			# Translators: Menu item enabling the selected items.
+			(_("&Enable"), self.onEnableSelection),
+			# Translators: Menu item disabling the selected items.
+			(_("&Disable"), self.onDisableSelection),
+		)
+		for label, handler in entries:
+			menuItem = menu.Append(wx.ID_ANY, label)
+			self.Bind(wx.EVT_MENU, handler, menuItem)
+		self.PopupMenu(menu)
+		menu.Destroy()
+
+	def _finishBulkChange(self, selectIndices, checkConflicts=False):
+		"""Refresh the view after a bulk operation."""
+		self._applyFilter()
+		self._selectItemIndices(selectIndices)
+		self.updateButtons()
+		if checkConflicts:
+			messages = []
+			conflicts = self.configManager.getGestureConflicts()
+			if conflicts:
+				# Translators: Warning shown when a bulk change leaves enabled items sharing a shortcut.
+				messages.append(_("Some enabled items now share a shortcut:\n{conflicts}").format(
+					conflicts="\n".join(", ".join(names) for names in conflicts),
+				))
+			collisions = self.configManager.getPrefixCollisions()
+			if collisions:
+				# Translators: Warning shown when a bulk change leaves an item's key sequence beginning another's.
+				messages.append(_("These key sequences overlap, so the shorter one runs only after a pause:\n{collisions}").format(
+					collisions="\n".join(" / ".join(names) for names in collisions),
+				))
+			if messages:
+				gui.messageBox("\n\n".join(messages), WARNING_CAPTION, wx.OK | wx.ICON_WARNING)
+		self.listCtrl.SetFocus()
+
+	def _getSelectedNames(self):
+		return [self.items[index]["name"] for index in self._getSelectedItemIndices()]
+
+	def onDuplicateSelection(self, event):
+		names = self._getSelectedNames()
+		if not names:
+			return
+		copies = self.configManager.duplicateItems(names)
+		for item in copies:
+			row = _buildRow(item)
+			self.items.append(item)
+			self.listCtrl.rows.append(row)
+			self._docIds.append(self._searchIndex.addDocument(_buildSearchDocument(item, row)))
+		self._rowByDocId = None
+		firstCopy = len(self.items) - len(copies)
+		self._finishBulkChange(list(range(firstCopy, len(self.items))))
+
+	def onExportSelection(self, event):
+		names = self._getSelectedNames()
+		if not names:
+			return
+		dialog = wx.FileDialog(
+			self,
+			# Translators: Title of the file dialog exporting the selected items.
+			_("Export selected items"),
+			wildcard=ALL_FILES_WILDCARD,
+			style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT,
+		)
+		dialog.SetFilename("config.json")
+		if dialog.ShowModal() == wx.ID_OK:
+			try:
+				self.configManager.exportItems(names, dialog.GetPath())
+			except Exception:
+				gui.messageBox(_("Could not export settings."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
+		dialog.Destroy()
+		self.listCtrl.SetFocus()
+
+	def onChangeAppRestriction(self, event):
+		indices = self._getSelectedItemIndices()
+		if not indices:
+			return
+		dialog = wx.TextEntryDialog(
+			self,
+			# Translators: Prompt for the app restriction applied to the selected items.
+			_("App name for the selected items (leave empty to allow them in every app):"),
+			# Translators: Title of the dialog changing the app restriction of several items.
+			_("Change app restriction"),
+			self.items[indices[0]].get("appName", ""),
+		)
+		if dialog.ShowModal() == wx.ID_OK:
+			names = [self.items[index]["name"] for index in indices]
+			self._replaceItems(self.configManager.setItemsAppName(names, dialog.GetValue()))
+			self._finishBulkChange(indices, checkConflicts=True)
+		dialog.Destroy()
+
+	def onMoveToLayer(self, event):
+		indices = self._getSelectedItemIndices()
+		if not indices:
+			return
+		layerNames = [layer["name"] for layer in self.configManager.getLayers()]
+		# Translators: The layer of items that have not been put in a named layer.
+		choices = [_("Default")] + layerNames
+		dialog = wx.SingleChoiceDialog(
+			self,
+			# Translators: Prompt for the layer the selected items move to.
+			_("Layer for the selected items:"),
+			# Translators: Title of the dialog moving several items to another layer.
+			_("Move to layer"),
+			choices,
+		)
+		currentLayer = self.items[indices[0]].get("layer", "")
+		dialog.SetSelection(layerNames.index(currentLayer) + 1 if currentLayer in layerNames else 0)
+		if dialog.ShowModal() == wx.ID_OK:
+			selection = dialog.GetSelection()
+			layer = layerNames[selection - 1] if selection > 0 else ""
+			names = [self.items[index]["name"] for index in indices]
+			self._replaceItems(self.configManager.setItemsLayer(names, layer))
+			self._finishBulkChange(indices, checkConflicts=True)
+		dialog.Destroy()
+
+	def onEditLayers(self, event):
+		if not self.configManager:
+			return
+		dialog = LayersDialog(self, self.configManager.getLayers(), self.configManager.getItemIndex())
+		if dialog.ShowModal() == wx.ID_OK:
+			try:
+				self.configManager.setLayers(dialog.result, dialog.renames)
+			except Exception:
+				log.error("Error saving layers", exc_info=True)
+				# Translators: Error shown when the edited layers could not be saved.
+				gui.messageBox(_("Could not save the layers."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
+			else:
+				# Renamed and removed layers move items, so every row may change.
+				self._reloadFromConfig()
+		dialog.Destroy()
+		self.layersButton.SetFocus()
+
+	def onShiftDelays(self, event):
+		indices = self._getSelectedItemIndices()
+		if not indices:
+			return
+		dialog = wx.TextEntryDialog(
+			self,
+			# Translators: Prompt for the number of seconds added to every action delay of the selected items.
+			_("Seconds to add to every action delay (use a negative number to shorten them):"),
+			# Translators: Title of the dialog shifting the action delays of several items.
+			_("Shift delays"),
+			"0",
+		)
+		if dialog.ShowModal() == wx.ID_OK:
+			try:
+				offset = float((dialog.GetValue() or "0").strip())
+			except ValueError:
+				gui.messageBox(_("Delay must be a valid number."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
+				offset = None
+			if offset:
+				names = [self.items[index]["name"] for index in indices]
+				self._replaceItems(self.configManager.shiftItemsDelays(names, offset))
+				self._finishBulkChange(indices)
+		dialog.Destroy()
+
+	def _setSelectionEnabled(self, enabled):
+		indices = self._getSelectedItemIndices()
+		if not indices:
+			return
+		names = [self.items[index]["name"] for index in indices]
+		self._replaceItems(self.configManager.setItemsEnabled(names, enabled))
+		self._finishBulkChange(indices, checkConflicts=enabled)
+
+	def onEnableSelection(self, event):
+		self._setSelectionEnabled(True)
+
+	def onDisableSelection(self, event):
+		self._setSelectionEnabled(False)
+
 	def onTest(self, event):
 		item = self.getSelectedItem()
 		if not item:
@@ -260,15 +783,8 @@ class InstantAccessSettingsPanel(SettingsPanel):
 		if dialog.ShowModal() == wx.ID_OK:
 			sourcePath = dialog.GetPath()
 			try:
-				testConfig = loadConfigFromPathStrict(sourcePath)
-				saveConfig(self.configManager.getConfigPath(), testConfig)
-				self.refreshList()
-				currentVerbosity = self.configManager.getVerbosityLevel()
-				self.verbosityChoice.SetSelection(VERBOSITY_VALUES.index(currentVerbosity))
-				if self.onConfigChanged:
-					self.onConfigChanged()
-				if self.onVerbosityChanged:
-					self.onVerbosityChanged(currentVerbosity)
+				self.configManager.importConfig(sourcePath)
+				self._reloadFromConfig()
 			except Exception:
 				gui.messageBox(_("Could not import settings."), ERROR_CAPTION, wx.OK | wx.ICON_ERROR)
 		dialog.Destroy()
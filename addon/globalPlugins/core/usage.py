@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Recency counts for half as much after this many seconds.
+RECENCY_HALF_LIFE = 24 * 60 * 60
+
+FREQUENCY_WEIGHT = 4.0
+RECENCY_WEIGHT = 12.0
+
+# The log is compacted once it holds this many lines and four times as many as needed.
+COMPACT_MIN_LINES = 1000
+
+# Log lines are JSON arrays whose first element tells their kind:
+# ["r", name, timestamp, duration, succeeded, commands] records one run of an item, and
+# ["a", name, count, successes, lastUsed, totalDuration] or ["c", command, count, lastUsed]
+# carry the aggregate of an item or an NVDA command, written when the log is compacted.
+_RUN = "r"
+_ITEM_AGGREGATE = "a"
+_COMMAND_AGGREGATE = "c"
+
+
+class _ItemUsage:
+	__slots__ = ("count", "successes", "lastUsed", "totalDuration")
+
+	def __init__(self, count=0, successes=0, lastUsed=0.0, totalDuration=0.0):
+		self.count = count
+		self.successes = successes
+		self.lastUsed = lastUsed
+		self.totalDuration = totalDuration
+
+
+def _recencyScore(count, lastUsed, now):
+	if not count:
+		return 0.0
+	age = max(0.0, now - lastUsed)
+	return FREQUENCY_WEIGHT * math.log1p(count) + RECENCY_WEIGHT * 0.5 ** (age / RECENCY_HALF_LIFE)
+
+
+class UsageStats:
+	"""How often, how recently and how successfully each item was run.
+
+	Runs are appended to a log file and folded into in-memory aggregates, so reads never
+	touch the file. The log is rewritten as one aggregate line per item once it grows.
+	Items are identified by name; the NVDA commands they run are counted too, by identifier.
+	"""
+
+	def __init__(self, path=None):
+		self._lock = threading.RLock()
+		self._path = path
+		self._items = {}
+		self._commands = {}
+		self._logLines = 0
+
+	def setPath(self, path):
+		with self._lock:
+			self._path = path
+
+	def load(self):
+		"""Replace the aggregates with the content of the log file."""
+		with self._lock:
+			self._items = {}
+			self._commands = {}
+			self._logLines = 0
+			if not self._path or not os.path.isfile(self._path):
+				return
+			line = "\n"
+			try:
+				with open(self._path, "r", encoding="utf-8") as logFile:
+					for line in logFile:
+						self._logLines += 1
+						try:
+							self._applyRecord(json.loads(line))
+						except (ValueError, TypeError, IndexError):
+							# A line torn by a crash only loses that one run.
+							continue
+			except OSError:
+				log.warning("Could not read usage log %s", self._path, exc_info=True)
+				return
+			if not line.endswith("\n"):
+				# Appending after a torn last line would corrupt the next run too.
+				self.compact()
+
+	def _applyRecord(self, record):
+		kind = record[0]
+		if kind == _RUN:
+			_, name, timestamp, duration, succeeded = record[:5]
+			self._addRun(name, float(timestamp), float(duration), bool(succeeded), record[5] if len(record) > 5 else ())
+		elif kind == _ITEM_AGGREGATE:
+			_, name, count, successes, lastUsed, totalDuration = record[:6]
+			usage = self._items.setdefault(name, _ItemUsage())
+			usage.count += int(count)
+			usage.successes += int(successes)
+			usage.lastUsed = max(usage.lastUsed, float(lastUsed))
+			usage.totalDuration += float(totalDuration)
+		elif kind == _COMMAND_AGGREGATE:
+			_, command, count, lastUsed = record[:4]
+			commandUsage = self._commands.setdefault(command, [0, 0.0])
+			commandUsage[0] += int(count)
+			commandUsage[1] = max(commandUsage[1], float(lastUsed))
+
+	def _addRun(self, name, timestamp, duration, succeeded, commands):
+		usage = self._items.setdefault(name, _ItemUsage())
+		usage.count += 1
+		usage.lastUsed = max(usage.lastUsed, timestamp)
+		usage.totalDuration += duration
+		if succeeded:
+			usage.successes += 1
+			for command in commands:
+				commandUsage = self._commands.setdefault(command, [0, 0.0])
+				commandUsage[0] += 1
+				commandUsage[1] = max(commandUsage[1], timestamp)
+
+	def record(self, name, duration=0.0, succeeded=True, commands=(), timestamp=None):
+		"""Record one run of the item called name, and of the NVDA commands it ran."""
+		if not name:
+			return
+		timestamp = time.time() if timestamp is None else timestamp
+		commands = [command for command in commands if command]
+		with self._lock:
+			self._addRun(name, timestamp, duration, succeeded, commands)
+			if not self._path:
+				return
+			record = [_RUN, name, round(timestamp, 3), round(duration, 3), 1 if succeeded else 0]
+			if commands:
+				record.append(commands)
+			try:
+				os.makedirs(os.path.dirname(self._path), exist_ok=True)
+				with open(self._path, "a", encoding="utf-8") as logFile:
+					logFile.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+				self._logLines += 1
+			except OSError:
+				log.warning("Could not append to usage log %s", self._path, exc_info=True)
+				return
+			if self._logLines >= max(COMPACT_MIN_LINES, 4 * (len(self._items) + len(self._commands))):
+				self.compact()
+
+	def compact(self):
+		"""Rewrite the log as one aggregate line per item and command."""
+		with self._lock:
+			if not self._path:
+				return
+			lines = [
+				[_ITEM_AGGREGATE, name, usage.count, usage.successes, round(usage.lastUsed, 3), round(usage.totalDuration, 3)]
+				for name, usage in self._items.items()
+			]
+			lines.extend(
+				[_COMMAND_AGGREGATE, command, count, round(lastUsed, 3)]
+				for command, (count, lastUsed) in self._commands.items()
+			)
+			directory = os.path.dirname(self._path)
+			try:
+				fileDescriptor, tempPath = tempfile.mkstemp(dir=directory, prefix=".usage-", suffix=".tmp")
+				try:
+					with os.fdopen(fileDescriptor, "w", encoding="utf-8") as logFile:
+						for line in lines:
+							logFile.write(json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n")
+					os.replace(tempPath, self._path)
+				except Exception:
+					try:
+						os.remove(tempPath)
+					except OSError:
+						pass
+					raise
+			except OSError:
+				log.warning("Could not compact usage log %s", self._path, exc_info=True)
+				return
+			self._logLines = len(lines)
+
+	def getCount(self, name):
+		usage = self._items.get(name)
+		return usage.count if usage else 0
+
+	def getSuccessCount(self, name):
+		usage = self._items.get(name)
+		return usage.successes if usage else 0
+
+	def getLastUsed(self, name):
+		usage = self._items.get(name)
+		return usage.lastUsed if usage else 0.0
+
+	def getAverageDuration(self, name):
+		usage = self._items.get(name)
+		return usage.totalDuration / usage.count if usage and usage.count else 0.0
+
+	def score(self, name, now=None):
+		"""Return a ranking bonus growing with successful runs and fading with time since the last one."""
+		usage = self._items.get(name)
+		if usage is None:
+			return 0.0
+		return _recencyScore(usage.successes, usage.lastUsed, time.time() if now is None else now)
+
+	def getScores(self, now=None):
+		"""Return the score of every item run at least once, by name."""
+		now = time.time() if now is None else now
+		with self._lock:
+			usages = list(self._items.items())
+		return {name: _recencyScore(usage.successes, usage.lastUsed, now) for name, usage in usages}
+
+	def getCommandScores(self, now=None):
+		"""Return the score of every NVDA command run by an item, by command identifier."""
+		now = time.time() if now is None else now
+		with self._lock:
+			commands = list(self._commands.items())
+		return {command: _recencyScore(count, lastUsed, now) for command, (count, lastUsed) in commands}
+
+
+usageStats = UsageStats()